@@ -0,0 +1,287 @@
+"""Manifeste des artefacts de `Input_Site_Web` : index mémoire, intégrité, versions.
+
+Le dossier est parcouru une seule fois au démarrage : chaque fichier est
+enregistré avec sa taille, son mtime et son empreinte SHA-256. Le cache
+d'assets et les pages interrogent cet index au lieu de faire un `stat` à
+chaque rerun ; un thread de surveillance re-parcourt le dossier toutes les
+`BAAC_MANIFEST_POLL_S` secondes (0 : désactivé) et ne recalcule l'empreinte
+que des fichiers ajoutés ou modifiés.
+
+L'empreinte, identique d'une machine à l'autre (contrairement au mtime),
+sert de version aux URL publiées (cf. static_assets.publish) : un contenu
+modifié change d'URL, ce qui permet le cache navigateur `immutable`. Les
+en-têtes ETag restent ceux du serveur statique (Streamlit ou nginx).
+
+    python artifact_manifest.py build   # écrit Input_Site_Web/manifest.json
+    python artifact_manifest.py check   # manifeste + chemins référencés par les pages
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_PATH = os.path.join(INPUT_DIR, MANIFEST_NAME)
+
+# Magasins dérivés (cf. model_store.py, whatif.py) : sous-dossiers de `models/`,
+# reconstruits et validés par leur propre meta.json ; ni parcourus ni empreints
+DERIVED_DIR = "models"
+SKIPPED_MARKERS = (".tmp", ".old")
+
+POLL_ENV_VAR = "BAAC_MANIFEST_POLL_S"
+DEFAULT_POLL_S = 2.0
+HASH_CHUNK = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def _skipped(name):
+    """Vrai pour un nom relatif que `Manifest.scan` n'indexe pas volontairement."""
+    parts = name.split("/")
+    return (
+        name == MANIFEST_NAME
+        or (len(parts) > 2 and parts[0] == DERIVED_DIR)
+        or any(m in name for m in SKIPPED_MARKERS)
+    )
+
+
+class Artifact:
+    """Entrée du manifeste : nom relatif, taille, mtime, SHA-256."""
+
+    __slots__ = ("name", "size", "mtime_ns", "sha256")
+
+    def __init__(self, name, size, mtime_ns, sha256):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha256 = sha256
+
+    @property
+    def signature(self):
+        """(mtime_ns, taille), comme asset_cache.file_signature."""
+        return self.mtime_ns, self.size
+
+    def as_dict(self):
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "sha256": self.sha256}
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Manifest:
+    """Index mémoire des fichiers d'un dossier, tenu à jour par parcours incrémental."""
+
+    def __init__(self, root=INPUT_DIR):
+        self.root = os.path.abspath(root)
+        self._entries = {}   # nom relatif ('/') -> Artifact
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.scans = 0
+
+    def _name(self, path):
+        """Nom relatif de `path` dans le dossier, None s'il est en dehors."""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.curdir or rel.split(os.sep)[0] == os.pardir:
+            return None
+        return rel.replace(os.sep, "/")
+
+    def covers(self, path):
+        """Vrai si `path` est indexé par le parcours (hors magasins dérivés et temporaires).
+
+        Les autres chemins relèvent d'un `stat` (cf. asset_cache.artifact_signature).
+        """
+        name = self._name(path)
+        return name is not None and not _skipped(name)
+
+    # ---------- parcours ----------
+    def scan(self):
+        """Parcourt le dossier ; ne ré-empreinte que les fichiers changés.
+
+        Les sous-dossiers de `models/` et les dossiers temporaires ou
+        remplacés (`.tmp`, `.old`) sont ignorés. Renvoie la liste des noms
+        ajoutés, modifiés ou supprimés.
+        """
+        with self._lock:
+            previous = dict(self._entries)
+        current, changed = {}, []
+        derived = os.path.join(self.root, DERIVED_DIR)
+        for dirpath, dirnames, files in os.walk(self.root):
+            if dirpath == derived:
+                dirnames[:] = []
+            else:
+                dirnames[:] = [d for d in dirnames if not any(m in d for m in SKIPPED_MARKERS)]
+            for fname in files:
+                path = os.path.join(dirpath, fname)
+                name = self._name(path)
+                if _skipped(name):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                old = previous.get(name)
+                if old is not None and old.signature == (st.st_mtime_ns, st.st_size):
+                    current[name] = old
+                    continue
+                try:
+                    digest = sha256_file(path)
+                except OSError:
+                    continue
+                current[name] = Artifact(name, st.st_size, st.st_mtime_ns, digest)
+                changed.append(name)
+        changed += [name for name in previous if name not in current]
+        with self._lock:
+            self._entries = current
+            self.scans += 1
+        return changed
+
+    def watch(self, interval):
+        """Lance (une fois) le thread qui re-parcourt le dossier toutes les `interval` s."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    changed = self.scan()
+                except Exception:
+                    logger.exception("Parcours de %s impossible", self.root)
+                    continue
+                if changed:
+                    logger.info("Artefacts modifiés : %s", ", ".join(sorted(changed)))
+
+        self._watcher = threading.Thread(target=loop, name="artifact-manifest", daemon=True)
+        self._watcher.start()
+
+    # ---------- index ----------
+    def get(self, path):
+        """Entrée du fichier `path`, None s'il est absent (ou hors du dossier)."""
+        name = self._name(path)
+        with self._lock:
+            return self._entries.get(name)
+
+    def signature(self, path):
+        entry = self.get(path)
+        return entry.signature if entry is not None else None
+
+    def validate(self, paths):
+        """Chemins de `paths` absents de l'index."""
+        return [p for p in paths if self.get(p) is None]
+
+    # ---------- intégrité ----------
+    def as_dict(self):
+        with self._lock:
+            return {name: e.as_dict() for name, e in sorted(self._entries.items())}
+
+    def save(self, path=MANIFEST_PATH):
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.as_dict()}, f, indent=1)
+        os.replace(tmp, path)
+
+    def compare(self, recorded):
+        """Écarts avec un manifeste enregistré : {manquant, modifié, nouveau}.
+
+        La comparaison porte sur le contenu (SHA-256), pas sur le mtime, qui
+        change à chaque clone ou copie.
+        """
+        current = self.as_dict()
+        return {
+            "manquant": sorted(n for n in recorded if n not in current),
+            "modifié": sorted(
+                n for n, e in recorded.items() if n in current and current[n]["sha256"] != e["sha256"]
+            ),
+            "nouveau": sorted(n for n in current if n not in recorded),
+        }
+
+
+def load_recorded(path=MANIFEST_PATH):
+    """Fichiers du manifeste enregistré, None s'il n'existe pas."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except FileNotFoundError:
+        return None
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    """Manifeste unique du processus : parcouru au premier appel, puis surveillé."""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                manifest = Manifest()
+                manifest.scan()
+                manifest.watch(float(os.environ.get(POLL_ENV_VAR, DEFAULT_POLL_S)))
+                _manifest = manifest
+    return _manifest
+
+
+def version(path):
+    """Version courte de `path` pour les URL, None s'il n'existe pas.
+
+    Empreinte du contenu pour les fichiers indexés (stable d'une machine à
+    l'autre), mtime-taille sinon.
+    """
+    manifest = get_manifest()
+    if manifest.covers(path):
+        entry = manifest.get(path)
+        return entry.sha256[:16] if entry is not None else None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def main(argv):
+    if len(argv) != 1 or argv[0] not in ("build", "check"):
+        print(__doc__)
+        return 1
+    manifest = Manifest()
+    t0 = time.perf_counter()
+    manifest.scan()
+    files = manifest.as_dict()
+    total = sum(e["size"] for e in files.values())
+    print(f"{len(files)} fichiers, {total / 1024 / 1024:.1f} Mo parcourus en "
+          f"{1000 * (time.perf_counter() - t0):.0f} ms")
+    if argv[0] == "build":
+        manifest.save()
+        print(f"{MANIFEST_PATH} écrit")
+        return 0
+
+    failed = False
+    recorded = load_recorded()
+    if recorded is not None:
+        for kind, items in manifest.compare(recorded).items():
+            for name in items:
+                print(f"{kind:9s} {name}")
+            failed = failed or (kind != "nouveau" and bool(items))
+
+    import site_pages
+
+    logging.disable(logging.WARNING)   # absents déjà listés ci-dessous
+    for label, paths in site_pages.referenced_artifacts().items():
+        for path in manifest.validate(paths):
+            print(f"ABSENT    {os.path.relpath(path, BASE_DIR)}  ({label})")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
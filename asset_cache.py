@@ -0,0 +1,178 @@
+"""Cache mémoire des fichiers de `Input_Site_Web`, partagé par tout le processus.
+
+Chaque rerun Streamlit relit les mêmes PNG / HTML / PDF : ce module les garde
+en mémoire (octets bruts, texte décodé ou image PIL décodée) et ne les relit
+que si le fichier a changé sur disque (clé = chemin + mtime + taille).
+Pour `Input_Site_Web`, la signature vient de l'index du manifeste
+(cf. artifact_manifest.py) : aucun `stat` par rerun.
+La mémoire occupée est bornée par un budget (éviction LRU).
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import perf
+from artifact_manifest import get_manifest
+
+# Budget mémoire par défaut (Mo), surchargeable via la variable d'environnement
+DEFAULT_BUDGET_MB = 256
+BUDGET_ENV_VAR = "BAAC_ASSET_CACHE_MB"
+
+
+def file_signature(path):
+    """(mtime_ns, taille) du fichier, ou None s'il n'existe pas."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def artifact_signature(path):
+    """Signature depuis l'index du manifeste pour `Input_Site_Web`, sinon `stat`."""
+    manifest = get_manifest()
+    if manifest.covers(path):
+        return manifest.signature(path)
+    return file_signature(path)
+
+
+class AssetCache:
+    """Cache LRU thread-safe, borné en octets, invalidé par mtime/taille."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()   # (kind, path) -> (signature, valeur, coût)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- coeur ----------
+    def get(self, path, kind, loader, cost=None):
+        """Renvoie `loader(path)` depuis le cache, ou None si le fichier manque.
+
+        `kind` distingue plusieurs représentations d'un même fichier
+        (octets, texte, image décodée) ; `cost(valeur)` estime sa taille en octets.
+        """
+        sig = artifact_signature(path)
+        key = (kind, path)
+        if sig is None:
+            self._drop(key)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sig:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Lecture hors verrou : les autres sessions ne sont pas bloquées
+        with perf.span(_span_category(kind)):
+            value = loader(path)
+        size = cost(value) if cost is not None else sig[1]
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            if size <= self.max_bytes:
+                self._entries[key] = (sig, value, size)
+                self.current_bytes += size
+                self._evict()
+        return value
+
+    def _drop(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # ---------- représentations usuelles ----------
+    def read_bytes(self, path):
+        """Contenu binaire du fichier (PNG, PDF…)."""
+        return self.get(path, "bytes", _read_bytes)
+
+    def read_text(self, path, encoding="utf-8"):
+        """Contenu texte du fichier (HTML…)."""
+        return self.get(
+            path, f"text:{encoding}",
+            lambda p: _read_text(p, encoding),
+            cost=lambda s: len(s.encode(encoding)),
+        )
+
+    def load_image(self, path):
+        """Image PIL entièrement décodée (pixels chargés en mémoire)."""
+        return self.get(path, "image", _decode_image, cost=_image_cost)
+
+
+def _span_category(kind):
+    """Catégorie de mesure (cf. perf.py) d'un type d'entrée du cache."""
+    if kind == "image":
+        return "decode"
+    if kind == "bytes" or kind.startswith("text:"):
+        return "io"
+    return kind.split(":")[0]
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_text(path, encoding):
+    with open(path, "r", encoding=encoding) as f:
+        return f.read()
+
+
+def _decode_image(path):
+    from PIL import Image
+
+    with open(path, "rb") as f:
+        img = Image.open(io.BytesIO(f.read()))
+        img.load()
+    return img
+
+
+def _image_cost(img):
+    return img.width * img.height * len(img.getbands())
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Instance unique du cache pour le processus (budget lu dans l'environnement)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                budget_mb = float(os.environ.get(BUDGET_ENV_VAR, DEFAULT_BUDGET_MB))
+                _cache = AssetCache(budget_mb * 1024 * 1024)
+    return _cache
@@ -0,0 +1,291 @@
+"""Entrepôt colonnaire des données BAAC (Parquet partitionné an / dep).
+
+Les fichiers bruts Caractéristiques, Lieux et Usagers de chaque année sont
+fusionnés au niveau accident, typés (codes en entiers courts, coordonnées
+en float32) puis écrits en Parquet (encodage dictionnaire) partitionné par
+année et département.
+Les requêtes ne lisent que les colonnes et partitions utiles (élagage des
+partitions + filtres poussés au lecteur Parquet) :
+
+    store = BaacStore()
+    store.taux_mortels(["catr", "lum"], years=(2019, 2021))
+
+Ingestion (fichiers bruts data.gouv.fr dans `data/baac_raw/`) :
+
+    python baac_store.py ingest 2015-2023
+    python baac_store.py rate catr lum --years 2019-2021
+"""
+import glob
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+RAW_DIR = os.environ.get("BAAC_RAW_DIR", os.path.join(BASE_DIR, "data", "baac_raw"))
+STORE_DIR = os.environ.get("BAAC_STORE_DIR", os.path.join(BASE_DIR, "data", "baac_store"))
+
+# Préfixes des fichiers bruts (orthographes rencontrées sur data.gouv.fr)
+RAW_TABLES = {
+    "caracteristiques": ("caracteristiques", "carcteristiques"),
+    "lieux": ("lieux",),
+    "usagers": ("usagers",),
+}
+
+# Variables codées (entiers courts, -1 = non renseigné)
+CODE_COLUMNS = [
+    "mois", "jour", "lum", "agg", "int", "atm", "col",
+    "catr", "circ", "vosp", "prof", "plan", "surf", "infra", "situ",
+]
+STRING_COLUMNS = ["Num_Acc", "com"]
+
+# Gravité « tué » dans la table Usagers
+GRAV_TUE = 2
+
+
+# =========================
+# LECTURE DES FICHIERS BRUTS
+# =========================
+
+def find_raw_file(table, year, raw_dir=RAW_DIR):
+    """Chemin du fichier brut d'une table pour une année, None s'il manque."""
+    for name in os.listdir(raw_dir) if os.path.isdir(raw_dir) else []:
+        low = name.lower()
+        if low.endswith(".csv") and str(year) in low and low.startswith(RAW_TABLES[table]):
+            return os.path.join(raw_dir, name)
+    return None
+
+
+def read_raw_csv(path):
+    """CSV BAAC brut : séparateur (`,` / `;` / tabulation) et encodage détectés."""
+    with open(path, "rb") as f:
+        head = f.readline()
+    try:
+        head.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    sep = max([",", ";", "\t"], key=lambda s: head.count(s.encode()))
+    df = pd.read_csv(path, sep=sep, encoding=encoding, dtype=str, low_memory=False)
+    df.columns = [c.strip().strip('"').lstrip("﻿") for c in df.columns]
+    if "Accident_Id" in df.columns and "Num_Acc" not in df.columns:
+        df = df.rename(columns={"Accident_Id": "Num_Acc"})
+    return df
+
+
+def normalize_dep(dep, year):
+    """Code département homogène ("59", "2A", "971"…).
+
+    Avant 2019, les codes BAAC sont sur 3 caractères ("590", "201" pour la
+    Corse-du-Sud…) : on les ramène au code INSEE.
+    """
+    dep = dep.astype(str).str.strip().str.upper()
+    if year < 2019:
+        dep = dep.replace({"201": "2A", "202": "2B"})
+        three = dep.str.fullmatch(r"\d{2}0")
+        dep = dep.where(~three, dep.str[:2])
+    return dep.where(~dep.str.fullmatch(r"\d"), "0" + dep)
+
+
+def _to_float(s):
+    return pd.to_numeric(s.astype(str).str.replace(",", ".", regex=False).str.strip(), errors="coerce")
+
+
+def _to_code(s):
+    return pd.to_numeric(s, errors="coerce").fillna(-1).astype(np.int8)
+
+
+def merge_year(caract, lieux, usagers, year):
+    """Table accident d'une année (une ligne par `Num_Acc`)."""
+    acc = caract.copy()
+    acc["an"] = year
+    acc["dep"] = normalize_dep(acc["dep"], year)
+
+    lat, lon = _to_float(acc["lat"]), _to_float(acc["long"])
+    if year < 2019:
+        # Coordonnées stockées en entiers × 100 000 avant 2019
+        lat, lon = lat / 100_000, lon / 100_000
+    acc["lat"] = lat.where(lat != 0)
+    acc["long"] = lon.where(lon != 0)
+    acc["hrmn"] = pd.to_numeric(acc["hrmn"].astype(str).str.replace(":", "", regex=False), errors="coerce")
+
+    lieux = lieux.drop_duplicates("Num_Acc")
+    keep = ["Num_Acc"] + [c for c in lieux.columns if c in CODE_COLUMNS + ["nbv", "vma"]]
+    acc = acc.merge(lieux[keep], on="Num_Acc", how="left")
+
+    grav = pd.to_numeric(usagers["grav"], errors="coerce")
+    users = (
+        usagers.assign(tue=(grav == GRAV_TUE).astype(np.int32))
+        .groupby("Num_Acc")["tue"].agg(n_usagers="size", n_tues="sum")
+        .reset_index()
+    )
+    acc = acc.merge(users, on="Num_Acc", how="left")
+    acc[["n_usagers", "n_tues"]] = acc[["n_usagers", "n_tues"]].fillna(0).astype(np.int16)
+    acc["is_mortel"] = (acc["n_tues"] > 0).astype(np.int8)
+
+    return typed(acc)
+
+
+def typed(acc):
+    """Colonnes du schéma, typées pour un stockage colonnaire compact."""
+    out = pd.DataFrame(index=acc.index)
+    for c in STRING_COLUMNS:
+        out[c] = acc[c].astype(str) if c in acc else None
+    for c in CODE_COLUMNS:
+        out[c] = _to_code(acc[c]) if c in acc else np.int8(-1)
+    for c in ["nbv", "vma"]:
+        out[c] = pd.to_numeric(acc[c], errors="coerce").astype("float32") if c in acc else np.nan
+    out["hrmn"] = acc["hrmn"].astype("float32")
+    out["lat"] = acc["lat"].astype("float32")
+    out["long"] = acc["long"].astype("float32")
+    for c in ["n_usagers", "n_tues", "is_mortel"]:
+        out[c] = acc[c]
+    out["an"] = acc["an"].astype(np.int16)
+    out["dep"] = acc["dep"]
+    return out.reset_index(drop=True)
+
+
+# =========================
+# ENTREPÔT
+# =========================
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # Schéma explicite : "01" doit rester une chaîne, pas l'entier 1
+    return ds.partitioning(pa.schema([("an", pa.int16()), ("dep", pa.string())]), flavor="hive")
+
+
+class BaacStore:
+    """Accès au Parquet partitionné (`an=…/dep=…/`) via `pyarrow.dataset`."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._dataset = None
+
+    @property
+    def dataset(self):
+        import pyarrow.dataset as ds
+
+        if self._dataset is None:
+            self._dataset = ds.dataset(self.root, format="parquet", partitioning=_partitioning())
+        return self._dataset
+
+    def exists(self):
+        return os.path.isdir(self.root) and bool(glob.glob(os.path.join(self.root, "an=*")))
+
+    @property
+    def years(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            int(m.group(1))
+            for m in (re.fullmatch(r"an=(\d+)", d) for d in os.listdir(self.root))
+            if m
+        )
+
+    def write_year(self, acc):
+        """Écrit (ou remplace) la partition d'une année."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        for year in acc["an"].unique():
+            shutil.rmtree(os.path.join(self.root, f"an={year}"), ignore_errors=True)
+        ds.write_dataset(
+            pa.Table.from_pandas(acc, preserve_index=False), self.root,
+            format="parquet", partitioning=_partitioning(),
+            existing_data_behavior="overwrite_or_ignore",
+            basename_template="part-{i}.parquet",
+        )
+        self._dataset = None
+
+    def _filter(self, years=None, deps=None, where=None):
+        import pyarrow.dataset as ds
+
+        expr = None
+        for cond in (
+            None if years is None else (ds.field("an") >= years[0]) & (ds.field("an") <= years[1]),
+            None if not deps else ds.field("dep").isin(list(deps)),
+            where,
+        ):
+            if cond is not None:
+                expr = cond if expr is None else expr & cond
+        return expr
+
+    def scan(self, columns, years=None, deps=None, where=None):
+        """DataFrame des colonnes demandées pour le filtre.
+
+        `years` : (début, fin) inclus ; `deps` : codes département ;
+        `where` : expression `pyarrow.dataset` supplémentaire (ex.
+        `ds.field("agg") == 1`), poussée au lecteur Parquet.
+        """
+        table = self.dataset.to_table(columns=list(columns), filter=self._filter(years, deps, where))
+        return table.to_pandas()
+
+    def taux_mortels(self, by, years=None, deps=None, where=None):
+        """Nombre d'accidents, de mortels et taux (%) par combinaison de `by`."""
+        df = self.scan(list(by) + ["is_mortel"], years=years, deps=deps, where=where)
+        out = (
+            df.groupby(list(by), observed=True)["is_mortel"]
+            .agg(n_total="size", n_mortels="sum")
+            .reset_index()
+        )
+        out["taux_mortels_pct"] = 100.0 * out["n_mortels"] / out["n_total"]
+        return out
+
+
+def read_raw_year(year, raw_dir=RAW_DIR):
+    """Tables brutes d'une année : {table: DataFrame}."""
+    raw = {}
+    for table in RAW_TABLES:
+        path = find_raw_file(table, year, raw_dir)
+        if path is None:
+            raise FileNotFoundError(f"Fichier {table} {year} introuvable dans {raw_dir}")
+        raw[table] = read_raw_csv(path)
+    return raw
+
+
+def ingest_year(year, raw_dir=RAW_DIR, store=None, raw=None):
+    """Fusionne les trois tables brutes d'une année et l'écrit dans l'entrepôt.
+
+    `raw` : tables déjà lues (cf. read_raw_year), sinon lues dans `raw_dir`.
+    """
+    store = store or BaacStore()
+    raw = raw or read_raw_year(year, raw_dir)
+    acc = merge_year(raw["caracteristiques"], raw["lieux"], raw["usagers"], year)
+    store.write_year(acc)
+    return acc
+
+
+def _parse_years(spec):
+    a, _, b = spec.partition("-")
+    return int(a), int(b or a)
+
+
+def main(argv):
+    if argv[:1] == ["ingest"] and len(argv) == 2:
+        start, end = _parse_years(argv[1])
+        for year in range(start, end + 1):
+            acc = ingest_year(year)
+            print(f"{year}: {len(acc)} accidents, {int(acc['is_mortel'].sum())} mortels")
+        return 0
+    if argv[:1] == ["rate"] and len(argv) >= 2:
+        by, years = [], None
+        args = iter(argv[1:])
+        for a in args:
+            if a == "--years":
+                years = _parse_years(next(args))
+            else:
+                by.append(a)
+        print(BaacStore().taux_mortels(by, years=years).to_string(index=False))
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
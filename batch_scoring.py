@@ -0,0 +1,294 @@
+"""Scoring par lots en flux : lecture par blocs, pool de workers, export CSV / Parquet.
+
+Pour scorer une année complète d'accidents BAAC, le fichier source (CSV ou
+Parquet, envoyé par l'utilisateur ou présent sur le serveur) est lu par
+blocs de taille fixe ; chaque bloc est scoré dans un pool de threads
+(probabilité, classe au seuil `t*`, et au besoin les `k` variables SHAP les
+plus contributives), puis écrit aussitôt dans le fichier de sortie. Au plus
+`workers + 1` blocs sont en mémoire à la fois, quelle que soit la taille du
+fichier, et l'ordre des lignes est conservé.
+
+Dans l'application, la sortie est écrite dans `static/exports/` sous un
+nom aléatoire et téléchargée par `app/static/` : elle n'est jamais chargée
+en mémoire par la session (cf. static_assets.py). Un thread du processus
+supprime les exports de plus d'une heure ; derrière nginx, ils sont servis
+sans cache et en pièce jointe (cf. deploy.py).
+
+    python batch_scoring.py S1_spatial accidents.parquet scores.parquet --shap-top 3
+    python batch_scoring.py S0_baseline accidents.csv scores.csv
+"""
+import argparse
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import explain
+import scoring
+from feature_pipeline import FEATURE_DIR, FeatureStore
+from static_assets import STATIC_DIR, STATIC_URL_PREFIX
+
+CHUNK_ROWS = scoring.CHUNK_ROWS
+N_WORKERS = os.cpu_count() or 1
+MAX_SHAP_TOP = 10
+
+# Codes lus comme texte dans les CSV ("01", "2A"… ne doivent pas changer de
+# type d'un bloc à l'autre)
+TEXT_COLUMNS = {"Num_Acc": str, "dep": str, "com": str}
+
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Fichiers sources côté serveur (en plus des années du magasin de variables)
+BATCH_DIR = os.environ.get("BAAC_BATCH_DIR", os.path.join(os.path.dirname(FEATURE_DIR), "batch"))
+
+# Sorties téléchargeables : supprimées après EXPORT_TTL_S secondes
+EXPORT_DIR = os.path.join(STATIC_DIR, "exports")
+EXPORT_TTL_S = 3600
+PRUNE_INTERVAL_S = 300
+
+_pruner = None
+_pruner_lock = threading.Lock()
+
+
+def source_format(source):
+    """'csv' ou 'parquet' d'après l'extension du chemin ou du fichier envoyé."""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    return "parquet" if name.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def server_sources(store=None):
+    """Fichiers scorables côté serveur : {libellé: chemin}."""
+    store = store or FeatureStore()
+    sources = {
+        f"Accidents {year} (magasin de variables)": os.path.join(store.root, f"an={year}", "part.parquet")
+        for year in store.years
+    }
+    if os.path.isdir(BATCH_DIR):
+        for name in sorted(os.listdir(BATCH_DIR)):
+            if name.lower().endswith((".csv", ".parquet", ".pq")):
+                sources[name] = os.path.join(BATCH_DIR, name)
+    return sources
+
+
+# =========================
+# LECTURE PAR BLOCS
+# =========================
+
+def read_chunks(source, chunk_rows=CHUNK_ROWS, progress=None):
+    """Blocs (DataFrames) d'un CSV ou d'un Parquet (chemin ou fichier ouvert).
+
+    `progress(fraction)` est appelé après chaque bloc lu.
+    """
+    if source_format(source) == "parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(source)
+        total = max(pf.metadata.num_rows, 1)
+        done = 0
+        for batch in pf.iter_batches(batch_size=chunk_rows):
+            done += batch.num_rows
+            if progress is not None:
+                progress(done / total)
+            yield batch.to_pandas()
+        return
+
+    f = open(source, "rb") if isinstance(source, str) else source
+    try:
+        size = max(os.fstat(f.fileno()).st_size if isinstance(source, str) else getattr(f, "size", 0), 1)
+        for chunk in pd.read_csv(f, sep=scoring._sniff_sep(f), dtype=TEXT_COLUMNS,
+                                 chunksize=chunk_rows):
+            if progress is not None:
+                progress(min(f.tell() / size, 1.0))
+            yield chunk
+    finally:
+        if isinstance(source, str):
+            f.close()
+
+
+# =========================
+# SCORING
+# =========================
+
+def top_shap(scorer, df, k):
+    """Les `k` variables de plus forte |SHAP| par ligne : `shap_i_var`, `shap_i_val`."""
+    values, _, names = explain.tree_shap(scorer.model, scorer._frame(df), n_workers=1)
+    order = np.argsort(-np.abs(values), axis=1)[:, :k]
+    names = np.asarray(names, dtype=object)
+    out = {}
+    for i in range(order.shape[1]):
+        out[f"shap_{i + 1}_var"] = names[order[:, i]]
+        out[f"shap_{i + 1}_val"] = np.take_along_axis(values, order[:, i:i + 1], axis=1)[:, 0]
+    return pd.DataFrame(out, index=df.index)
+
+
+def score_chunk(scorer, df, shap_top=0):
+    """Bloc scoré : `proba_mortel`, `pred_mortel` et les colonnes SHAP demandées."""
+    out = scorer.score(df)
+    if shap_top:
+        out = pd.concat([out, top_shap(scorer, df, shap_top)], axis=1)
+    return out
+
+
+def score_stream(scorer, chunks, shap_top=0, n_workers=N_WORKERS):
+    """Blocs scorés dans l'ordre ; au plus `n_workers + 1` blocs en vol."""
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, scorer, chunk, shap_top))
+            if len(pending) > n_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# =========================
+# ÉCRITURE
+# =========================
+
+class _CsvWriter:
+    def __init__(self, path):
+        self._f = open(path, "w", encoding="utf-8", newline="")
+        self._header = True
+
+    def write(self, df):
+        df.to_csv(self._f, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._f.close()
+
+
+class _ParquetWriter:
+    """Schéma fixé par le premier bloc ; entiers élargis en flottants si la
+    source est un CSV (un bloc suivant peut contenir des valeurs manquantes)."""
+
+    def __init__(self, path, widen_ints):
+        self._path = path
+        self._widen = widen_ints
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            if self._widen:
+                schema = pa.schema([
+                    pa.field(f.name, pa.float64()) if pa.types.is_integer(f.type)
+                    else pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                    for f in schema
+                ])
+            self._schema = schema
+            self._writer = pq.ParquetWriter(self._path, schema)
+        try:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Types incohérents entre blocs ({e}) : exporter en CSV") from e
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def export(scorer, source, target, fmt=None, shap_top=0, chunk_rows=CHUNK_ROWS,
+           n_workers=N_WORKERS, progress=None):
+    """Score `source` bloc par bloc et écrit le résultat dans `target`.
+
+    Renvoie {rows, positives, seconds}. `progress(fraction, lignes)` est
+    appelé après chaque bloc écrit.
+    """
+    fmt = fmt or source_format(target)
+    read = {"fraction": 0.0}
+    chunks = read_chunks(source, chunk_rows, progress=lambda x: read.update(fraction=x))
+    writer = (_ParquetWriter(target, widen_ints=source_format(source) == "csv")
+              if fmt == "parquet" else _CsvWriter(target))
+    rows = positives = 0
+    start = time.perf_counter()
+    try:
+        for out in score_stream(scorer, chunks, shap_top=shap_top, n_workers=n_workers):
+            writer.write(out)
+            rows += len(out)
+            positives += int(out["pred_mortel"].sum())
+            if progress is not None:
+                progress(read["fraction"], rows)
+    finally:
+        writer.close()
+    return {"rows": rows, "positives": positives, "seconds": time.perf_counter() - start}
+
+
+def prune_exports(ttl=EXPORT_TTL_S):
+    """Supprime les exports plus vieux que `ttl` secondes ; renvoie leur nombre."""
+    if not os.path.isdir(EXPORT_DIR):
+        return 0
+    removed, now = 0, time.time()
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > ttl:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _prune_loop(interval):
+    while True:
+        prune_exports()
+        time.sleep(interval)
+
+
+def start_pruner(interval=PRUNE_INTERVAL_S):
+    """Lance (une fois par processus) la purge périodique des exports expirés."""
+    global _pruner
+    with _pruner_lock:
+        if _pruner is None:
+            _pruner = threading.Thread(target=_prune_loop, args=(interval,),
+                                       name="export-pruner", daemon=True)
+            _pruner.start()
+
+
+def new_export(scenario, fmt):
+    """(chemin, URL) d'un nouvel export, sous un nom non devinable."""
+    start_pruner()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    name = f"scores_{scenario}_{secrets.token_urlsafe(12)}.{fmt}"
+    return os.path.join(EXPORT_DIR, name), f"{STATIC_URL_PREFIX}/exports/{name}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", choices=list(scoring.SCENARIOS))
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--shap-top", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    args = parser.parse_args(argv)
+
+    scorer = scoring.get_scorer(args.scenario)
+    if scorer is None:
+        print(f"Modèle introuvable : {scoring.model_path(args.scenario)}")
+        return 1
+
+    def progress(fraction, rows):
+        print(f"\r{100 * fraction:5.1f} %  {rows:,d} lignes", end="", flush=True)
+
+    stats = export(scorer, args.source, args.target, shap_top=min(args.shap_top, MAX_SHAP_TOP),
+                   chunk_rows=args.chunk_rows, n_workers=args.workers, progress=progress)
+    print(f"\n{stats['rows']:,d} lignes scorées ({stats['positives']:,d} mortels au seuil t*) "
+          f"en {stats['seconds']:.1f} s → {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
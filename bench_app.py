@@ -0,0 +1,114 @@
+"""Banc de mesure headless de app.py (Streamlit AppTest).
+
+Rejoue chaque page et chaque combinaison de ses selectbox `--runs` fois,
+puis affiche les percentiles de latence et la taille des messages émis
+(cf. perf.py). `--json` écrit le rapport ; `--baseline` le compare à un
+rapport précédent et sort en erreur si une latence p50 ou une taille
+dépasse `--tolerance` × la référence :
+
+    python bench_app.py --runs 5 --json bench.json
+    python bench_app.py --runs 5 --baseline bench.json --tolerance 1.5
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+import perf
+
+APP_PATH = os.path.join(os.path.dirname(__file__), "app.py")
+
+
+def _selectbox_combos(at, max_combos):
+    """Combinaisons d'indices des selectbox de la page (au plus `max_combos`)."""
+    boxes = [(sb.key or sb.label, len(sb.options)) for sb in at.selectbox]
+    combos = itertools.product(*[range(n) for _, n in boxes])
+    return [k for k, _ in boxes], list(itertools.islice(combos, max_combos))
+
+
+def _select(at, combo):
+    for sb, i in zip(at.selectbox, combo):
+        sb.select_index(i)
+
+
+def bench(runs=5, max_combos=20, timeout=120):
+    """Latences (s) et octets émis par (page, combinaison de selectbox)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+    results = []
+    for page in list(at.sidebar.radio[0].options):
+        at.sidebar.radio[0].set_value(page).run()
+        keys, combos = _selectbox_combos(at, max_combos)
+        for combo in combos:
+            _select(at, combo)
+            latencies, sizes = [], []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                at.run()
+                latencies.append(time.perf_counter() - t0)
+                last = perf.last_run(page)
+                sizes.append(last["bytes"] if last else 0)
+            label = page + "".join(f" | {k}={i}" for k, i in zip(keys, combo))
+            lat = np.asarray(latencies)
+            results.append({
+                "case": label,
+                "p50_s": float(np.percentile(lat, 50)),
+                "p95_s": float(np.percentile(lat, 95)),
+                "max_s": float(lat.max()),
+                "bytes": int(np.median(sizes)),
+                "errors": [str(e.value) for e in at.exception],
+            })
+    return {"runs": runs, "cases": results, "perf": perf.snapshot()}
+
+
+def compare(report, baseline, tolerance):
+    """Cas dont la latence p50 ou la taille dépasse `tolerance` × la référence."""
+    ref = {c["case"]: c for c in baseline["cases"]}
+    regressions = []
+    for c in report["cases"]:
+        b = ref.get(c["case"])
+        if b is None:
+            continue
+        for key in ("p50_s", "bytes"):
+            if b[key] and c[key] > tolerance * b[key]:
+                regressions.append(f"{c['case']} : {key} {b[key]:.4g} -> {c[key]:.4g}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-combos", type=int, default=20)
+    parser.add_argument("--json", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    report = bench(runs=args.runs, max_combos=args.max_combos)
+    for c in report["cases"]:
+        flag = "  ERREUR " + "; ".join(c["errors"]) if c["errors"] else ""
+        print(f"{c['p50_s'] * 1000:8.1f} ms p50 {c['p95_s'] * 1000:8.1f} ms p95 "
+              f"{c['bytes'] / 1024:8.0f} Ko  {c['case']}{flag}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+
+    failed = any(c["errors"] for c in report["cases"])
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"RÉGRESSION {r}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Mode multi-réplicas : N workers Streamlit derrière un répartiteur nginx.
+
+    python deploy.py prepare                 # artefacts partagés, construits une fois
+    python deploy.py run --workers 4         # workers supervisés + nginx s'il est installé
+    python deploy.py nginx --workers 4       # écrit seulement deploy/nginx.conf
+
+Chaque worker est un `streamlit run app.py` sur son port (BASE_PORT + i) ;
+un worker qui s'arrête est relancé. Ce que les workers partagent :
+
+- les fichiers publiés dans `static/` (images, PDF, GeoJSON ; URL versionnées
+  par contenu) sont préparés une fois et servis directement par nginx avec
+  un cache navigateur `immutable` : ils ne traversent aucun processus Python ;
+  sauf les exports du scoring par lots (`static/exports/`, noms aléatoires,
+  supprimés après une heure), servis sans cache et en pièce jointe ;
+- les cubes hexbin / EDA et l'index des départements sont projetés en mémoire depuis BAAC_SHARED_CACHE_DIR
+  (cf. shared_cache.py) : une seule copie physique pour tous les workers ;
+- de même pour les SHAP précalculés du magasin de modèles (cf.
+  model_store.py, à construire avec `python model_store.py build`) et pour
+  les tables what-if (cf. whatif.py, `python whatif.py build`) ;
+- le budget du cache d'assets (`--cache-mb`) est réparti entre les workers.
+
+Une session Streamlit (websocket, fichiers `/media/`) vit dans un worker :
+nginx route donc par IP cliente (`ip_hash`).
+"""
+import argparse
+import glob
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+RUN_DIR = os.path.join(BASE_DIR, "deploy")
+NGINX_CONF = os.path.join(RUN_DIR, "nginx.conf")
+
+DEFAULT_PORT = 8500
+DEFAULT_BASE_PORT = 8501
+DEFAULT_CACHE_MB = 512
+DEFAULT_SHARED_DIR = "/dev/shm/baac-cache" if os.path.isdir("/dev/shm") else os.path.join(RUN_DIR, "cache")
+HEALTH_TIMEOUT_S = 60
+
+NGINX_TEMPLATE = """\
+# Généré par deploy.py : {workers} worker(s) Streamlit
+worker_processes auto;
+pid nginx.pid;
+error_log nginx-error.log warn;
+
+events {{
+    worker_connections 4096;
+}}
+
+http {{
+    types {{
+        text/html html;
+        application/json json;
+        application/geo+json geojson;
+        application/pdf pdf;
+        image/png png;
+        image/webp webp;
+        image/avif avif;
+    }}
+    default_type application/octet-stream;
+    access_log off;
+    sendfile on;
+    client_body_temp_path tmp/body;
+    proxy_temp_path tmp/proxy;
+    fastcgi_temp_path tmp/fastcgi;
+    uwsgi_temp_path tmp/uwsgi;
+    scgi_temp_path tmp/scgi;
+
+    map $http_upgrade $connection_upgrade {{
+        default upgrade;
+        '' close;
+    }}
+
+    upstream baac_workers {{
+        ip_hash;
+{servers}
+    }}
+
+    server {{
+        listen {port};
+        client_max_body_size 200m;
+
+        # Fichiers publiés par static_assets.py : URL versionnées par contenu
+        location /app/static/ {{
+            alias {static_dir}/;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }}
+
+        # Exports du scoring par lots (cf. batch_scoring.py) : éphémères
+        location /app/static/exports/ {{
+            alias {static_dir}/exports/;
+            add_header Cache-Control "no-store";
+            add_header Content-Disposition "attachment";
+        }}
+
+        location / {{
+            proxy_pass http://baac_workers;
+            proxy_http_version 1.1;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection $connection_upgrade;
+            proxy_set_header Host $host;
+            proxy_read_timeout 86400;
+            proxy_buffering off;
+        }}
+    }}
+}}
+"""
+
+
+def worker_ports(workers, base_port=DEFAULT_BASE_PORT):
+    return [base_port + i for i in range(workers)]
+
+
+def write_nginx_conf(ports, port=DEFAULT_PORT, path=NGINX_CONF):
+    """Écrit la configuration nginx du répartiteur et renvoie son chemin."""
+    os.makedirs(os.path.join(os.path.dirname(path), "tmp"), exist_ok=True)
+    servers = "\n".join(f"        server 127.0.0.1:{p};" for p in ports)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(NGINX_TEMPLATE.format(workers=len(ports), servers=servers, port=port,
+                                      static_dir=STATIC_DIR))
+    return path
+
+
+# =========================
+# PRÉPARATION (une fois, avant les workers)
+# =========================
+
+def prepare(shared_dir=DEFAULT_SHARED_DIR):
+    """Publie les fichiers statiques et construit les cubes partagés.
+
+    Renvoie la liste des chemins référencés par les pages mais absents.
+    """
+    os.environ["BAAC_SHARED_CACHE_DIR"] = shared_dir
+    import batch_scoring
+    import eda_cube
+    import geo_pipeline
+    import hexbin
+    import image_pyramid
+    import shared_cache
+    import site_pages
+    import spatial_index
+    import site_pages.eda
+    from artifact_manifest import get_manifest
+    from static_assets import publish
+
+    manifest = get_manifest()
+    missing = [p for paths in site_pages.referenced_artifacts().values() for p in manifest.validate(paths)]
+
+    for path in sorted(glob.glob(os.path.join(INPUT_DIR, "*.png"))):
+        image_pyramid.variants(path)
+        publish(path, os.path.join("img", "full", os.path.basename(path)))
+    publish(site_pages.eda.EDA_PDF_PATH)
+    if geo_pipeline.load_topology() is not None:
+        for level in geo_pipeline.LEVELS:
+            geo_pipeline.geojson_url(level)
+
+    # Cubes projetés en mémoire par les workers
+    cube = hexbin.load_cube()
+    if cube is not None:
+        for resolution in cube.resolutions:
+            hexbin.cells_geojson_url(resolution)
+    eda_cube.load_cube()
+    spatial_index.load_dep_index()
+    batch_scoring.prune_exports()
+    shared_cache.prune({e["sha256"] for e in manifest.as_dict().values()})
+    return missing
+
+
+# =========================
+# WORKERS
+# =========================
+
+def _spawn(port, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH,
+         "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.headless", "true"],
+        cwd=BASE_DIR, env=env,
+    )
+
+
+def wait_healthy(ports, timeout=HEALTH_TIMEOUT_S):
+    """Attend que chaque port réponde sur /_stcore/health ; renvoie les ports prêts."""
+    deadline = time.monotonic() + timeout
+    pending = set(ports)
+    while pending and time.monotonic() < deadline:
+        for port in sorted(pending):
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                    if r.status == 200:
+                        pending.discard(port)
+            except OSError:
+                pass
+        if pending:
+            time.sleep(0.5)
+    return [p for p in ports if p not in pending]
+
+
+def run(workers, port=DEFAULT_PORT, base_port=DEFAULT_BASE_PORT, cache_mb=DEFAULT_CACHE_MB,
+        shared_dir=DEFAULT_SHARED_DIR, lb="nginx"):
+    """Lance et supervise les workers (et nginx) jusqu'à SIGINT / SIGTERM."""
+    missing = prepare(shared_dir)
+    for path in missing:
+        print(f"Fichier référencé absent : {os.path.relpath(path, BASE_DIR)}")
+
+    env = dict(os.environ)
+    env["BAAC_SHARED_CACHE_DIR"] = shared_dir
+    env["BAAC_ASSET_CACHE_MB"] = f"{cache_mb / workers:g}"
+    ports = worker_ports(workers, base_port)
+    procs = {p: _spawn(p, env) for p in ports}
+
+    nginx = None
+    if lb == "nginx":
+        conf = write_nginx_conf(ports, port)
+        exe = shutil.which("nginx")
+        if exe is None:
+            print(f"nginx introuvable : configuration écrite dans {conf}")
+        else:
+            nginx = subprocess.Popen([exe, "-p", RUN_DIR, "-c", conf, "-g", "daemon off;"])
+
+    stopping = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.append(True))
+
+    ready = wait_healthy(ports)
+    entry = f"http://127.0.0.1:{port}" if nginx is not None else ", ".join(
+        f"http://127.0.0.1:{p}" for p in ready)
+    print(f"{len(ready)}/{workers} worker(s) prêt(s) : {entry}", flush=True)
+
+    try:
+        while not stopping:
+            time.sleep(1)
+            for p, proc in procs.items():
+                if proc.poll() is not None and not stopping:
+                    print(f"Worker {p} arrêté (code {proc.returncode}), relance", flush=True)
+                    procs[p] = _spawn(p, env)
+            if nginx is not None and nginx.poll() is not None:
+                print(f"nginx arrêté (code {nginx.returncode})", flush=True)
+                break
+    finally:
+        children = list(procs.values()) + ([nginx] if nginx is not None else [])
+        for proc in children:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in children:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["prepare", "run", "nginx"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port du répartiteur")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT, help="port du 1er worker")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_MB,
+                        help="budget total du cache d'assets, réparti entre les workers")
+    parser.add_argument("--shared-dir", default=DEFAULT_SHARED_DIR)
+    parser.add_argument("--lb", choices=["nginx", "none"], default="nginx")
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        t0 = time.perf_counter()
+        missing = prepare(args.shared_dir)
+        for path in missing:
+            print(f"Fichier référencé absent : {os.path.relpath(path, BASE_DIR)}")
+        print(f"Artefacts partagés prêts en {time.perf_counter() - t0:.1f} s ({args.shared_dir})")
+        return 0
+    if args.command == "nginx":
+        print(write_nginx_conf(worker_ports(args.workers, args.base_port), args.port))
+        return 0
+    return run(args.workers, args.port, args.base_port, args.cache_mb, args.shared_dir, args.lb)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
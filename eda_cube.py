@@ -0,0 +1,241 @@
+"""Cube d'agrégats pour les graphes EDA double-axes (nombre + taux mortels).
+
+Le cube stocke (n_acc, n_mort) pour chaque combinaison non vide des
+variables catégorielles (`catr`, `lum`, `col`, `agg`, `atm`, tranche d'âge
+moyen), de l'année et du département, en Parquet compact (codes int8).
+Une variable ou un croisement de deux variables, filtré par années et
+départements, s'obtient par roll-up (`np.bincount` sur les codes) en
+quelques ms :
+
+    cube = load_cube()
+    cube.query(["catr"], years=(2019, 2023), deps=["59", "62"])
+
+Construction depuis le magasin de variables (cf. feature_pipeline.py) ou
+une table accident :
+
+    python eda_cube.py build
+    python eda_cube.py build accidents.parquet
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import shared_cache
+from asset_cache import get_cache
+
+BASE_DIR = os.path.dirname(__file__)
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+CUBE_PATH = os.path.join(INPUT_DIR, "eda_cube.parquet")
+
+MISSING_LABEL = "Non renseigné"
+
+# Variables du cube et libellés des codes BAAC
+DIMENSIONS = {
+    "catr": "Catégorie de route",
+    "lum": "Luminosité",
+    "col": "Type de collision",
+    "agg": "Agglomération",
+    "atm": "Conditions atmosphériques",
+    "age": "Âge moyen des usagers",
+}
+LABELS = {
+    "catr": {
+        1: "Autoroute", 2: "Route nationale", 3: "Route départementale",
+        4: "Voie communale", 5: "Hors réseau public", 6: "Parc de stationnement",
+        7: "Route de métropole urbaine", 9: "Autre",
+    },
+    "lum": {
+        1: "Plein jour", 2: "Crépuscule ou aube", 3: "Nuit sans éclairage",
+        4: "Nuit, éclairage non allumé", 5: "Nuit, éclairage allumé",
+    },
+    "col": {
+        1: "2 véh. – frontale", 2: "2 véh. – par l’arrière", 3: "2 véh. – par le côté",
+        4: "3 véh. et + – en chaîne", 5: "3 véh. et + – multiples", 6: "Autre collision",
+        7: "Sans collision",
+    },
+    "agg": {1: "Hors agglomération", 2: "En agglomération"},
+    "atm": {
+        1: "Normale", 2: "Pluie légère", 3: "Pluie forte", 4: "Neige – grêle",
+        5: "Brouillard – fumée", 6: "Vent fort – tempête", 7: "Temps éblouissant",
+        8: "Temps couvert", 9: "Autre",
+    },
+}
+# Tranches d'âge moyen des usagers impliqués
+AGE_EDGES = [0, 18, 25, 35, 45, 55, 65, 75, 200]
+LABELS["age"] = {
+    i: (f"{a}–{b - 1} ans" if b < 200 else f"{a} ans et +")
+    for i, (a, b) in enumerate(zip(AGE_EDGES[:-1], AGE_EDGES[1:]))
+}
+
+
+def age_band(age):
+    """Code de tranche d'âge (-1 si âge manquant)."""
+    age = np.asarray(age, dtype=float)
+    band = np.searchsorted(AGE_EDGES, age, side="right") - 1
+    return np.where(np.isnan(age) | (band < 0), -1, band).astype(np.int8)
+
+
+def build_cube(df):
+    """Agrégats (n_acc, n_mort) par combinaison non vide des dimensions.
+
+    `df` : une ligne par accident avec les colonnes de DIMENSIONS (sauf
+    `age`, dérivé de `age_moy`), `an`, `dep` et `is_mortel`.
+    """
+    keys = pd.DataFrame({
+        d: pd.to_numeric(df[d], errors="coerce").fillna(-1).astype(np.int8)
+        for d in DIMENSIONS if d != "age"
+    })
+    keys["age"] = age_band(df["age_moy"])
+    keys["an"] = pd.to_numeric(df["an"]).astype(np.int16)
+    keys["dep"] = df["dep"].astype(str)
+    keys["is_mortel"] = pd.to_numeric(df["is_mortel"]).astype(np.int32)
+    cube = (
+        keys.groupby(list(DIMENSIONS) + ["an", "dep"], observed=True)["is_mortel"]
+        .agg(n_acc="size", n_mort="sum")
+        .reset_index()
+    )
+    return cube.astype({"n_acc": np.int32, "n_mort": np.int32})
+
+
+def _cube_arrays(df):
+    """Tableaux du cube (pour EdaCube / shared_cache) et méta-données."""
+    dep = df["dep"].astype("category")
+    arrays = {
+        "dep": dep.cat.codes.to_numpy(),
+        "an": df["an"].to_numpy(),
+        "n_acc": df["n_acc"].to_numpy(),
+        "n_mort": df["n_mort"].to_numpy(),
+    }
+    for d in DIMENSIONS:
+        arrays[f"values.{d}"], arrays[f"codes.{d}"] = np.unique(df[d].to_numpy(), return_inverse=True)
+    meta = {
+        "dep_labels": [str(d) for d in dep.cat.categories],
+        "years": sorted(int(a) for a in np.unique(df["an"])),
+    }
+    return arrays, meta
+
+
+class EdaCube:
+    """Cube EDA (tableaux NumPy, en mmap en mode partagé) et roll-ups filtrés."""
+
+    def __init__(self, arrays, meta):
+        self.dep_labels = np.asarray(meta["dep_labels"], dtype=object)
+        self._dep = arrays["dep"]
+        self._an = arrays["an"]
+        self._n_acc = arrays["n_acc"]
+        self._n_mort = arrays["n_mort"]
+        self._codes = {d: arrays[f"codes.{d}"] for d in DIMENSIONS}
+        self._values = {d: arrays[f"values.{d}"] for d in DIMENSIONS}
+        self.years = meta["years"]
+        self.departements = list(meta["dep_labels"])
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(*_cube_arrays(df))
+
+    def _mask(self, years=None, deps=None):
+        mask = np.ones(len(self._n_acc), dtype=bool)
+        if years is not None:
+            mask &= (self._an >= years[0]) & (self._an <= years[1])
+        if deps:
+            codes = np.flatnonzero(np.isin(self.dep_labels, list(deps)))
+            mask &= np.isin(self._dep, codes)
+        return mask
+
+    def query(self, dims, years=None, deps=None):
+        """Roll-up sur une ou deux variables : DataFrame (libellés, n_acc, n_mort, taux).
+
+        `years` : (début, fin) inclus ; `deps` : liste de codes département.
+        """
+        mask = self._mask(years, deps)
+        shape = tuple(len(self._values[d]) for d in dims)
+        flat = np.ravel_multi_index(tuple(self._codes[d][mask] for d in dims), shape)
+        size = int(np.prod(shape))
+        n_acc = np.bincount(flat, weights=self._n_acc[mask], minlength=size)
+        n_mort = np.bincount(flat, weights=self._n_mort[mask], minlength=size)
+        idx = np.flatnonzero(n_acc)
+        out = pd.DataFrame({
+            d: [LABELS[d].get(int(v), MISSING_LABEL if v == -1 else str(v)) for v in self._values[d][pos]]
+            for d, pos in zip(dims, np.unravel_index(idx, shape))
+        })
+        out["n_acc"] = n_acc[idx].astype(np.int64)
+        out["n_mort"] = n_mort[idx].astype(np.int64)
+        out["taux"] = 100.0 * out["n_mort"] / out["n_acc"]
+        return out
+
+
+def _load_cube(path):
+    return EdaCube(*shared_cache.arrays(path, "eda", lambda p: _cube_arrays(pd.read_parquet(p))))
+
+
+def load_cube(path=CUBE_PATH):
+    """Cube EDA (mis en cache), None s'il n'a pas été construit."""
+    return get_cache().get(path, "eda:cube", _load_cube)
+
+
+# =========================
+# FIGURES
+# =========================
+
+def double_axis_figure(table, dim, height=480):
+    """Barres = nombre d'accidents, courbe = taux d'accidents mortels (%)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_bar(x=table[dim], y=table["n_acc"], name="Accidents", marker_color="#9ecae1")
+    fig.add_scatter(
+        x=table[dim], y=table["taux"], name="Taux mortels (%)", yaxis="y2",
+        mode="lines+markers", line=dict(color="#c0392b"),
+        customdata=table["n_mort"], hovertemplate="%{y:.2f} % (%{customdata} mortels)",
+    )
+    fig.update_layout(
+        height=height, margin=dict(l=10, r=10, t=40, b=10),
+        title=DIMENSIONS[dim], xaxis=dict(type="category"),
+        yaxis=dict(title="Nombre d’accidents"),
+        yaxis2=dict(title="Taux mortels (%)", overlaying="y", side="right", rangemode="tozero"),
+        legend=dict(orientation="h", y=1.1), template="plotly_white",
+    )
+    return fig
+
+
+def cross_figure(table, dim_x, dim_y, height=520):
+    """Croisement de deux variables : couleur = taux mortels, survol = effectifs."""
+    import plotly.graph_objects as go
+
+    taux = table.pivot(index=dim_y, columns=dim_x, values="taux")
+    n_acc = table.pivot(index=dim_y, columns=dim_x, values="n_acc").reindex_like(taux)
+    fig = go.Figure(go.Heatmap(
+        z=taux.to_numpy(), x=list(taux.columns), y=list(taux.index),
+        customdata=n_acc.to_numpy(), colorscale="Reds",
+        colorbar=dict(title="Taux mortels (%)"),
+        hovertemplate="%{x} × %{y}<br>%{z:.2f} % sur %{customdata} accidents<extra></extra>",
+    ))
+    fig.update_layout(
+        height=height, margin=dict(l=10, r=10, t=40, b=10),
+        title=f"{DIMENSIONS[dim_x]} × {DIMENSIONS[dim_y]}",
+        xaxis=dict(type="category"), yaxis=dict(type="category"),
+    )
+    return fig
+
+
+def main(argv):
+    if not argv or argv[0] != "build" or len(argv) > 2:
+        print(__doc__)
+        return 1
+    if len(argv) == 2:
+        src = argv[1]
+        df = pd.read_parquet(src) if src.endswith(".parquet") else pd.read_csv(src, sep=None, engine="python")
+    else:
+        from feature_pipeline import FeatureStore
+
+        df = FeatureStore().load(columns=list(DIMENSIONS)[:-1] + ["age_moy", "an", "dep", "is_mortel"])
+    cube = build_cube(df)
+    cube.to_parquet(CUBE_PATH, index=False)
+    print(f"{CUBE_PATH}: {len(cube)} combinaisons, {os.path.getsize(CUBE_PATH) / 1024:.0f} Ko")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
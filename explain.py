@@ -0,0 +1,237 @@
+"""Explications SHAP à la demande pour les best modèles LGBM.
+
+Les valeurs TreeSHAP sont calculées par LightGBM lui-même
+(`booster.predict(pred_contrib=True)`, sans dépendance `shap`) sur un
+sous-ensemble filtré du magasin de variables (départements, agglomération,
+années), découpé en blocs répartis sur les cœurs.
+
+Quand le magasin de modèles (cf. model_store.py) contient les SHAP de tout
+le magasin de variables, un filtre sans années n'est qu'une sélection de
+lignes dans ses tableaux projetés en mémoire, sans TreeSHAP.
+
+Les matrices SHAP sont gardées dans le cache du processus (cf.
+asset_cache.py), clé = fichier modèle (sa signature fait office de version)
++ filtre : un second affichage du même filtre est immédiat, et un nouveau
+modèle invalide ses entrées. L'échantillon de référence (sans filtre) est
+précalculé en tâche de fond au premier accès.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import model_store
+import scoring
+from asset_cache import artifact_signature, get_cache
+from feature_pipeline import FeatureStore
+
+# Taille max d'un sous-ensemble expliqué (échantillon déterministe au-delà)
+MAX_ROWS = 5_000
+CHUNK_ROWS = 2_000
+N_WORKERS = os.cpu_count() or 1
+SAMPLE_SEED = 0
+
+_warming = set()
+_key_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _split(model):
+    """(prétraitement ou None, estimateur LGBM final)."""
+    if hasattr(model, "steps"):
+        pre = model[:-1] if len(model.steps) > 1 else None
+        return pre, model.steps[-1][1]
+    return None, model
+
+
+def _filter_key(deps=None, agg=None, years=None):
+    return repr((tuple(sorted(deps or ())), agg, tuple(years) if years else None))
+
+
+def load_subset(deps=None, agg=None, years=None, max_rows=MAX_ROWS):
+    """Accidents du filtre (au plus `max_rows`, échantillon reproductible)."""
+    df = FeatureStore().load(years=years)
+    if df.empty:
+        return df
+    if deps:
+        df = df[df["dep"].isin(list(deps))]
+    if agg is not None:
+        df = df[df["agg"] == agg]
+    if len(df) > max_rows:
+        df = df.sample(max_rows, random_state=SAMPLE_SEED)
+    return df.reset_index(drop=True)
+
+
+def tree_shap(model, X, n_workers=N_WORKERS, chunk_rows=CHUNK_ROWS):
+    """Contributions TreeSHAP (log-odds) : (valeurs n × p, valeur de base, noms)."""
+    pre, clf = _split(model)
+    names = list(X.columns)
+    if pre is not None:
+        X = pre.transform(X)
+        if hasattr(pre, "get_feature_names_out"):
+            names = [str(n) for n in pre.get_feature_names_out()]
+    booster = clf.booster_
+    chunks = [X[i:i + chunk_rows] for i in range(0, len(X), chunk_rows)] or [X]
+
+    def contrib(chunk):
+        return booster.predict(chunk, pred_contrib=True, num_threads=1)
+
+    with ThreadPoolExecutor(max_workers=min(n_workers, len(chunks))) as pool:
+        out = np.vstack(list(pool.map(contrib, chunks)))
+    values = out[:, :-1].astype(np.float32)
+    base = float(out[0, -1]) if len(out) else 0.0
+    return values, base, names
+
+
+class Explanation:
+    """SHAP d'un sous-ensemble : matrice, valeur de base et données expliquées."""
+
+    def __init__(self, values, base, names, data):
+        self.values = values
+        self.base = base
+        self.names = names
+        self.data = data
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + int(self.data.memory_usage(deep=True).sum())
+
+    def importance(self):
+        """|SHAP| moyen par variable, trié décroissant."""
+        return (
+            pd.Series(np.abs(self.values).mean(axis=0), index=self.names)
+            .sort_values(ascending=False)
+        )
+
+    def row(self, i):
+        """Contributions d'un accident, triées par |SHAP| décroissant."""
+        s = pd.Series(self.values[i], index=self.names)
+        return s.reindex(s.abs().sort_values(ascending=False).index)
+
+
+def explain(scenario, deps=None, agg=None, years=None):
+    """Explication SHAP du filtre pour le best modèle du scénario (mise en cache).
+
+    None si le modèle ou le magasin de variables manque.
+    """
+    scorer = scoring.get_scorer(scenario)
+    if scorer is None:
+        return None
+
+    # SHAP précalculés : sans filtre d'années (le taux départemental de S1
+    # dépend de la fenêtre) et sur la version courante des variables
+    feature_store = FeatureStore()
+    stored = None
+    if scorer.store is not None and years is None:
+        stored = model_store.open_store(scoring.MODEL_DIR, scenario, scorer.store.meta["variant"],
+                                        feature_store=feature_store)
+
+    def compute(_path):
+        if stored is not None and stored.arrays is not None:
+            idx = stored.select(deps=deps, agg=agg, max_rows=MAX_ROWS, seed=SAMPLE_SEED)
+            if not len(idx):
+                return None
+            return Explanation(np.asarray(stored.arrays["shap"][idx]), stored.base,
+                               list(stored.features), stored.frame(idx))
+        data = load_subset(deps=deps, agg=agg, years=years)
+        if data.empty:
+            return None
+        values, base, names = tree_shap(scorer.model, data[scorer.features])
+        return Explanation(values, base, names, data[scorer.features])
+
+    if stored is not None:
+        kind = f"shap:store:{_filter_key(deps, agg, years)}"
+    else:
+        # Calcul direct : dépend aussi de la version des variables
+        kind = f"shap:live:{model_store.features_version(feature_store)}:{_filter_key(deps, agg, years)}"
+    if artifact_signature(scorer.source) is None:
+        return compute(scorer.source)
+    with _locks_lock:
+        lock = _key_locks.setdefault((scenario, kind), threading.Lock())
+    # Un même filtre demandé par plusieurs sessions n'est calculé qu'une fois
+    with lock:
+        return get_cache().get(
+            scorer.source, kind, compute,
+            cost=lambda e: 0 if e is None else e.nbytes,
+        )
+
+
+def warm(scenario):
+    """Précalcule en tâche de fond l'explication sans filtre (échantillon de référence)."""
+    with _locks_lock:
+        if scenario in _warming:
+            return
+        _warming.add(scenario)
+    threading.Thread(target=explain, args=(scenario,), daemon=True).start()
+
+
+# =========================
+# FIGURES
+# =========================
+
+def importance_figure(expl, top=15, height=500):
+    """Barres |SHAP| moyen (équivalent du SHAP bar)."""
+    import plotly.graph_objects as go
+
+    imp = expl.importance().head(top)[::-1]
+    fig = go.Figure(go.Bar(x=imp.values, y=imp.index, orientation="h", marker_color="#c0392b"))
+    fig.update_layout(
+        height=height, margin=dict(l=10, r=10, t=30, b=10),
+        xaxis_title="|SHAP| moyen (log-odds)",
+    )
+    return fig
+
+
+def beeswarm_figure(expl, top=15, max_points=2_000, height=600):
+    """Nuage SHAP par variable, couleur = valeur de la variable (rang normalisé)."""
+    import plotly.graph_objects as go
+
+    order = list(expl.importance().head(top).index)
+    rng = np.random.default_rng(SAMPLE_SEED)
+    idx = rng.choice(len(expl.values), size=min(max_points, len(expl.values)), replace=False)
+    xs, ys, cs, texts = [], [], [], []
+    for k, name in enumerate(reversed(order)):
+        j = expl.names.index(name)
+        # Colonne SHAP après prétraitement : couleur seulement si elle porte
+        # exactement le nom d'une variable d'origine (pas de one-hot, etc.)
+        if name in expl.data.columns:
+            col = expl.data[name].iloc[idx]
+            rank = pd.to_numeric(col, errors="coerce").rank(pct=True).to_numpy()
+            texts.append([f"{name} = {v}" for v in col.to_numpy()])
+        else:
+            rank = np.full(len(idx), np.nan)
+            texts.append([name] * len(idx))
+        xs.append(expl.values[idx, j])
+        ys.append(k + rng.uniform(-0.3, 0.3, len(idx)))
+        cs.append(rank)
+    fig = go.Figure(go.Scattergl(
+        x=np.concatenate(xs), y=np.concatenate(ys), mode="markers",
+        text=np.concatenate(texts), hoverinfo="text+x",
+        marker=dict(size=4, color=np.concatenate(cs), colorscale="Bluered", opacity=0.6,
+                    colorbar=dict(title="valeur", tickvals=[0, 1], ticktext=["faible", "élevée"])),
+    ))
+    fig.update_layout(
+        height=height, margin=dict(l=10, r=10, t=30, b=10), xaxis_title="SHAP (log-odds)",
+        yaxis=dict(tickvals=list(range(len(order))), ticktext=list(reversed(order))),
+    )
+    return fig
+
+
+def force_figure(expl, i, top=12, height=450):
+    """Cascade des contributions d'un accident, de la valeur de base au score."""
+    import plotly.graph_objects as go
+
+    contrib = expl.row(i)
+    head, rest = contrib.head(top), contrib.iloc[top:].sum()
+    labels = [f"{n} = {expl.data.iloc[i][n]}" if n in expl.data else n for n in head.index]
+    measures = ["absolute"] + ["relative"] * len(head) + (["relative"] if len(contrib) > top else []) + ["total"]
+    x = ["base"] + labels + (["autres"] if len(contrib) > top else []) + ["score"]
+    y = [expl.base] + list(head.values) + ([rest] if len(contrib) > top else []) + [0]
+    fig = go.Figure(go.Waterfall(
+        orientation="v", measure=measures, x=x, y=y,
+        increasing=dict(marker_color="#c0392b"), decreasing=dict(marker_color="#2874a6"),
+    ))
+    fig.update_layout(height=height, margin=dict(l=10, r=10, t=30, b=10), yaxis_title="log-odds")
+    return fig
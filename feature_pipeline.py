@@ -0,0 +1,371 @@
+"""Construction incrémentale des variables explicatives niveau accident.
+
+Variables (cf. page Accueil) : contexte de l'accident (entrepôt BAAC, cf.
+baac_store.py), profil des usagers (âge moyen / min / max, `pct_hommes`,
+nombre d'usagers, de conducteurs, de piétons) et, pour S1,
+`taux_mortels_dep_feature`.
+
+Plutôt que de tout recalculer sur 2015–2023, on garde un état par année :
+
+- `an=YYYY/part.parquet` : variables des accidents de l'année ;
+- `state_dep.parquet` : comptes (accidents, mortels) par année × département ;
+- `manifest.json` : signature des fichiers bruts déjà traités.
+
+Une nouvelle année publiée ne relit que ses propres fichiers Usagers /
+Caractéristiques ; le taux départemental est recalculé depuis les comptes
+agrégés (quelques centaines de lignes) et joint à la lecture. Un accident
+sans département (ex. brut, à scorer) le reçoit d'après ses coordonnées ;
+sur demande, un taux de voisinage (accidents dans un rayon, lissé vers le
+taux départemental) affine la variable (cf. spatial_index.py) :
+
+    python feature_pipeline.py update 2024
+    python feature_pipeline.py status
+"""
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+import spatial_index
+from asset_cache import file_signature, get_cache
+from baac_store import (
+    BASE_DIR,
+    RAW_DIR,
+    RAW_TABLES,
+    BaacStore,
+    _parse_years,
+    find_raw_file,
+    ingest_year,
+    read_raw_csv,
+    read_raw_year,
+)
+
+FEATURE_DIR = os.environ.get("BAAC_FEATURE_DIR", os.path.join(BASE_DIR, "data", "features"))
+
+# Codes BAAC de la table Usagers
+CATU_CONDUCTEUR = 1
+CATU_PIETON = 3
+SEXE_HOMME = 1
+
+USAGER_FEATURES = [
+    "age_moy", "age_min", "age_max", "pct_hommes",
+    "n_usagers", "nb_conducteurs", "nb_pietons",
+]
+DEP_RATE_FEATURE = "taux_mortels_dep_feature"
+NEIGHBOURHOOD_FEATURE = "taux_mortels_voisinage_feature"
+
+# Lissage du taux départemental vers le taux national (pseudo-accidents)
+DEP_RATE_PRIOR = 200
+
+
+# =========================
+# VARIABLES D'UNE ANNÉE
+# =========================
+
+def usager_features(usagers, year):
+    """Profil des usagers agrégé par accident (une ligne par `Num_Acc`).
+
+    Le nombre d'usagers (`n_usagers`) est déjà dans l'entrepôt.
+    """
+    an_nais = pd.to_numeric(usagers["an_nais"], errors="coerce")
+    age = (year - an_nais).where(lambda a: (a >= 0) & (a <= 110))
+    catu = pd.to_numeric(usagers["catu"], errors="coerce")
+    sexe = pd.to_numeric(usagers["sexe"], errors="coerce")
+    u = pd.DataFrame({
+        "Num_Acc": usagers["Num_Acc"].astype(str),
+        "age": age.astype("float32"),
+        "homme": (sexe == SEXE_HOMME).astype(np.float32).where(sexe.isin([1, 2])),
+        "conducteur": (catu == CATU_CONDUCTEUR).astype(np.int16),
+        "pieton": (catu == CATU_PIETON).astype(np.int16),
+    })
+    out = u.groupby("Num_Acc").agg(
+        age_moy=("age", "mean"),
+        age_min=("age", "min"),
+        age_max=("age", "max"),
+        pct_hommes=("homme", "mean"),
+        nb_conducteurs=("conducteur", "sum"),
+        nb_pietons=("pieton", "sum"),
+    )
+    out["pct_hommes"] = 100.0 * out["pct_hommes"]
+    out = out.astype({
+        "age_moy": "float32", "age_min": "float32", "age_max": "float32",
+        "pct_hommes": "float32", "nb_conducteurs": np.int16, "nb_pietons": np.int16,
+    })
+    return out.reset_index()
+
+
+def year_features(year, raw_dir=RAW_DIR, store=None, acc=None, usagers=None):
+    """Variables niveau accident d'une année (contexte + usagers).
+
+    Le contexte vient de l'entrepôt BAAC ; l'année y est ingérée si besoin.
+    `acc` (contexte fusionné) et `usagers` (table brute) évitent de relire
+    ce qui vient d'être ingéré.
+    """
+    if acc is None:
+        store = store or BaacStore()
+        if not store.exists() or year not in store.years:
+            acc = ingest_year(year, raw_dir=raw_dir, store=store)
+        else:
+            acc = store.scan(
+                [f.name for f in store.dataset.schema if f.name != "an"], years=(year, year),
+            )
+    acc = acc.drop(columns=["an"], errors="ignore")
+    if usagers is None:
+        path = find_raw_file("usagers", year, raw_dir)
+        if path is None:
+            raise FileNotFoundError(f"Fichier usagers {year} introuvable dans {raw_dir}")
+        usagers = read_raw_csv(path)
+    users = usager_features(usagers, year)
+    acc = acc.merge(users, on="Num_Acc", how="left")
+    acc.insert(1, "an", np.int16(year))
+    return acc
+
+
+def dep_counts(features):
+    """Comptes (accidents, mortels) par année × département."""
+    return (
+        features.groupby(["an", "dep"], observed=True)["is_mortel"]
+        .agg(n_total="size", n_mortels="sum")
+        .reset_index()
+    )
+
+
+def dep_rate(state, years=None, prior=DEP_RATE_PRIOR):
+    """Taux d'accidents mortels (%) par département, lissé vers le taux national.
+
+    `years` : (début, fin) inclus pour restreindre la fenêtre (ex. années
+    d'entraînement) ; toutes les années de l'état par défaut.
+    """
+    if years is not None:
+        state = state[(state["an"] >= years[0]) & (state["an"] <= years[1])]
+    dep = state.groupby("dep")[["n_total", "n_mortels"]].sum()
+    national = dep["n_mortels"].sum() / max(dep["n_total"].sum(), 1)
+    rate = (dep["n_mortels"] + prior * national) / (dep["n_total"] + prior)
+    return (100.0 * rate).astype("float32").rename(DEP_RATE_FEATURE).reset_index()
+
+
+def dep_codes(dep):
+    """Codes département en texte, comme dans le magasin (1, "1", 1.0 -> "01" ; "2A" inchangé)."""
+    dep = dep.astype(object)
+    codes = dep.where(dep.isna(), dep.astype(str).str.strip())
+    num = pd.to_numeric(codes, errors="coerce")
+    whole = (num.notna() & (num % 1 == 0)).to_numpy()
+    codes[whole] = num[whole].astype("int64").astype(str).str.zfill(2)
+    return codes
+
+
+def assign_dep(df):
+    """Complète `dep` (absent ou vide) d'après `lat` / `long` ; renvoie une copie.
+
+    Les points hors des départements métropolitains gardent leur valeur.
+    """
+    if "dep" in df and not pd.api.types.is_string_dtype(df["dep"]):
+        df = df.assign(dep=dep_codes(df["dep"]))
+    if "lat" not in df or "long" not in df:
+        return df
+    dep = df["dep"] if "dep" in df else pd.Series(None, index=df.index, dtype=object)
+    missing = (dep.isna() | (dep == "")).to_numpy()
+    if not missing.any():
+        return df
+    index = spatial_index.load_dep_index()
+    if index is None:
+        return df
+    sub = df.loc[missing]
+    dep = dep.astype(object).copy()
+    dep[missing] = index.lookup(
+        pd.to_numeric(sub["long"], errors="coerce"), pd.to_numeric(sub["lat"], errors="coerce"),
+    )
+    df = df.copy()
+    df["dep"] = dep
+    return df
+
+
+def add_dep_rate(df, state, years=None):
+    """`df` + `taux_mortels_dep_feature` (département déduit des coordonnées si besoin).
+
+    ValueError si l'état ne couvre aucune année (magasin vide) : le taux
+    serait NaN partout.
+    """
+    df = assign_dep(df)
+    if "dep" not in df:
+        return df
+    if state.empty:
+        raise ValueError("Magasin de variables vide : taux départemental indisponible "
+                         "(python feature_pipeline.py update <année>)")
+    return df.drop(columns=[DEP_RATE_FEATURE], errors="ignore").merge(
+        dep_rate(state, years=years), on="dep", how="left",
+    )
+
+
+def add_neighbourhood_rate(df, store, radius_km=spatial_index.DEFAULT_RADIUS_KM, years=None):
+    """`df` + taux d'accidents mortels (%) dans un rayon de `radius_km`.
+
+    Comptes sur les accidents du magasin de la fenêtre `years`, sans
+    l'accident lui-même ; lissés vers `taux_mortels_dep_feature` s'il est
+    présent, sinon vers le taux de la fenêtre.
+    """
+    index = spatial_index.load_accident_index(store, years=years)
+    df = df.copy()
+    if index is None:
+        df[NEIGHBOURHOOD_FEATURE] = np.float32(np.nan)
+        return df
+    own = pd.Series(np.nan, index=df.index)
+    if "is_mortel" in df and "an" in df:
+        indexed = df["an"].between(*years) if years is not None else pd.Series(True, index=df.index)
+        own = df["is_mortel"].astype(float).where(indexed)
+    prior_rate = df[DEP_RATE_FEATURE].to_numpy(dtype=float) / 100 if DEP_RATE_FEATURE in df else None
+    rate = index.rates(
+        pd.to_numeric(df["long"], errors="coerce"), pd.to_numeric(df["lat"], errors="coerce"),
+        radius_km, prior_rate=prior_rate, exclude=own.to_numpy(),
+    )
+    df[NEIGHBOURHOOD_FEATURE] = (100.0 * rate).astype("float32")
+    return df
+
+
+# =========================
+# MAGASIN DE VARIABLES
+# =========================
+
+class FeatureStore:
+    """Variables par année (Parquet) + état agrégé par département."""
+
+    def __init__(self, root=FEATURE_DIR):
+        self.root = root
+
+    # ---------- état ----------
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, "manifest.json")
+
+    @property
+    def _state_path(self):
+        return os.path.join(self.root, "state_dep.parquet")
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_manifest(self, manifest):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def state(self):
+        """Comptes par année × département (vide si rien n'est construit)."""
+        if not os.path.exists(self._state_path):
+            return pd.DataFrame(columns=["an", "dep", "n_total", "n_mortels"])
+        return pd.read_parquet(self._state_path)
+
+    def cached_state(self):
+        """`state()` gardé dans le cache du processus, invalidé par le manifeste."""
+        state = get_cache().get(self.manifest_path, "features:state", lambda _p: self.state(),
+                                cost=lambda s: int(s.memory_usage(deep=True).sum()))
+        return self.state() if state is None else state
+
+    @property
+    def years(self):
+        return sorted(int(y) for y in self.manifest())
+
+    # ---------- mise à jour ----------
+    @staticmethod
+    def raw_signature(year, raw_dir=RAW_DIR):
+        """Signature des fichiers bruts d'une année (détecte une republication)."""
+        sig = {}
+        for table in RAW_TABLES:
+            path = find_raw_file(table, year, raw_dir)
+            sig[table] = None if path is None else list(file_signature(path))
+        return sig
+
+    def is_current(self, year, raw_dir=RAW_DIR):
+        return self.manifest().get(str(year)) == self.raw_signature(year, raw_dir)
+
+    def update_year(self, year, raw_dir=RAW_DIR, store=None, force=False):
+        """Traite une année si ses fichiers bruts sont nouveaux ou modifiés.
+
+        Renvoie le nombre d'accidents écrits, ou None si l'année était à jour.
+        """
+        if not force and self.is_current(year, raw_dir):
+            return None
+        # Fichiers bruts nouveaux ou republiés : la partition de l'entrepôt suit
+        store = store or BaacStore()
+        raw = read_raw_year(year, raw_dir)
+        acc = ingest_year(year, raw_dir=raw_dir, store=store, raw=raw)
+        features = year_features(year, acc=acc, usagers=raw["usagers"])
+
+        os.makedirs(self.root, exist_ok=True)
+        part_dir = os.path.join(self.root, f"an={year}")
+        tmp_dir = part_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        features.to_parquet(os.path.join(tmp_dir, "part.parquet"), index=False)
+        shutil.rmtree(part_dir, ignore_errors=True)
+        os.replace(tmp_dir, part_dir)
+
+        state = self.state()
+        state = pd.concat(
+            [state[state["an"] != year], dep_counts(features)], ignore_index=True,
+        ).sort_values(["an", "dep"])
+        state.to_parquet(self._state_path, index=False)
+
+        manifest = self.manifest()
+        manifest[str(year)] = self.raw_signature(year, raw_dir)
+        self._write_manifest(manifest)
+        return len(features)
+
+    # ---------- lecture ----------
+    def load(self, years=None, columns=None, rate_years=None, neighbourhood_km=None):
+        """Table de modélisation, avec `taux_mortels_dep_feature` joint.
+
+        `rate_years` : fenêtre du taux départemental (par défaut la même que
+        `years`), pour ne pas faire fuir les années de test dans S1.
+        `neighbourhood_km` : ajoute `taux_mortels_voisinage_feature` dans ce
+        rayon, sur la même fenêtre.
+        """
+        parts = [
+            y for y in self.years
+            if years is None or years[0] <= y <= years[1]
+        ]
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat(
+            [pd.read_parquet(os.path.join(self.root, f"an={y}", "part.parquet"), columns=columns)
+             for y in parts],
+            ignore_index=True,
+        )
+        if "dep" in df:
+            df = add_dep_rate(df, self.state(), years=rate_years or years)
+        if neighbourhood_km is not None and "lat" in df and "long" in df:
+            df = add_neighbourhood_rate(df, self, neighbourhood_km, years=rate_years or years)
+        return df
+
+
+def main(argv):
+    fs = FeatureStore()
+    if argv[:1] == ["update"] and len(argv) in (2, 3):
+        start, end = _parse_years(argv[1])
+        force = argv[2:] == ["--force"]
+        for year in range(start, end + 1):
+            n = fs.update_year(year, force=force)
+            print(f"{year}: " + ("à jour" if n is None else f"{n} accidents"))
+        return 0
+    if argv == ["status"]:
+        state = fs.state()
+        for year in fs.years:
+            s = state[state["an"] == year]
+            current = "ok" if fs.is_current(year) else "fichiers bruts modifiés"
+            print(f"{year}: {int(s['n_total'].sum())} accidents, "
+                  f"{int(s['n_mortels'].sum())} mortels ({current})")
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
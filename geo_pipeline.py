@@ -0,0 +1,413 @@
+"""Géométrie compacte des départements pour la choroplèthe.
+
+`taux_mortels_departements_numDep.html` (3,4 Mo) embarque les polygones des
+départements en pleine précision. Ce module :
+
+- extrait géométrie et valeurs du HTML ;
+- quantifie les coordonnées sur une grille entière et découpe les contours
+  en arcs partagés (topologie : une frontière commune n'est stockée qu'une
+  fois, donc simplifiée à l'identique des deux côtés, sans trou ni
+  chevauchement) ;
+- simplifie chaque arc (Douglas-Peucker) et note pour chaque sommet le
+  niveau de détail à partir duquel il est conservé ;
+- écrit `departements.topo.json` (TopoJSON, arcs codés en delta, un rang par
+  sommet) et `taux_mortels_departements.csv` (valeurs par département).
+
+À l'affichage, la géométrie d'un niveau est décodée une fois, publiée dans
+`static/geo/` (mise en cache par le navigateur) et la figure ne transporte
+plus que le petit tableau de valeurs.
+
+Reconstruction des fichiers :
+
+    python geo_pipeline.py
+"""
+import csv
+import json
+import os
+import threading
+
+import numpy as np
+
+from artifact_manifest import version
+from asset_cache import get_cache
+from static_assets import STATIC_DIR, STATIC_URL_PREFIX
+
+BASE_DIR = os.path.dirname(__file__)
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+CHORO_HTML_PATH = os.path.join(INPUT_DIR, "taux_mortels_departements_numDep.html")
+TOPO_PATH = os.path.join(INPUT_DIR, "departements.topo.json")
+VALUES_PATH = os.path.join(INPUT_DIR, "taux_mortels_departements.csv")
+
+# Grille de quantification (~12 m en longitude sur l'emprise métropolitaine)
+QUANTIZATION = 100_000
+
+# Niveaux de détail, du plus grossier au plus fin : tolérance en degrés
+LEVELS = {
+    "grossier": 0.03,
+    "moyen": 0.01,
+    "fin": 0.003,
+}
+DEFAULT_LEVEL = "moyen"
+
+VALUE_FIELDS = ["code", "nom", "n_total", "n_mortels", "taux_mortels_pct", "lat", "lon"]
+
+
+# =========================
+# EXTRACTION
+# =========================
+
+def extract_from_html(path=CHORO_HTML_PATH):
+    """(GeoJSON, lignes de valeurs) lues dans la choroplèthe Plotly exportée."""
+    from plotly_figures import extract_figures
+
+    with open(path, "r", encoding="utf-8") as f:
+        spec = extract_figures(f.read())[0]
+
+    choro = next(t for t in spec["data"] if t.get("type") == "choropleth")
+    labels = next((t for t in spec["data"] if t.get("type") == "scattergeo"), None)
+    label_pos = {}
+    if labels is not None:
+        label_pos = {c: (la, lo) for c, la, lo in zip(labels["text"], labels["lat"], labels["lon"])}
+
+    rows = []
+    for code, nom, (_, n_total, n_mortels, _), taux in zip(
+        choro["locations"], choro["hovertext"], choro["customdata"], choro["z"]
+    ):
+        lat, lon = label_pos.get(code, (None, None))
+        rows.append({
+            "code": code, "nom": nom, "n_total": n_total, "n_mortels": n_mortels,
+            "taux_mortels_pct": taux, "lat": lat, "lon": lon,
+        })
+    return choro["geojson"], rows
+
+
+# =========================
+# TOPOLOGIE & SIMPLIFICATION
+# =========================
+
+def _rings(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+def _quantize_ring(ring, x0, y0, kx, ky):
+    out = []
+    for x, y in ring:
+        p = (round((x - x0) * kx), round((y - y0) * ky))
+        if not out or out[-1] != p:
+            out.append(p)
+    if len(out) > 1 and out[0] == out[-1]:
+        out.pop()
+    return out
+
+
+def _junctions(rings):
+    """Sommets où deux contours se rejoignent ou se séparent."""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring)
+        for i, p in enumerate(ring):
+            pair = tuple(sorted((ring[i - 1], ring[(i + 1) % n])))
+            seen = neighbours.setdefault(p, pair)
+            if seen != pair:
+                junctions.add(p)
+    return junctions
+
+
+def _cut(ring, junctions):
+    """Découpe un contour fermé en arcs entre jonctions (extrémités incluses)."""
+    idx = [i for i, p in enumerate(ring) if p in junctions]
+    if not idx:
+        start = ring.index(min(ring))
+        r = ring[start:] + ring[:start]
+        return [r + [r[0]]]
+    r = ring[idx[0]:] + ring[:idx[0]]
+    cuts = [i - idx[0] for i in idx] + [len(ring)]
+    r = r + [r[0]]
+    return [r[a:b + 1] for a, b in zip(cuts, cuts[1:])]
+
+
+def _importance(arc):
+    """Tolérance maximale (unités de grille) à laquelle chaque sommet survit."""
+    pts = np.asarray(arc, dtype=float)
+    n = len(pts)
+    imp = np.zeros(n)
+    imp[0] = imp[-1] = np.inf
+    if n <= 2:
+        return imp
+    stack = [(0, n - 1, np.inf)]
+    if np.array_equal(pts[0], pts[-1]):
+        # Arc fermé : on garde aussi le sommet le plus éloigné du départ
+        far = int(np.argmax(np.hypot(*(pts - pts[0]).T)))
+        imp[far] = np.inf
+        stack = [(0, far, np.inf), (far, n - 1, np.inf)]
+    while stack:
+        a, b, parent = stack.pop()
+        if b - a < 2:
+            continue
+        seg = pts[b] - pts[a]
+        rel = pts[a + 1:b] - pts[a]
+        norm = np.hypot(*seg)
+        if norm == 0:
+            d = np.hypot(*rel.T)
+        else:
+            d = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / norm
+        k = int(np.argmax(d))
+        i = a + 1 + k
+        imp[i] = min(d[k], parent)
+        stack.append((a, i, imp[i]))
+        stack.append((i, b, imp[i]))
+    return imp
+
+
+def build_topology(geojson, levels=LEVELS, quantization=QUANTIZATION):
+    """TopoJSON quantifié, arcs partagés et rang de détail par sommet."""
+    features = geojson["features"]
+    coords = np.array([
+        xy for f in features for ring_set in _rings(f["geometry"]) for ring in ring_set for xy in ring
+    ])
+    (x0, y0), (x1, y1) = coords.min(axis=0), coords.max(axis=0)
+    kx = (quantization - 1) / (x1 - x0)
+    ky = (quantization - 1) / (y1 - y0)
+
+    polys = [
+        [[_quantize_ring(ring, x0, y0, kx, ky) for ring in ring_set] for ring_set in _rings(f["geometry"])]
+        for f in features
+    ]
+    junctions = _junctions([ring for poly in polys for ring_set in poly for ring in ring_set])
+
+    arcs, arc_index = [], {}
+
+    def arc_id(arc):
+        key = tuple(arc)
+        if key in arc_index:
+            return arc_index[key]
+        rev = tuple(reversed(arc))
+        if rev in arc_index:
+            return ~arc_index[rev]
+        arc_index[key] = len(arcs)
+        arcs.append(arc)
+        return len(arcs) - 1
+
+    geometries = []
+    for f, poly in zip(features, polys):
+        polygon_arcs = [
+            [[arc_id(a) for a in _cut(ring, junctions)] for ring in ring_set if len(ring) >= 3]
+            for ring_set in poly
+        ]
+        geom = {"properties": f["properties"]}
+        if f["geometry"]["type"] == "Polygon":
+            geom.update(type="Polygon", arcs=polygon_arcs[0])
+        else:
+            geom.update(type="MultiPolygon", arcs=polygon_arcs)
+        geometries.append(geom)
+
+    tolerances = [tol * kx for tol in levels.values()]
+    encoded, ranks = [], []
+    for arc in arcs:
+        imp = _importance(arc)
+        rank = np.sum(imp[:, None] >= np.asarray(tolerances)[None, :], axis=1)
+        keep = rank > 0
+        pts = np.asarray(arc)[keep]
+        deltas = np.vstack([pts[:1], np.diff(pts, axis=0)])
+        encoded.append(deltas.tolist())
+        ranks.append("".join(str(r) for r in rank[keep]))
+
+    return {
+        "type": "Topology",
+        "transform": {"scale": [1 / kx, 1 / ky], "translate": [float(x0), float(y0)]},
+        "levels": [{"name": name, "tolerance": tol} for name, tol in levels.items()],
+        "arcs": encoded,
+        "ranks": ranks,
+        "objects": {"departements": {"type": "GeometryCollection", "geometries": geometries}},
+    }
+
+
+# =========================
+# DÉCODAGE
+# =========================
+
+def decode_level(topo, level=DEFAULT_LEVEL):
+    """GeoJSON (FeatureCollection) d'un niveau de détail.
+
+    Les coordonnées sont arrondies à ~1/10 de la tolérance du niveau.
+    """
+    names = [lv["name"] for lv in topo["levels"]]
+    min_rank = len(names) - names.index(level)
+    tolerance = topo["levels"][names.index(level)]["tolerance"]
+    decimals = int(np.ceil(-np.log10(tolerance))) + 1
+    (sx, sy), (tx, ty) = topo["transform"]["scale"], topo["transform"]["translate"]
+
+    arcs = []
+    for deltas, rank in zip(topo["arcs"], topo["ranks"]):
+        q = np.cumsum(np.asarray(deltas), axis=0)
+        keep = np.frombuffer(rank.encode(), dtype=np.uint8) - ord("0") >= min_rank
+        xy = np.round(q[keep] * (sx, sy) + (tx, ty), decimals)
+        arcs.append(xy.tolist())
+
+    def ring(ids):
+        out = []
+        for i in ids:
+            pts = arcs[i] if i >= 0 else arcs[~i][::-1]
+            out.extend(pts[1:] if out else pts)
+        if out and out[0] != out[-1]:
+            out.append(out[0])
+        return out if len(out) >= 4 else None
+
+    features = []
+    for geom in topo["objects"]["departements"]["geometries"]:
+        polys = [geom["arcs"]] if geom["type"] == "Polygon" else geom["arcs"]
+        rings = [[r for r in (ring(ids) for ids in poly) if r] for poly in polys]
+        rings = [p for p in rings if p]
+        if not rings:
+            continue
+        geometry = (
+            {"type": "Polygon", "coordinates": rings[0]} if len(rings) == 1
+            else {"type": "MultiPolygon", "coordinates": rings}
+        )
+        features.append({"type": "Feature", "properties": geom["properties"], "geometry": geometry})
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_topology(path=TOPO_PATH):
+    return get_cache().get(path, "topojson", _load_json)
+
+
+def _load_values(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for key in ("n_total", "n_mortels"):
+            row[key] = int(row[key])
+        for key in ("taux_mortels_pct", "lat", "lon"):
+            row[key] = float(row[key]) if row[key] else None
+        row["nom"] = row["nom"] or None
+    return rows
+
+
+def load_values(path=VALUES_PATH):
+    """Valeurs par département (liste de dicts), None si le fichier manque."""
+    return get_cache().get(path, "choro:values", _load_values)
+
+
+_publish_lock = threading.Lock()
+_published = set()
+
+
+def geojson_url(level=DEFAULT_LEVEL, path=TOPO_PATH):
+    """Publie la GeoJSON du niveau dans `static/geo/` et renvoie son URL."""
+    v = version(path)
+    if v is None:
+        return None
+    name = f"departements-{level}-{v}.geojson"
+    target = os.path.join(STATIC_DIR, "geo", name)
+    with _publish_lock:
+        if target not in _published and not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            data = json.dumps(decode_level(load_topology(path), level), separators=(",", ":"))
+            tmp = f"{target}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        _published.add(target)
+    return f"{STATIC_URL_PREFIX}/geo/{name}"
+
+
+def load_geojson(level=DEFAULT_LEVEL, path=TOPO_PATH):
+    """GeoJSON décodée du niveau (mise en cache), pour l'affichage sans service statique."""
+    return get_cache().get(
+        path, f"geojson:{level}", lambda p: decode_level(load_topology(p), level),
+        cost=lambda g: len(json.dumps(g)),
+    )
+
+
+# =========================
+# FIGURE
+# =========================
+
+# Échelle YlOrRd de la choroplèthe d'origine
+COLORSCALE = [
+    [0.0, "rgb(255,255,204)"], [0.125, "rgb(255,237,160)"], [0.25, "rgb(254,217,118)"],
+    [0.375, "rgb(254,178,76)"], [0.5, "rgb(253,141,60)"], [0.625, "rgb(252,78,42)"],
+    [0.75, "rgb(227,26,28)"], [0.875, "rgb(189,0,38)"], [1.0, "rgb(128,0,38)"],
+]
+
+
+def choropleth_figure(rows, geojson, height=800):
+    """Choroplèthe des taux ; `geojson` peut être un objet ou une URL."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson,
+        featureidkey="properties.code",
+        locations=[r["code"] for r in rows],
+        z=[r["taux_mortels_pct"] for r in rows],
+        customdata=[[r["code"], r["n_total"], r["n_mortels"]] for r in rows],
+        hovertext=[r["nom"] for r in rows],
+        hovertemplate=(
+            "<b>%{hovertext}</b><br><br>code=%{customdata[0]}<br>n_total=%{customdata[1]}"
+            "<br>n_mortels=%{customdata[2]}<br>taux_mortels_pct=%{z:.2f}<extra></extra>"
+        ),
+        coloraxis="coloraxis",
+    ))
+    labels = [r for r in rows if r["lat"] is not None]
+    fig.add_trace(go.Scattergeo(
+        lat=[r["lat"] for r in labels],
+        lon=[r["lon"] for r in labels],
+        text=[r["code"] for r in labels],
+        mode="text",
+        textfont={"color": "black", "family": "Arial Black", "size": 12},
+        hoverinfo="skip",
+        showlegend=False,
+    ))
+    fig.update_layout(
+        geo={"projection": {"type": "mercator"}, "fitbounds": "locations", "visible": False},
+        coloraxis={
+            "colorscale": COLORSCALE,
+            "cmin": 0,
+            "cmax": max(r["taux_mortels_pct"] for r in rows),
+            "colorbar": {"title": {"text": "Taux d'accidents mortels"}},
+        },
+        title={
+            "text": "Taux d’accidents mortels par département (%)",
+            "font": {"size": 22, "family": "Arial Black"}, "x": 0.5, "xanchor": "center",
+        },
+        margin={"l": 10, "r": 10, "t": 50, "b": 10},
+        font={"family": "Arial", "size": 15, "color": "black"},
+        height=height,
+    )
+    return fig
+
+
+# =========================
+# BUILD
+# =========================
+
+def main():
+    geojson, rows = extract_from_html()
+    topo = build_topology(geojson)
+    with open(TOPO_PATH, "w", encoding="utf-8") as f:
+        json.dump(topo, f, separators=(",", ":"), ensure_ascii=False)
+    with open(VALUES_PATH, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=VALUE_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{TOPO_PATH}: {os.path.getsize(TOPO_PATH) / 1024:.0f} Ko, {len(topo['arcs'])} arcs")
+    print(f"{VALUES_PATH}: {os.path.getsize(VALUES_PATH) / 1024:.0f} Ko, {len(rows)} lignes")
+    for level in LEVELS:
+        gj = decode_level(topo, level)
+        n = sum(len(r) for f in gj["features"] for p in _rings(f["geometry"]) for r in p)
+        size = len(json.dumps(gj, separators=(",", ":")))
+        print(f"  niveau {level:9s}: {n:6d} sommets, GeoJSON {size / 1024:.0f} Ko")
+
+
+if __name__ == "__main__":
+    main()
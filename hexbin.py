@@ -0,0 +1,340 @@
+"""Hexbins interactifs calculés à partir des points d'accidents BAAC.
+
+Les cartes de la section 4.2 étaient deux PNG figés (2015–2023). Ici, les
+accidents (latitude / longitude) sont agrégés une fois, de façon vectorisée,
+dans des cellules hexagonales à plusieurs résolutions, par année,
+département et `agg` : c'est le « cube » hexbin. À l'affichage, un filtre
+(années, départements, agg) se résout par masques NumPy sur ce cube puis
+une ré-agrégation par cellule, sans relire les ~500k accidents ; seules les
+cellules non vides sont envoyées au navigateur.
+
+Construction du cube, depuis l'entrepôt BAAC (cf. baac_store.py) ou une
+table accident avec `lat`, `long`, `an`, `dep`, `agg`, `is_mortel` (CSV
+ou Parquet) :
+
+    python hexbin.py build --store
+    python hexbin.py build accidents.parquet
+"""
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+import shared_cache
+from artifact_manifest import version
+from asset_cache import get_cache
+from static_assets import STATIC_DIR, STATIC_URL_PREFIX
+
+BASE_DIR = os.path.dirname(__file__)
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+CUBE_PATH = os.path.join(INPUT_DIR, "hexbin_cube.parquet")
+
+# Rayon des hexagones (km) pour chaque résolution précalculée
+RESOLUTIONS = {
+    "25 km": 25.0,
+    "10 km": 10.0,
+    "5 km": 5.0,
+    "2 km": 2.0,
+}
+DEFAULT_RESOLUTION = "10 km"
+
+# Projection équirectangulaire centrée sur la métropole
+EARTH_RADIUS_KM = 6371.0
+LAT0 = 46.5
+METRO_BBOX = (-5.5, 41.0, 10.0, 51.5)  # lon_min, lat_min, lon_max, lat_max
+
+AGG_LABELS = {1: "Hors agglomération", 2: "En agglomération"}
+
+_SQRT3 = np.sqrt(3.0)
+_KX = np.radians(1.0) * EARTH_RADIUS_KM * np.cos(np.radians(LAT0))
+_KY = np.radians(1.0) * EARTH_RADIUS_KM
+
+
+# =========================
+# GÉOMÉTRIE HEXAGONALE
+# =========================
+
+def hex_cells(lon, lat, size_km):
+    """Coordonnées axiales (q, r) des hexagones (pointe en haut) contenant les points."""
+    x = np.asarray(lon, dtype=float) * _KX
+    y = np.asarray(lat, dtype=float) * _KY
+    qf = (_SQRT3 / 3.0 * x - y / 3.0) / size_km
+    rf = (2.0 / 3.0 * y) / size_km
+    sf = -qf - rf
+
+    q, r, s = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s, q)
+    r = np.where(fix_r, -q - s, r)
+    return q.astype(np.int32), r.astype(np.int32)
+
+
+def hex_centers(q, r, size_km):
+    """(lon, lat) du centre des hexagones."""
+    x = size_km * _SQRT3 * (q + r / 2.0)
+    y = size_km * 1.5 * r
+    return x / _KX, y / _KY
+
+
+def hex_polygons(q, r, size_km):
+    """Sommets (n, 7, 2) lon/lat des hexagones, contour fermé.
+
+    Sens horaire, comme attendu par les cartes `geo` de Plotly (d3-geo).
+    """
+    cx, cy = hex_centers(q, r, size_km)
+    angles = np.radians(30.0 - 60.0 * np.arange(7))
+    dx = size_km * np.cos(angles) / _KX
+    dy = size_km * np.sin(angles) / _KY
+    return np.stack([cx[:, None] + dx, cy[:, None] + dy], axis=-1)
+
+
+# =========================
+# CONSTRUCTION DU CUBE
+# =========================
+
+def _coord(s):
+    import pandas as pd
+
+    if not pd.api.types.is_numeric_dtype(s):
+        s = s.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=float)
+
+
+def build_cube(df, resolutions=RESOLUTIONS):
+    """Agrège les accidents par (résolution, an, dep, agg, cellule).
+
+    `df` : une ligne par accident, colonnes `lat`, `long`, `an`, `dep`,
+    `agg`, `is_mortel`. Renvoie un DataFrame (une ligne par cellule non vide).
+    """
+    import pandas as pd
+
+    lat, lon = _coord(df["lat"]), _coord(df["long"])
+    lon_min, lat_min, lon_max, lat_max = METRO_BBOX
+    ok = (lon >= lon_min) & (lon <= lon_max) & (lat >= lat_min) & (lat <= lat_max)
+
+    base = pd.DataFrame({
+        "an": df["an"].to_numpy()[ok].astype(np.int16),
+        "dep": df["dep"].astype(str).to_numpy()[ok],
+        "agg": df["agg"].to_numpy()[ok].astype(np.int8),
+        "is_mortel": df["is_mortel"].to_numpy()[ok].astype(np.int32),
+    })
+    parts = []
+    for res in resolutions.values():
+        q, r = hex_cells(lon[ok], lat[ok], res)
+        part = (
+            base.assign(q=q, r=r)
+            .groupby(["an", "dep", "agg", "q", "r"], observed=True, sort=False)
+            .agg(n_acc=("is_mortel", "size"), n_mort=("is_mortel", "sum"))
+            .reset_index()
+        )
+        part.insert(0, "res", np.float32(res))
+        parts.append(part)
+
+    cube = pd.concat(parts, ignore_index=True)
+    cube["dep"] = cube["dep"].astype("category")
+    cube[["n_acc", "n_mort"]] = cube[["n_acc", "n_mort"]].astype(np.int32)
+    return cube
+
+
+# =========================
+# REQUÊTES
+# =========================
+
+def _cube_arrays(df):
+    """Tableaux du cube par résolution (pour HexCube / shared_cache) et méta-données."""
+    dep = df["dep"].astype("category")
+    dep_codes = dep.cat.codes.to_numpy()
+    res = df["res"].to_numpy()
+    arrays = {}
+    for name, size in RESOLUTIONS.items():
+        m = res == np.float32(size)
+        if not m.any():
+            continue
+        q = df["q"].to_numpy()[m].astype(np.int64)
+        r = df["r"].to_numpy()[m].astype(np.int64)
+        cells, inv = np.unique(_cell_key(q, r), return_inverse=True)
+        part = {
+            "an": df["an"].to_numpy()[m],
+            "dep": dep_codes[m],
+            "agg": df["agg"].to_numpy()[m],
+            "cell": inv,          # indice dans `cells`
+            "cells": cells,       # toutes les cellules non vides de la résolution
+            "n_acc": df["n_acc"].to_numpy()[m],
+            "n_mort": df["n_mort"].to_numpy()[m],
+        }
+        arrays.update({f"{name}.{k}": v for k, v in part.items()})
+    meta = {
+        "dep_labels": [str(d) for d in dep.cat.categories],
+        "years": sorted(int(a) for a in np.unique(df["an"])),
+    }
+    return arrays, meta
+
+
+class HexCube:
+    """Cube hexbin (tableaux NumPy par résolution, en mmap en mode partagé) et requêtes."""
+
+    def __init__(self, arrays, meta):
+        self.dep_labels = np.asarray(meta["dep_labels"], dtype=object)
+        self._parts = {}
+        for key, a in arrays.items():
+            name, field = key.split(".")
+            self._parts.setdefault(name, {})[field] = a
+        self.years = meta["years"]
+        self.departements = list(meta["dep_labels"])
+        self.resolutions = [name for name in RESOLUTIONS if name in self._parts]
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(*_cube_arrays(df))
+
+    def query(self, resolution=DEFAULT_RESOLUTION, years=None, deps=None, agg=None):
+        """Cellules non vides pour le filtre : dict de tableaux NumPy.
+
+        `years` : (début, fin) inclus ; `deps` : liste de codes ;
+        `agg` : code `agg` (1 ou 2) ou None pour tous.
+        """
+        part = self._parts[resolution]
+        mask = np.ones(len(part["cell"]), dtype=bool)
+        if years is not None:
+            mask &= (part["an"] >= years[0]) & (part["an"] <= years[1])
+        if deps:
+            codes = np.flatnonzero(np.isin(self.dep_labels, list(deps)))
+            mask &= np.isin(part["dep"], codes)
+        if agg is not None:
+            mask &= part["agg"] == agg
+
+        n_cells = len(part["cells"])
+        n_acc = np.bincount(part["cell"][mask], weights=part["n_acc"][mask], minlength=n_cells)
+        n_mort = np.bincount(part["cell"][mask], weights=part["n_mort"][mask], minlength=n_cells)
+        idx = np.flatnonzero(n_acc)
+        q, r = _split_key(part["cells"][idx])
+        return {
+            "resolution": resolution, "q": q, "r": r, "size_km": RESOLUTIONS[resolution],
+            "n_acc": n_acc[idx].astype(np.int64), "n_mort": n_mort[idx].astype(np.int64),
+        }
+
+    def cells_geojson(self, resolution):
+        """GeoJSON de toutes les cellules non vides d'une résolution (id = "q_r")."""
+        q, r = _split_key(self._parts[resolution]["cells"])
+        polys = np.round(hex_polygons(q, r, RESOLUTIONS[resolution]), 4).tolist()
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "id": cell_id, "geometry": {"type": "Polygon", "coordinates": [poly]}}
+                for cell_id, poly in zip(cell_ids(q, r), polys)
+            ],
+        }
+
+
+def _cell_key(q, r):
+    return (q << 32) | (r & 0xFFFFFFFF)
+
+
+def _split_key(keys):
+    q = (keys >> 32).astype(np.int32)
+    r = (keys & 0xFFFFFFFF).astype(np.uint32).astype(np.int32)
+    return q, r
+
+
+def cell_ids(q, r):
+    return [f"{a}_{b}" for a, b in zip(q.tolist(), r.tolist())]
+
+
+def _cube_arrays_from_file(path):
+    import pandas as pd
+
+    return _cube_arrays(pd.read_parquet(path))
+
+
+def _load_cube(path):
+    return HexCube(*shared_cache.arrays(path, "hexbin", _cube_arrays_from_file))
+
+
+def load_cube(path=CUBE_PATH):
+    """Cube hexbin (mis en cache), None s'il n'a pas été construit."""
+    return get_cache().get(path, "hexbin:cube", _load_cube)
+
+
+_publish_lock = threading.Lock()
+_published = set()
+
+
+def cells_geojson_url(resolution, path=CUBE_PATH):
+    """Publie la GeoJSON des cellules dans `static/geo/` et renvoie son URL."""
+    v = version(path)
+    if v is None:
+        return None
+    name = f"hexbin-{RESOLUTIONS[resolution]:g}km-{v}.geojson"
+    target = os.path.join(STATIC_DIR, "geo", name)
+    with _publish_lock:
+        if target not in _published and not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(load_cube(path).cells_geojson(resolution), f, separators=(",", ":"))
+            os.replace(tmp, target)
+        _published.add(target)
+    return f"{STATIC_URL_PREFIX}/geo/{name}"
+
+
+def cells_figure(cells, geojson, metric="n_acc", height=650):
+    """Carte Plotly des cellules : couleur en log10(N) ou en taux (%).
+
+    `geojson` (objet ou URL) décrit toutes les cellules de la résolution :
+    seuls les identifiants et valeurs des cellules filtrées sont transmis.
+    """
+    import plotly.graph_objects as go
+
+    n_acc, n_mort = cells["n_acc"], cells["n_mort"]
+    if metric == "taux":
+        z = 100.0 * n_mort / np.maximum(n_acc, 1)
+        colorbar = "Taux mortels (%)"
+    else:
+        z = np.log10(np.maximum(cells[metric], 1))
+        colorbar = "log10(N)"
+
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson,
+        locations=cell_ids(cells["q"], cells["r"]),
+        z=np.round(z, 3),
+        customdata=np.stack([n_acc, n_mort], axis=1),
+        hovertemplate="N corporels=%{customdata[0]}<br>N mortels=%{customdata[1]}<extra></extra>",
+        colorscale="Viridis",
+        marker_line_width=0,
+        colorbar={"title": {"text": colorbar}},
+    ))
+    fig.update_layout(
+        geo={"projection": {"type": "mercator"}, "fitbounds": "locations", "visible": False},
+        margin={"l": 10, "r": 10, "t": 10, "b": 10},
+        height=height,
+    )
+    return fig
+
+
+def main(argv):
+    if len(argv) != 2 or argv[0] != "build":
+        print(__doc__)
+        return 1
+    import pandas as pd
+
+    src = argv[1]
+    if src == "--store":
+        from baac_store import BaacStore
+
+        df = BaacStore().scan(["lat", "long", "an", "dep", "agg", "is_mortel"])
+    elif src.endswith(".parquet"):
+        df = pd.read_parquet(src)
+    else:
+        df = pd.read_csv(src, sep=None, engine="python")
+    cube = build_cube(df)
+    cube.to_parquet(CUBE_PATH, index=False)
+    print(f"{CUBE_PATH}: {len(cube)} cellules, {os.path.getsize(CUBE_PATH) / 1024:.0f} Ko")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
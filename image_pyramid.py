@@ -0,0 +1,195 @@
+"""Pyramide d'images : variantes réduites et WebP/AVIF des PNG du site.
+
+Les PNG de `Input_Site_Web` (hexbins, SHAP, tables, courbes PR/ROC) font
+jusqu'à 1 900 px de large alors qu'ils sont affichés dans des demi-colonnes.
+On génère, une fois, des variantes à plusieurs largeurs dans `static/img/`
+et la page laisse le navigateur choisir la plus petite adaptée
+(`<picture>` + `srcset`), l'original restant accessible au clic.
+
+Pré-génération (faite aussi par `python deploy.py prepare` ; sinon à la
+volée au premier affichage de chaque image) :
+
+    python image_pyramid.py
+"""
+import glob
+import os
+import threading
+
+import streamlit as st
+
+from asset_cache import artifact_signature, file_signature, get_cache
+from static_assets import STATIC_DIR, publish, static_serving_enabled
+
+BASE_DIR = os.path.dirname(__file__)
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+VARIANT_DIR = os.path.join(STATIC_DIR, "img")
+VARIANT_URL_PREFIX = "app/static/img"
+
+# Largeurs générées (px) ; seules celles inférieures à l'original sont produites
+VARIANT_WIDTHS = (480, 800, 1200)
+
+# Largeur CSS approximative de chaque emplacement en layout "wide"
+SLOT_WIDTHS = {
+    "full": 1400,
+    "center": 850,
+    "half": 700,
+}
+SLOT_SIZES = {
+    "full": "100vw",
+    "center": "(max-width: 900px) 100vw, 60vw",
+    "half": "(max-width: 900px) 100vw, 50vw",
+}
+# Densité de pixels visée pour le repli `st.image` (écrans HiDPI courants)
+FALLBACK_DPR = 1.5
+
+_key_locks = {}   # source -> verrou de construction
+_locks_lock = threading.Lock()
+_versions = {}   # variante -> version d'URL, relevée à la construction
+
+
+def _formats():
+    from PIL import features
+
+    fmts = ["webp"]
+    if features.check("avif"):
+        fmts.insert(0, "avif")
+    return fmts + ["png"]
+
+
+def _variant_path(path, width, fmt):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(VARIANT_DIR, f"{stem}-{width}w.{fmt}")
+
+
+def _save(img, target, fmt):
+    tmp = f"{target}.tmp{os.getpid()}"
+    if fmt == "png":
+        img.save(tmp, format="PNG")
+    elif fmt == "webp":
+        img.save(tmp, format="WEBP", quality=85, method=4)
+    else:
+        img.save(tmp, format="AVIF", quality=70, speed=8)
+    os.replace(tmp, target)
+
+
+def build_variants(path):
+    """Génère (si besoin) les variantes de `path`.
+
+    Renvoie {format: [(largeur, chemin), …]} trié par largeur croissante,
+    ou None si l'image n'existe pas. Une variante n'est régénérée que si
+    elle est plus ancienne que la source.
+    """
+    sig = artifact_signature(path)
+    if sig is None:
+        return None
+
+    img = None
+    index = {fmt: [] for fmt in _formats()}
+    os.makedirs(VARIANT_DIR, exist_ok=True)
+    for fmt in index:
+        for width in VARIANT_WIDTHS + (None,):
+            if img is None:
+                img = get_cache().load_image(path)
+            if width is None:
+                if fmt == "png":
+                    continue  # l'original sert de variante PNG pleine largeur
+                width = img.width
+            elif width >= img.width:
+                continue
+            target = _variant_path(path, width, fmt)
+            tsig = file_signature(target)
+            if tsig is None or tsig[0] < sig[0]:
+                height = round(img.height * width / img.width)
+                resized = img if width == img.width else img.resize((width, height), _lanczos())
+                _save(resized, target, fmt)
+                tsig = file_signature(target)
+            _versions[target] = f"{tsig[0]:x}"
+            index[fmt].append((width, target))
+    index["png"].append((img.width, path))
+    return index
+
+
+def _lanczos():
+    from PIL import Image
+
+    return Image.LANCZOS
+
+
+def variants(path):
+    """Index des variantes de `path`, construit une fois puis mis en cache."""
+    with _locks_lock:
+        lock = _key_locks.setdefault(path, threading.Lock())
+    # Une image n'est encodée qu'une fois ; les autres restent disponibles
+    with lock:
+        return get_cache().get(path, "pyramid", build_variants, cost=lambda _: 0)
+
+
+def _url(variant_path):
+    v = _versions.get(variant_path)
+    if v is None:
+        v = f"{file_signature(variant_path)[0]:x}"
+    rel = os.path.relpath(variant_path, VARIANT_DIR).replace(os.sep, "/")
+    return f"{VARIANT_URL_PREFIX}/{rel}?v={v}"
+
+
+def pick_png(index, slot):
+    """Plus petite variante PNG couvrant la largeur de l'emplacement."""
+    needed = SLOT_WIDTHS[slot] * FALLBACK_DPR
+    for w, p in index["png"]:
+        if w >= needed:
+            return p
+    return index["png"][-1][1]
+
+
+def show_image(path, caption=None, slot="half"):
+    """Affiche l'image en choisissant la variante adaptée à l'emplacement.
+
+    Avec le service statique : `<picture>` AVIF/WebP/PNG + `srcset`, lien
+    vers l'original. Sinon : `st.image` sur la plus petite variante PNG
+    suffisante. Renvoie False si l'image est absente.
+    """
+    index = variants(path)
+    if index is None:
+        return False
+
+    if not static_serving_enabled():
+        st.image(get_cache().read_bytes(pick_png(index, slot)), caption=caption,
+                 use_container_width=True)
+        return True
+
+    full_url = publish(path, os.path.join("img", "full", os.path.basename(path)))
+    sources = "".join(
+        f'<source type="image/{fmt}" sizes="{SLOT_SIZES[slot]}" '
+        f'srcset="{", ".join(f"{_url(p)} {w}w" for w, p in index[fmt])}">'
+        for fmt in index if fmt != "png"
+    )
+    png_srcset = ", ".join(
+        f"{full_url if p == path else _url(p)} {w}w" for w, p in index["png"]
+    )
+    alt = caption or os.path.basename(path)
+    figcaption = (
+        f'<figcaption style="text-align:center; font-size:0.85em; opacity:0.7">'
+        f"{caption} — 🔍 cliquer pour la pleine résolution</figcaption>"
+        if caption else ""
+    )
+    st.markdown(
+        f'<figure style="margin:0">'
+        f'<a href="{full_url}" target="_blank"><picture>{sources}'
+        f'<img src="{full_url}" srcset="{png_srcset}" sizes="{SLOT_SIZES[slot]}" '
+        f'alt="{alt}" loading="lazy" style="width:100%; height:auto">'
+        f"</picture></a>{figcaption}</figure>",
+        unsafe_allow_html=True,
+    )
+    return True
+
+
+def main():
+    for path in sorted(glob.glob(os.path.join(INPUT_DIR, "*.png"))):
+        index = build_variants(path)
+        src = os.path.getsize(path)
+        best = min(os.path.getsize(p) for fmt in index for _, p in index[fmt])
+        print(f"{os.path.basename(path):45s} {src / 1024:8.0f} Ko -> min {best / 1024:6.0f} Ko")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Test de charge du mode multi-réplicas (cf. deploy.py).
+
+Chaque utilisateur virtuel (un processus) ouvre une vraie session Streamlit
+sur le websocket `/_stcore/stream` d'un worker, puis enchaîne les pages de la
+barre latérale comme le ferait le navigateur (BackMsg `rerun_script` avec la
+valeur du radio) ; un rerun compte quand `script_finished` arrive. Les
+utilisateurs sont répartis sur les workers comme le ferait `ip_hash` pour des
+clients distincts.
+
+    python loadtest.py --ports 8501-8504 --users 16 --duration 30
+    python loadtest.py --scale 1,2,4 --users-per-worker 4 --duration 20
+
+`--scale` lance `deploy.py run --lb none` pour chaque nombre de workers et
+affiche le débit (reruns/s) et son rapport au débit à 1 worker.
+"""
+import argparse
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import deploy
+
+PAGE_RADIO_LABEL = "Aller à :"
+
+
+def _rerun(ws, radio_id=None, page=None):
+    """Envoie un rerun et lit les messages jusqu'à `script_finished`.
+
+    Renvoie (octets reçus, radio de navigation (id, options) vu pendant le run,
+    exception affichée ?).
+    """
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    if radio_id is not None:
+        widget = msg.rerun_script.widget_states.widgets.add()
+        widget.id = radio_id
+        widget.string_value = page
+    ws.send(msg.SerializeToString())
+
+    received, radio, error = 0, None, False
+    while True:
+        data = ws.recv()
+        received += len(data)
+        fwd = ForwardMsg()
+        fwd.ParseFromString(data)
+        kind = fwd.WhichOneof("type")
+        if kind == "script_finished":
+            if fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return received, radio, error
+        elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+            element = fwd.delta.new_element
+            etype = element.WhichOneof("type")
+            if etype == "exception":
+                error = True
+            elif etype == "radio" and element.radio.label == PAGE_RADIO_LABEL:
+                radio = (element.radio.id, list(element.radio.options))
+
+
+def virtual_user(port, duration, pages=None):
+    """Enchaîne les pages pendant `duration` s ; renvoie latences (s), octets, erreurs."""
+    from websockets.sync.client import connect
+
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    with connect(url, subprotocols=["streamlit"], origin=f"http://127.0.0.1:{port}",
+                 max_size=None, open_timeout=30) as ws:
+        _, radio, _ = _rerun(ws)
+        if radio is None:
+            raise RuntimeError(f"Radio de navigation introuvable sur le port {port}")
+        radio_id, options = radio
+        cycle = itertools.cycle(pages or options)
+        latencies, sizes, errors = [], [], 0
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            size, _, error = _rerun(ws, radio_id, next(cycle))
+            latencies.append(time.perf_counter() - t0)
+            sizes.append(size)
+            errors += error
+    return latencies, sizes, errors
+
+
+def load(ports, users, duration, pages=None):
+    """Lance `users` utilisateurs répartis sur `ports` ; résumé du débit et des latences."""
+    with ProcessPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(virtual_user, ports[i % len(ports)], duration, pages)
+                   for i in range(users)]
+        results = [f.result() for f in futures]
+    latencies = np.concatenate([np.asarray(r[0]) for r in results])
+    return {
+        "workers": len(ports),
+        "users": users,
+        "reruns": len(latencies),
+        "throughput": len(latencies) / duration,
+        "p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "p95_ms": 1000 * float(np.percentile(latencies, 95)),
+        "kb_per_rerun": float(np.mean(np.concatenate([r[1] for r in results]))) / 1024,
+        "errors": sum(r[2] for r in results),
+    }
+
+
+def scale(counts, users_per_worker, duration, base_port=deploy.DEFAULT_BASE_PORT, pages=None):
+    """Mesure le débit pour chaque nombre de workers (lance puis arrête deploy.py)."""
+    rows = []
+    for n in counts:
+        proc = subprocess.Popen(
+            [sys.executable, deploy.__file__, "run", "--workers", str(n), "--lb", "none",
+             "--base-port", str(base_port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            ports = deploy.worker_ports(n, base_port)
+            if len(deploy.wait_healthy(ports, timeout=120)) != n:
+                raise RuntimeError(f"{n} worker(s) non démarrés")
+            load(ports, n, 3, pages)   # préchauffage : imports des pages, caches
+            rows.append(load(ports, users_per_worker * n, duration, pages))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+    return rows
+
+
+def _print(row, ref=None):
+    ratio = f"  x{row['throughput'] / ref:.2f}" if ref else ""
+    print(f"{row['workers']:3d} worker(s) {row['users']:4d} utilisateurs  "
+          f"{row['throughput']:8.1f} reruns/s{ratio}  p50 {row['p50_ms']:7.1f} ms  "
+          f"p95 {row['p95_ms']:7.1f} ms  {row['kb_per_rerun']:6.0f} Ko/rerun  "
+          f"{row['errors']} erreur(s)")
+
+
+def _ports(spec):
+    if "-" in spec:
+        a, b = (int(x) for x in spec.split("-"))
+        return list(range(a, b + 1))
+    return [int(x) for x in spec.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ports", default=None, help="workers déjà lancés, ex. 8501-8504")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--scale", default=None, help="nombres de workers, ex. 1,2,4")
+    parser.add_argument("--users-per-worker", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--page", action="append", default=None,
+                        help="page à rejouer (répétable ; toutes par défaut)")
+    args = parser.parse_args(argv)
+
+    if args.scale:
+        rows = scale([int(n) for n in args.scale.split(",")], args.users_per_worker,
+                     args.duration, pages=args.page)
+        ref = rows[0]["throughput"] / rows[0]["workers"]
+        for row in rows:
+            _print(row, ref)
+        failed = any(r["errors"] for r in rows)
+    else:
+        ports = _ports(args.ports or str(deploy.DEFAULT_BASE_PORT))
+        row = load(ports, args.users, args.duration, args.page)
+        _print(row)
+        failed = bool(row["errors"])
+    print(f"({os.cpu_count()} CPU disponibles)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
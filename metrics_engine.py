@@ -0,0 +1,170 @@
+"""Moteur de métriques sur scores OOF triés une seule fois.
+
+Les scores sont triés par ordre décroissant puis les sommes cumulées des
+positifs / négatifs donnent, pour chaque seuil distinct, TP et FP : précision,
+rappel et F1 à tous les seuils en O(n log n), et dans la même passe l'AUC,
+l'AP, les courbes PR / ROC, le seuil `t*` (F1 max) et le Brier.
+
+Les intervalles de confiance bootstrap réutilisent le même tri : chaque
+rééchantillonnage est un vecteur de poids (bootstrap de Poisson), et un lot
+de rééchantillonnages est évalué d'un coup par des sommes cumulées pondérées
+sur une matrice lots × n.
+
+    ev = evaluate(y, proba)
+    ev.t_star, ev.auc, ev.ap
+    ev.table("S1_spatial", "lgbm")   # lignes 0.5 / t* de metrics_<scénario>.csv
+    bootstrap(y, proba, n_boot=200)
+"""
+import numpy as np
+import pandas as pd
+
+METRICS = ["AUC", "AP", "F1", "Precision", "Recall", "Brier"]
+
+# Taille max (éléments) d'une matrice de poids bootstrap traitée en un lot
+BOOT_BATCH_ELEMENTS = 20_000_000
+
+
+def _f1(precision, recall):
+    denom = precision + recall
+    return np.divide(2 * precision * recall, denom, out=np.zeros_like(denom), where=denom > 0)
+
+
+def _auc_ap(tp, fp):
+    """AUC (trapèzes sur la ROC) et AP (définition sklearn) depuis TP/FP cumulés.
+
+    `tp`, `fp` : (..., k) aux k seuils distincts décroissants.
+    """
+    pos, neg = tp[..., -1:], fp[..., -1:]
+    tpr = np.concatenate([np.zeros_like(pos), tp], axis=-1) / np.maximum(pos, 1e-12)
+    fpr = np.concatenate([np.zeros_like(neg), fp], axis=-1) / np.maximum(neg, 1e-12)
+    auc = np.sum(np.diff(fpr, axis=-1) * (tpr[..., 1:] + tpr[..., :-1]) / 2, axis=-1)
+    precision = tp / np.maximum(tp + fp, 1e-12)
+    ap = np.sum(np.diff(tpr, axis=-1) * precision, axis=-1)
+    return auc, ap
+
+
+class Evaluation:
+    """Métriques d'un vecteur de scores, calculées depuis un seul tri."""
+
+    def __init__(self, y, proba):
+        y = np.asarray(y, dtype=np.float64)
+        proba = np.asarray(proba, dtype=np.float64)
+        if y.shape != proba.shape or y.ndim != 1:
+            raise ValueError("y et proba doivent être deux vecteurs de même longueur")
+        order = np.argsort(-proba, kind="stable")
+        self.y_sorted = y[order]
+        self.scores = proba[order]
+        self.brier = float(np.mean((proba - y) ** 2))
+
+        # Dernier indice de chaque groupe de scores égaux = seuils distincts
+        last = np.flatnonzero(np.diff(self.scores) != 0)
+        self._idx = np.append(last, len(self.scores) - 1)
+        self.thresholds = self.scores[self._idx]
+        self._cum_pos = cum_pos = np.cumsum(self.y_sorted)
+        self.tp = cum_pos[self._idx]
+        self.fp = (self._idx + 1) - self.tp
+        self.n_pos = float(cum_pos[-1])
+        self.n_neg = float(len(y) - self.n_pos)
+
+        self.precision = self.tp / (self.tp + self.fp)
+        self.recall = self.tp / max(self.n_pos, 1e-12)
+        self.f1 = _f1(self.precision, self.recall)
+        auc, ap = _auc_ap(self.tp, self.fp)
+        self.auc, self.ap = float(auc), float(ap)
+
+    @property
+    def t_star(self):
+        """Seuil maximisant le F1 (le plus haut en cas d'égalité)."""
+        return float(self.thresholds[np.argmax(self.f1)])
+
+    def at(self, threshold):
+        """Métriques de la décision `proba >= threshold`."""
+        # Nombre de scores >= seuil (scores triés décroissants)
+        n = int(np.searchsorted(-self.scores, -threshold, side="right"))
+        tp = float(self._cum_pos[n - 1]) if n else 0.0
+        precision = tp / n if n else 0.0
+        recall = tp / self.n_pos if self.n_pos else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {"AUC": self.auc, "AP": self.ap, "F1": f1,
+                "Precision": precision, "Recall": recall, "Brier": self.brier}
+
+    def table(self, scenario, variant):
+        """Lignes `seuil` 0.5 et t* au format de metrics_<scénario>.csv."""
+        t = self.t_star
+        return pd.DataFrame([
+            {"scenario": scenario, "variant": variant, "seuil": "0.5", "t_star": None, **self.at(0.5)},
+            {"scenario": scenario, "variant": variant, "seuil": "t*", "t_star": t, **self.at(t)},
+        ], columns=["scenario", "variant", "seuil", "t_star"] + METRICS)
+
+    # ---------- courbes ----------
+    def pr_curve(self):
+        """(rappel, précision, seuils) aux seuils distincts décroissants."""
+        return self.recall, self.precision, self.thresholds
+
+    def roc_curve(self):
+        """(FPR, TPR, seuils), point (0, 0) inclus."""
+        fpr = np.append(0.0, self.fp / max(self.n_neg, 1e-12))
+        tpr = np.append(0.0, self.recall)
+        return fpr, tpr, np.append(np.inf, self.thresholds)
+
+    def curves(self, max_points=500):
+        """Courbes PR et ROC sous-échantillonnées (table longue, pour CSV / figures)."""
+        rec, prec, thr = self.pr_curve()
+        fpr, tpr, rthr = self.roc_curve()
+        out = []
+        for name, x, y, t in (("PR", rec, prec, thr), ("ROC", fpr, tpr, rthr)):
+            keep = np.unique(np.linspace(0, len(x) - 1, min(max_points, len(x))).round().astype(int))
+            out.append(pd.DataFrame({"curve": name, "x": x[keep], "y": y[keep], "threshold": t[keep]}))
+        return pd.concat(out, ignore_index=True)
+
+
+def evaluate(y, proba):
+    return Evaluation(y, proba)
+
+
+def bootstrap(y, proba, n_boot=200, threshold=None, alpha=0.05, seed=0):
+    """Intervalles de confiance bootstrap des métriques (au seuil `t*` par défaut).
+
+    Renvoie un DataFrame indexé par métrique : estimation, borne basse, borne
+    haute. Les rééchantillonnages sont des poids de Poisson(1) évalués par
+    lots sur l'ordre de tri commun.
+    """
+    ev = Evaluation(y, proba)
+    threshold = ev.t_star if threshold is None else threshold
+    n = len(ev.scores)
+    n_above = int(np.searchsorted(-ev.scores, -threshold, side="right"))
+    sq_err = (ev.scores - ev.y_sorted) ** 2
+    y32 = ev.y_sorted.astype(np.float32)
+    rng = np.random.default_rng(seed)
+    batch = max(1, min(n_boot, BOOT_BATCH_ELEMENTS // max(n, 1)))
+
+    draws = {m: [] for m in METRICS}
+    for start in range(0, n_boot, batch):
+        b = min(batch, n_boot - start)
+        w = rng.poisson(1.0, size=(b, n)).astype(np.float32)
+        cum_pos = np.cumsum(w * y32, axis=1)
+        cum_all = np.cumsum(w, axis=1)
+        tp = cum_pos[:, ev._idx]
+        fp = cum_all[:, ev._idx] - tp
+        auc, ap = _auc_ap(tp, fp)
+        draws["AUC"].append(auc)
+        draws["AP"].append(ap)
+        draws["Brier"].append((w @ sq_err) / cum_all[:, -1])
+
+        pos = cum_pos[:, -1]
+        tp_t = cum_pos[:, n_above - 1] if n_above else np.zeros(b)
+        all_t = cum_all[:, n_above - 1] if n_above else np.zeros(b)
+        precision = np.divide(tp_t, all_t, out=np.zeros(b), where=all_t > 0)
+        recall = np.divide(tp_t, pos, out=np.zeros(b), where=pos > 0)
+        draws["Precision"].append(precision)
+        draws["Recall"].append(recall)
+        draws["F1"].append(_f1(precision, recall))
+
+    point = ev.at(threshold)
+    rows = []
+    for m in METRICS:
+        d = np.concatenate(draws[m])
+        rows.append({"metric": m, "value": point[m],
+                     "ci_low": float(np.quantile(d, alpha / 2)),
+                     "ci_high": float(np.quantile(d, 1 - alpha / 2))})
+    return pd.DataFrame(rows).set_index("metric")
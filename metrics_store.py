@@ -0,0 +1,148 @@
+"""Métriques des modèles lues depuis les CSV d'entraînement, pour la page 5.
+
+Les sections 5.1, 5.2 et 5.4 affichaient des instantanés (tableaux PNG,
+HTML Plotly) de données qui existent déjà dans `metrics_<scénario>.csv` et
+`curves_<scénario>.csv` (cf. train_search.write_artifacts). Ici, les CSV
+présents dans `Input_Site_Web` sont découverts par le manifeste (cf.
+artifact_manifest.py) et lus une fois dans le cache d'assets ; tables
+filtrées, gains entre scénarios et figures en sont dérivés à l'affichage.
+Un nouveau scénario ou une nouvelle variante apparaît sans code à changer.
+"""
+import fnmatch
+import os
+
+import pandas as pd
+
+from artifact_manifest import INPUT_DIR, get_manifest
+from asset_cache import get_cache
+from metrics_engine import METRICS
+
+METRICS_PATTERN = "metrics_*.csv"
+CURVES_PATTERN = "curves_*.csv"
+
+SEUILS = ["t*", "0.5"]
+BASE_SCENARIO = "S0_baseline"
+DEFAULT_VARIANT = "lgbm"
+
+# Métriques affichées en barres (le Brier n'est pas sur la même échelle)
+BAR_METRICS = ["AP", "AUC", "F1", "Precision", "Recall"]
+
+
+def _paths(pattern):
+    return [
+        os.path.join(INPUT_DIR, name)
+        for name in get_manifest().as_dict()
+        if "/" not in name and fnmatch.fnmatch(name, pattern)
+    ]
+
+
+def _read_csv(path):
+    return pd.read_csv(path, dtype={"scenario": str, "variant": str, "seuil": str})
+
+
+def _load(pattern, kind):
+    frames = [get_cache().get(p, kind, _read_csv) for p in sorted(_paths(pattern))]
+    frames = [f for f in frames if f is not None and not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_metrics():
+    """Toutes les lignes `metrics_*.csv` (scenario, variant, seuil, t_star, métriques)."""
+    return _load(METRICS_PATTERN, "metrics:csv")
+
+
+def load_curves():
+    """Courbes PR / ROC de `curves_*.csv`, colonne `scenario` ajoutée."""
+    frames = []
+    for path in sorted(_paths(CURVES_PATTERN)):
+        df = get_cache().get(path, "metrics:curves", _read_csv)
+        if df is not None and not df.empty:
+            scenario = os.path.basename(path)[len("curves_"):-len(".csv")]
+            frames.append(df.assign(scenario=scenario))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def table(metrics, scenarios=None, variants=None, seuil=None):
+    """Lignes filtrées (listes vides ou None = pas de filtre)."""
+    mask = pd.Series(True, index=metrics.index)
+    if scenarios:
+        mask &= metrics["scenario"].isin(scenarios)
+    if variants:
+        mask &= metrics["variant"].isin(variants)
+    if seuil is not None:
+        mask &= metrics["seuil"] == seuil
+    return metrics.loc[mask, ["scenario", "variant", "seuil", "t_star", *METRICS]].reset_index(drop=True)
+
+
+def gains(metrics, base=BASE_SCENARIO, other="S1_spatial", seuil="t*"):
+    """Gains de `other` sur `base` par variante commune (Brier : baisse comptée positivement).
+
+    Colonnes `d_<métrique>` (absolu) et `d_<métrique>_pct` (relatif à `base`).
+    """
+    at = metrics[metrics["seuil"] == seuil]
+    s0 = at[at["scenario"] == base].set_index("variant")[METRICS]
+    s1 = at[at["scenario"] == other].set_index("variant")[METRICS]
+    variants = [v for v in s0.index if v in s1.index]
+    out = pd.DataFrame({"variant": variants})
+    for m in METRICS:
+        d = (s0.loc[variants, m] - s1.loc[variants, m]) if m == "Brier" \
+            else (s1.loc[variants, m] - s0.loc[variants, m])
+        out[f"d_{m}"] = d.to_numpy()
+        out[f"d_{m}_pct"] = (100 * d / s0.loc[variants, m]).to_numpy()
+    return out
+
+
+# =========================
+# FIGURES
+# =========================
+
+def bar_figure(rows, scenario, height=520):
+    """Métriques d'une ligne `metrics` (variante @ t*) en barres."""
+    import plotly.graph_objects as go
+
+    r = rows.iloc[0]
+    fig = go.Figure(go.Bar(
+        x=BAR_METRICS, y=[r[m] for m in BAR_METRICS], text=[f"{r[m]:.3f}" for m in BAR_METRICS],
+    ))
+    fig.update_layout(
+        title=f"{scenario} — {r['variant']} @ t* = {r['t_star']:.3f}",
+        yaxis=dict(range=[0, 1]), height=height, template="plotly_white",
+    )
+    return fig
+
+
+def gains_figure(g, metric="AUC", title=None, height=520):
+    """Gains relatifs (%) d'une métrique par variante."""
+    import plotly.graph_objects as go
+
+    y = g[f"d_{metric}_pct"]
+    fig = go.Figure(go.Bar(
+        x=g["variant"], y=y, text=[f"{v:+.1f} %" for v in y], name=f"Gain % {metric}",
+        marker_color=["#2e86c1" if v >= 0 else "#c0392b" for v in y],
+    ))
+    fig.update_layout(
+        title=title or f"Gains relatifs (%) — {metric} (S1 vs S0)",
+        height=height, template="plotly_white", yaxis_title="%",
+    )
+    fig.add_hline(y=0, line=dict(color="#999", dash="dot"))
+    return fig
+
+
+def curves_figure(curves, curve="PR", height=520):
+    """Courbes PR ou ROC (une trace par scénario × variante)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    sub = curves[curves["curve"] == curve]
+    for (scenario, variant), c in sub.groupby(["scenario", "variant"], sort=True):
+        fig.add_trace(go.Scatter(x=c["x"], y=c["y"], mode="lines", name=f"{scenario} – {variant}",
+                                 customdata=c["threshold"],
+                                 hovertemplate="seuil %{customdata:.3f}<br>(%{x:.3f}, %{y:.3f})"))
+    if curve == "ROC":
+        fig.add_shape(type="line", x0=0, y0=0, x1=1, y1=1, line=dict(color="#999", dash="dot"))
+    fig.update_layout(
+        height=height, template="plotly_white",
+        xaxis_title="Rappel" if curve == "PR" else "Taux de faux positifs",
+        yaxis_title="Précision" if curve == "PR" else "Taux de vrais positifs",
+    )
+    return fig
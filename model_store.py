@@ -0,0 +1,282 @@
+"""Magasin de modèles projeté en mémoire : boosters natifs et SHAP en `.npy`.
+
+En mode multi-réplicas (cf. deploy.py), chaque worker dépicklait sa copie du
+pipeline joblib puis recalculait les SHAP de ses filtres. Le magasin écrit,
+une fois et par scénario × variante, dans `<BAAC_MODEL_DIR>/<scénario>_<variante>/` :
+
+- `booster.txt` : booster LightGBM au format natif, rechargé par
+  `lightgbm.Booster(model_file=...)` (ni unpickle ni scikit-learn) ;
+- `shap.npy`, `X.npy` : contributions TreeSHAP et variables (float32, n × p)
+  de tout le magasin de variables ; `dep.npy`, `agg.npy` : colonnes de filtre ;
+- `meta.json` : format, scénario, variante, `t_star`, variables et leurs
+  types, valeur de base, libellés des départements, empreintes du modèle
+  source et du magasin de variables.
+
+Les `.npy` sont ouverts avec `mmap_mode="r"` : tous les workers partagent les
+mêmes pages physiques, et expliquer un filtre revient à sélectionner des
+lignes. Un magasin dont le modèle source (joblib) ou le magasin de variables
+a changé depuis sa construction est ignoré (retour au calcul à la demande).
+
+    python model_store.py build                  # tous les scénarios
+    python model_store.py build S1_spatial --variant lgbm
+    python model_store.py status
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifact_manifest import get_manifest, sha256_file
+from asset_cache import file_signature, get_cache
+
+STORE_FORMAT = 1
+ARRAYS = ("shap", "X", "dep", "agg")
+
+_model_shas = {}   # (chemin, signature) -> SHA-256, fichiers hors manifeste
+_model_shas_lock = threading.Lock()
+
+
+def store_dir(model_dir, scenario, variant):
+    return os.path.join(model_dir, f"{scenario}_{variant}")
+
+
+def model_sha256(path):
+    """Empreinte du fichier modèle source, None s'il n'existe pas."""
+    manifest = get_manifest()
+    if manifest.covers(path):
+        entry = manifest.get(path)
+        return entry.sha256 if entry is not None else None
+    sig = file_signature(path)
+    if sig is None:
+        return None
+    key = (os.path.abspath(path), sig)
+    with _model_shas_lock:
+        if key not in _model_shas:
+            _model_shas[key] = sha256_file(path)
+        return _model_shas[key]
+
+
+def features_version(feature_store):
+    """Empreinte du manifeste du magasin de variables (années et fichiers bruts)."""
+    text = json.dumps(feature_store.manifest(), sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BoosterModel:
+    """Booster LightGBM natif avec l'interface attendue par scoring / explain."""
+
+    def __init__(self, booster):
+        self.booster_ = booster
+        self.feature_names_in_ = np.asarray(booster.feature_name(), dtype=object)
+
+    def predict_proba(self, X):
+        p = self.booster_.predict(X)
+        return np.column_stack([1 - p, p])
+
+
+class StoredModel:
+    """Magasin d'un scénario × variante : méta-données, booster et tableaux projetés."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.features = self.meta["features"]
+        self.t_star = self.meta["t_star"]
+        self.base = self.meta["base_value"]
+        self._model = None
+        self._arrays = None
+        self._lock = threading.Lock()
+
+    @property
+    def source(self):
+        """Fichier de référence du magasin (clé du cache d'assets)."""
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                import lightgbm
+
+                booster = lightgbm.Booster(model_file=os.path.join(self.path, "booster.txt"))
+                self._model = BoosterModel(booster)
+            return self._model
+
+    @property
+    def arrays(self):
+        """Tableaux du magasin, projetés en lecture seule (None sans SHAP)."""
+        with self._lock:
+            if self._arrays is None and self.meta.get("n_rows"):
+                self._arrays = {
+                    name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r",
+                                  allow_pickle=False)
+                    for name in ARRAYS
+                }
+            return self._arrays
+
+    def select(self, deps=None, agg=None, max_rows=None, seed=0):
+        """Indices des lignes du filtre (au plus `max_rows`, échantillon reproductible)."""
+        arrays = self.arrays
+        mask = np.ones(self.meta["n_rows"], dtype=bool)
+        if deps:
+            labels = self.meta["dep_labels"]
+            codes = [labels.index(d) for d in deps if d in labels]
+            mask &= np.isin(arrays["dep"], codes)
+        if agg is not None:
+            mask &= arrays["agg"] == agg
+        idx = np.flatnonzero(mask)
+        if max_rows is not None and len(idx) > max_rows:
+            rng = np.random.default_rng(seed)
+            idx = np.sort(rng.choice(idx, size=max_rows, replace=False))
+        return idx
+
+    def frame(self, idx):
+        """Variables des lignes `idx`, avec leurs types d'origine."""
+        X = self.arrays["X"][idx]
+        dtypes = self.meta["dtypes"]
+        return pd.DataFrame({
+            name: X[:, j].astype(dtypes[name]) for j, name in enumerate(self.features)
+        })
+
+    @property
+    def nbytes(self):
+        return sum(
+            os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path)
+        )
+
+
+def open_store(model_dir, scenario, variant, source=None, feature_store=None):
+    """Magasin courant du scénario × variante, None s'il manque ou est périmé.
+
+    Périmé : format différent, modèle `source` (joblib) modifié depuis la
+    construction, ou magasin de variables `feature_store` mis à jour.
+    """
+    path = store_dir(model_dir, scenario, variant)
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    stored = get_cache().get(meta_path, "model_store", lambda _p: StoredModel(path),
+                            cost=lambda _s: 0)
+    if stored is None or stored.meta.get("format") != STORE_FORMAT:
+        return None
+    if source is not None:
+        sha = model_sha256(source)
+        if sha is not None and sha != stored.meta["model_sha256"]:
+            return None
+    if feature_store is not None and stored.meta.get("n_rows"):
+        if features_version(feature_store) != stored.meta["features_version"]:
+            return None
+    return stored
+
+
+def build(scenario, variant, model_dir=None, with_shap=True):
+    """Construit le magasin d'un scénario depuis son pipeline joblib ; renvoie son chemin."""
+    import joblib
+
+    import explain
+    import scoring
+
+    model_dir = model_dir or scoring.MODEL_DIR
+    source = scoring.model_path(scenario)
+    model = joblib.load(source)
+    pre, clf = explain._split(model)
+    if pre is not None:
+        raise ValueError(f"{scenario} : prétraitement avant le booster non pris en charge")
+    features = scoring._feature_names(model)
+
+    meta = {
+        "format": STORE_FORMAT,
+        "scenario": scenario,
+        "variant": variant,
+        "t_star": scoring.load_t_star(scenario, variant),
+        "features": features,
+        "model_sha256": sha256_file(source),
+        "base_value": 0.0,
+        "n_rows": 0,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    arrays = {}
+    if with_shap:
+        store = explain.FeatureStore()
+        df = store.load()
+        if not df.empty:
+            values, base, _ = explain.tree_shap(model, df[features])
+            dep = pd.Categorical(df["dep"])
+            arrays = {
+                "shap": values,
+                "X": df[features].to_numpy(dtype=np.float32),
+                "dep": dep.codes.astype(np.int16),
+                "agg": df["agg"].to_numpy(dtype=np.int8),
+            }
+            meta.update(
+                base_value=base,
+                n_rows=len(df),
+                dtypes={f: str(df[f].dtype) for f in features},
+                dep_labels=[str(d) for d in dep.categories],
+                features_version=features_version(store),
+            )
+
+    target = store_dir(model_dir, scenario, variant)
+    tmp = f"{target}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    clf.booster_.save_model(os.path.join(tmp, "booster.txt"))
+    for name, a in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(a), allow_pickle=False)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    # Les workers qui projettent l'ancienne version gardent leurs pages
+    old = f"{target}.old{os.getpid()}"
+    if os.path.isdir(target):
+        os.rename(target, old)
+    os.rename(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+def main(argv=None):
+    import scoring
+    from feature_pipeline import FeatureStore
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("scenarios", nargs="*", default=list(scoring.SCENARIOS))
+    parser.add_argument("--variant", default=scoring.DEFAULT_VARIANT)
+    parser.add_argument("--no-shap", action="store_true", help="booster seul, sans SHAP")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for scenario in args.scenarios:
+        source = scoring.model_path(scenario)
+        if args.command == "build":
+            if not os.path.exists(source):
+                print(f"{scenario:12s} modèle introuvable : {source}")
+                failed = True
+                continue
+            t0 = time.perf_counter()
+            path = build(scenario, args.variant, with_shap=not args.no_shap)
+            stored = StoredModel(path)
+            print(f"{scenario:12s} {stored.meta['n_rows']:9,d} lignes  "
+                  f"{stored.nbytes / 1024 / 1024:7.1f} Mo  {time.perf_counter() - t0:5.1f} s  {path}")
+            continue
+        stored = open_store(scoring.MODEL_DIR, scenario, args.variant, source, FeatureStore())
+        if stored is None:
+            exists = os.path.isdir(store_dir(scoring.MODEL_DIR, scenario, args.variant))
+            print(f"{scenario:12s} {'périmé' if exists else 'absent'}")
+            failed = True
+        else:
+            print(f"{scenario:12s} à jour  {stored.meta['n_rows']:9,d} lignes  "
+                  f"{stored.nbytes / 1024 / 1024:7.1f} Mo  (construit {stored.meta['built_at']})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Instrumentation des reruns de app.py : temps, E/S, décodage, octets émis.
+
+Chaque exécution du script est un « run » rattaché à une page :
+
+- temps total du script, de `st.set_page_config` et de l'import de la
+  page (à sa première visite, `import:<page>`) ;
+- temps passé dans les chargements du cache d'assets, par catégorie
+  (`io` pour les lectures, `decode` pour les images, puis `plotly`,
+  `pyramid`, `hexbin`, `shap`… selon le type d'entrée, cf. asset_cache.py) ;
+- octets et nombre de messages envoyés au navigateur (ForwardMsg).
+
+Les derniers runs de chaque page sont gardés en mémoire ; `snapshot()`
+(JSON) et `prometheus()` (format texte Prometheus) les résument. Panneau de
+debug dans la barre latérale avec `?debug=perf` ou `BAAC_PERF_PANEL=1` ;
+`BAAC_PERF_DUMP=chemin.json` écrit le résumé après chaque run.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+PANEL_ENV_VAR = "BAAC_PERF_PANEL"
+DUMP_ENV_VAR = "BAAC_PERF_DUMP"
+HISTORY = 200   # runs gardés par page
+
+_local = threading.local()
+_lock = threading.Lock()
+_history = defaultdict(lambda: deque(maxlen=HISTORY))
+
+
+class Run:
+    """Mesures d'une exécution du script."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.page = None
+        self.seconds = None
+        self.spans = defaultdict(lambda: [0.0, 0])   # catégorie -> [secondes, appels]
+        self.bytes = 0
+        self.messages = 0
+        self._lock = threading.Lock()   # spans aussi écrits par les threads liés (bind)
+
+    def add_span(self, category, seconds):
+        with self._lock:
+            acc = self.spans[category]
+            acc[0] += seconds
+            acc[1] += 1
+
+    def add_message(self, nbytes):
+        with self._lock:
+            self.bytes += nbytes
+            self.messages += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "page": self.page,
+                "script_s": self.seconds,
+                "spans": {k: {"s": v[0], "calls": v[1]} for k, v in self.spans.items()},
+                "bytes": self.bytes,
+                "messages": self.messages,
+            }
+
+
+def current():
+    return getattr(_local, "run", None)
+
+
+@contextmanager
+def bind(run):
+    """Rattache le thread courant au run `run` (travail délégué à un pool)."""
+    previous = current()
+    _local.run = run
+    try:
+        yield
+    finally:
+        _local.run = previous
+
+
+@contextmanager
+def span(category):
+    """Ajoute la durée du bloc à la catégorie du run courant (sans effet hors run)."""
+    run = current()
+    if run is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_span(category, time.perf_counter() - t0)
+
+
+def _hook_enqueue(run):
+    """Compte les octets des ForwardMsg envoyés pendant le run.
+
+    S'appuie sur `ScriptRunContext._enqueue`, attribut privé de Streamlit
+    (présent jusqu'à la 1.65 au moins) : s'il disparaît, les octets et
+    messages restent à 0 sans autre effet.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return
+    ctx = get_script_run_ctx()
+    if ctx is None or not hasattr(ctx, "_enqueue"):
+        return
+    inner = getattr(ctx._enqueue, "_perf_inner", ctx._enqueue)
+
+    def enqueue(msg):
+        r = current()
+        if r is not None:
+            r.add_message(msg.ByteSize())
+        inner(msg)
+
+    enqueue._perf_inner = inner
+    ctx._enqueue = enqueue
+
+
+def start_run():
+    """Ouvre un run pour le thread du script (à appeler en tête de app.py)."""
+    run = Run()
+    _local.run = run
+    _hook_enqueue(run)
+    return run
+
+
+def finish_run(page):
+    """Clôt le run courant, l'enregistre pour `page` et renvoie ses mesures.
+
+    Sans page (run interrompu avant la navigation), le run est abandonné.
+    """
+    run = current()
+    _local.run = None
+    if run is None or page is None:
+        return None
+    run.page = page
+    run.seconds = time.perf_counter() - run.t0
+    with _lock:
+        _history[page].append(run.as_dict())
+    path = os.environ.get(DUMP_ENV_VAR)
+    if path:
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f, indent=1)
+        os.replace(tmp, path)
+    return run.as_dict()
+
+
+def last_run(page):
+    with _lock:
+        runs = _history.get(page)
+        return runs[-1] if runs else None
+
+
+def _percentiles(values):
+    import numpy as np
+
+    if not values:
+        return {}
+    v = np.asarray(values, dtype=float)
+    return {"p50": float(np.percentile(v, 50)), "p95": float(np.percentile(v, 95)),
+            "p99": float(np.percentile(v, 99)), "max": float(v.max())}
+
+
+def snapshot():
+    """Résumé JSON-sérialisable : percentiles par page."""
+    with _lock:
+        pages = {page: list(runs) for page, runs in _history.items()}
+    out = {"pages": {}}
+    for page, runs in pages.items():
+        categories = sorted({c for r in runs for c in r["spans"]})
+        out["pages"][page] = {
+            "runs": len(runs),
+            "script_s": _percentiles([r["script_s"] for r in runs]),
+            "bytes": _percentiles([r["bytes"] for r in runs]),
+            "spans_s": {
+                c: _percentiles([r["spans"].get(c, {"s": 0.0})["s"] for r in runs])
+                for c in categories
+            },
+        }
+    return out
+
+
+def prometheus():
+    """Résumé au format texte Prometheus (quantiles par page)."""
+    snap = snapshot()
+    lines = ["# TYPE baac_app_script_seconds summary", "# TYPE baac_app_bytes summary",
+              "# TYPE baac_app_span_seconds summary"]
+    for page, s in snap["pages"].items():
+        label = page.replace("\\", "\\\\").replace('"', '\\"')
+        for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f'baac_app_script_seconds{{page="{label}",quantile="{q}"}} {s["script_s"][key]:.6f}')
+            lines.append(f'baac_app_bytes{{page="{label}",quantile="{q}"}} {s["bytes"][key]:.0f}')
+            for c, p in s["spans_s"].items():
+                lines.append(
+                    f'baac_app_span_seconds{{page="{label}",category="{c}",quantile="{q}"}} {p[key]:.6f}'
+                )
+        lines.append(f'baac_app_script_seconds_count{{page="{label}"}} {s["runs"]}')
+    return "\n".join(lines) + "\n"
+
+
+def panel_enabled():
+    import streamlit as st
+
+    if os.environ.get(PANEL_ENV_VAR) == "1":
+        return True
+    try:
+        return st.query_params.get("debug") == "perf"
+    except Exception:
+        return False
+
+
+def show_panel(run):
+    """Panneau de debug (barre latérale) : run courant + exports."""
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.markdown(
+            f"**Script** : {1000 * run['script_s']:.0f} ms  \n"
+            f"**Émis** : {run['bytes'] / 1024:.0f} Ko ({run['messages']} messages)"
+        )
+        for c, v in sorted(run["spans"].items(), key=lambda kv: -kv[1]["s"]):
+            st.markdown(f"- `{c}` : {1000 * v['s']:.1f} ms ({v['calls']} appels)")
+        st.download_button("JSON", json.dumps(snapshot(), indent=1), file_name="perf.json",
+                           mime="application/json", key="perf_json")
+        st.download_button("Prometheus", prometheus(), file_name="perf.prom",
+                           mime="text/plain", key="perf_prom")
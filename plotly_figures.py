@@ -0,0 +1,117 @@
+"""Extraction des figures Plotly embarquées dans les HTML de `Input_Site_Web`.
+
+Les HTML exportés par Plotly chargent `plotly-3.1.1.min.js` depuis
+cdn.plot.ly et recréent une iframe (et un runtime de ~4 Mo) par affichage.
+On ne garde ici que la spécification JSON de chaque figure
+(`Plotly.newPlot(id, data, layout, config)`), rendue ensuite avec
+`st.plotly_chart` : le runtime Plotly est celui embarqué par Streamlit,
+servi localement et chargé une seule fois par le navigateur.
+"""
+import base64
+import json
+import re
+import struct
+import sys
+
+from asset_cache import get_cache
+
+_NEWPLOT_RE = re.compile(r'Plotly\.newPlot\(\s*"[^"]*"\s*,\s*')
+
+# Codes dtype des tableaux typés Plotly ("bdata") -> format struct
+_DTYPES = {
+    "f8": "d", "f4": "f",
+    "i1": "b", "u1": "B", "i2": "h", "u2": "H", "i4": "i", "u4": "I",
+}
+
+
+def _decode_typed_arrays(obj):
+    """Remplace les tableaux typés base64 ({"dtype", "bdata"}) par des listes."""
+    if isinstance(obj, dict):
+        if "bdata" in obj and "dtype" in obj and obj["dtype"] in _DTYPES:
+            code = _DTYPES[obj["dtype"]]
+            raw = base64.b64decode(obj["bdata"])
+            values = list(struct.unpack(f"<{len(raw) // struct.calcsize(code)}{code}", raw))
+            shape = obj.get("shape")
+            if isinstance(shape, str):
+                shape = [int(s) for s in shape.split(",")]
+            if shape and len(shape) == 2:
+                n = shape[1]
+                values = [values[i:i + n] for i in range(0, len(values), n)]
+            return values
+        return {k: _decode_typed_arrays(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode_typed_arrays(v) for v in obj]
+    return obj
+
+
+def _skip_ws(s, pos):
+    while s[pos].isspace():
+        pos += 1
+    return pos
+
+
+def extract_figures(html_str):
+    """Liste des specs {"data", "layout", "config"} trouvées dans le HTML.
+
+    ValueError si un appel `Plotly.newPlot` ou un tableau typé est illisible.
+    """
+    decoder = json.JSONDecoder()
+    figures = []
+    for m in _NEWPLOT_RE.finditer(html_str):
+        pos = m.end()
+        args = []
+        try:
+            for _ in range(3):
+                value, pos = decoder.raw_decode(html_str, pos)
+                args.append(value)
+                pos = _skip_ws(html_str, pos)
+                if html_str[pos] != ",":
+                    break
+                pos = _skip_ws(html_str, pos + 1)
+            data, layout, config = (args + [{}, {}])[:3]
+            figures.append({
+                "data": _decode_typed_arrays(data),
+                "layout": _decode_typed_arrays(layout),
+                "config": config if isinstance(config, dict) else {},
+            })
+        except (IndexError, TypeError, struct.error) as e:
+            raise ValueError(f"Figure Plotly illisible (position {m.start()}) : {e}") from e
+    return figures
+
+
+def to_plotly(spec):
+    """`go.Figure` à partir d'une spec, largeur libérée pour suivre la colonne."""
+    import plotly.graph_objects as go
+
+    layout = dict(spec["layout"])
+    layout.pop("width", None)
+    layout.setdefault("autosize", True)
+    return go.Figure(data=spec["data"], layout=layout, skip_invalid=True)
+
+
+def _load_figures(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [(to_plotly(spec), spec["config"]) for spec in extract_figures(f.read())]
+
+
+def load_figures(path):
+    """Figures Plotly du fichier, (`go.Figure`, config), construites une fois et mises en cache.
+
+    Liste vide si le HTML ne contient pas de figure Plotly, None si le
+    fichier manque ; ValueError s'il est malformé.
+    """
+    return get_cache().get(path, "plotly:figures", _load_figures)
+
+
+def main(paths):
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html_str = f.read()
+        figs = extract_figures(html_str)
+        raw = len(html_str.encode("utf-8"))
+        spec = sum(len(json.dumps(f, separators=(",", ":"))) for f in figs)
+        print(f"{path}: {len(figs)} figure(s), HTML {raw / 1024:.0f} Ko -> spec {spec / 1024:.0f} Ko")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
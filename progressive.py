@@ -0,0 +1,109 @@
+"""Rendu progressif des pages : emplacements d'abord, sections lourdes ensuite.
+
+Une page rendue de haut en bas n'affiche rien sous le premier asset lent
+(HTML Plotly, images, SHAP…) tant qu'il n'est pas chargé. Ici, chaque
+section lourde réserve son emplacement (`st.empty()`, avec un message
+d'attente) à sa place dans la page, et ses chargements (`prefetch`) partent
+dans un pool de threads partagé par les sessions ; le texte qui suit est
+émis aussitôt. En fin de page, chaque emplacement est rempli dès que ses
+chargements sont terminés : la page s'affiche immédiatement et sa durée
+tend vers celle de l'asset le plus lent plutôt que vers leur somme.
+
+Les `prefetch` ne font que remplir le cache d'assets (cf. asset_cache.py)
+avec les chargeurs qu'appellera la section : ils ne touchent pas à
+Streamlit, qui n'accepte d'éléments que du thread du script. Le rendu,
+widgets compris, reste dans ce thread et ne lit que des entrées en cache.
+
+`BAAC_PROGRESSIVE=0` revient au rendu séquentiel (prefetch ignorés).
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import streamlit as st
+
+import perf
+
+PROGRESSIVE_ENV_VAR = "BAAC_PROGRESSIVE"
+WORKERS_ENV_VAR = "BAAC_RENDER_WORKERS"
+DEFAULT_WORKERS = 4
+PLACEHOLDER_TEXT = "⏳ Chargement…"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get(PROGRESSIVE_ENV_VAR, "1") != "0"
+
+
+def get_pool():
+    """Pool de chargement unique du processus (partagé par les sessions)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = int(os.environ.get(WORKERS_ENV_VAR, DEFAULT_WORKERS))
+                _pool = ThreadPoolExecutor(max_workers=max(workers, 1),
+                                           thread_name_prefix="render-prefetch")
+    return _pool
+
+
+def _run_bound(run, fn):
+    with perf.bind(run):
+        return fn()
+
+
+class Sections:
+    """Sections d'une page, remplies dans l'ordre où leurs données sont prêtes.
+
+        sections = progressive.Sections()
+        st.markdown("### 5.3 …")
+        sections.add(lambda: show_html(path), lambda: prefetch_html(path))
+        …
+        sections.fill()   # en fin de page
+    """
+
+    def __init__(self, progressive=None):
+        self.progressive = enabled() if progressive is None else progressive
+        self._pending = []   # (emplacement, render, futures)
+        self._futures = {}   # prefetch -> future (un même chargeur n'est lancé qu'une fois)
+
+    def add(self, render, *prefetch):
+        """Réserve l'emplacement de `render()` et lance ses `prefetch` en tâche de fond.
+
+        Un même `prefetch` (même objet) partagé par plusieurs sections n'est
+        lancé qu'une fois. En rendu séquentiel, `render()` est appelé tout de suite.
+        """
+        if not self.progressive:
+            render()
+            return
+        placeholder = st.empty()
+        placeholder.caption(PLACEHOLDER_TEXT)
+        run = perf.current()
+        futures = []
+        for fn in prefetch:
+            if fn not in self._futures:
+                self._futures[fn] = get_pool().submit(_run_bound, run, fn)
+            futures.append(self._futures[fn])
+        self._pending.append((placeholder, render, futures))
+
+    def fill(self):
+        """Remplit les emplacements au fur et à mesure que leurs chargements aboutissent.
+
+        Une exception d'un `prefetch` remonte ici, comme en rendu séquentiel.
+        """
+        pending = self._pending
+        self._pending, self._futures = [], {}
+        while pending:
+            ready = [p for p in pending if all(f.done() for f in p[2])]
+            if not ready:
+                wait({f for p in pending for f in p[2] if not f.done()}, return_when=FIRST_COMPLETED)
+                continue
+            for item in ready:
+                placeholder, render, futures = item
+                pending.remove(item)
+                for f in futures:
+                    f.result()
+                with placeholder.container():
+                    render()
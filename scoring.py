@@ -0,0 +1,303 @@
+"""Scoring en direct des best modèles LGBM S0 / S1.
+
+Les pipelines sérialisés (`models/best_<scénario>.joblib`, cf.
+`BAAC_MODEL_DIR`) sont chargés une fois par processus ; le booster natif du
+magasin de modèles (cf. model_store.py) leur est préféré s'il est à jour.
+Les prédictions unitaires (formulaire) de toutes les sessions passent par
+un micro-batcher : les lignes arrivées dans une fenêtre de quelques ms sont
+regroupées en un seul appel vectorisé à `predict_proba`. Les fichiers volumineux sont lus,
+scorés et exportés par blocs (cf. batch_scoring.py).
+
+Le seuil de décision est le `t_star` OOF de la variante dans
+`best_params_<scénario>.csv`. Une ligne sans `taux_mortels_dep_feature`
+(accident brut) le reçoit d'après son département, déduit au besoin de ses
+coordonnées (cf. spatial_index.py).
+
+    python scoring.py S1_spatial accidents.csv scores.csv
+    python scoring.py bench S1_spatial
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import model_store
+from feature_pipeline import DEP_RATE_FEATURE, FeatureStore, add_dep_rate
+
+BASE_DIR = os.path.dirname(__file__)
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+MODEL_DIR = os.environ.get("BAAC_MODEL_DIR", os.path.join(INPUT_DIR, "models"))
+
+SCENARIOS = {
+    "S0_baseline": "S0 – baseline",
+    "S1_spatial": "S1 – géographique",
+}
+DEFAULT_VARIANT = "lgbm"
+
+# Micro-batching : taille max d'un lot et attente max avant envoi
+MAX_BATCH = 256
+MAX_WAIT_MS = 5
+# Scoring CSV par blocs
+CHUNK_ROWS = 50_000
+
+# Cibles de latence d'une prédiction unitaire (formulaire), en ms
+LATENCY_TARGET_P50_MS = 20
+LATENCY_TARGET_P99_MS = 100
+
+
+def model_path(scenario):
+    return os.path.join(MODEL_DIR, f"best_{scenario}.joblib")
+
+
+def load_t_star(scenario, variant=DEFAULT_VARIANT):
+    """`t_star` OOF de la variante, lu dans `best_params_<scénario>.csv`."""
+    path = os.path.join(INPUT_DIR, f"best_params_{scenario}.csv")
+    params = pd.read_csv(path)
+    row = params.loc[params["variant"] == variant, "t_star"]
+    if row.empty:
+        raise KeyError(f"Variante {variant!r} absente de {path}")
+    return float(row.iloc[0])
+
+
+def _feature_names(model):
+    names = getattr(model, "feature_names_in_", None)
+    if names is None and hasattr(model, "steps"):
+        names = getattr(model.steps[0][1], "feature_names_in_", None)
+    if names is None:
+        names = getattr(model, "feature_name_", None)
+    return None if names is None else [str(n) for n in names]
+
+
+class _Request:
+    __slots__ = ("row", "done", "proba", "error")
+
+    def __init__(self, row):
+        self.row = row
+        self.done = threading.Event()
+        self.proba = None
+        self.error = None
+
+
+_STOP = object()   # sentinelle : arrête le micro-batcher d'un scorer remplacé
+
+
+class Scorer:
+    """Pipeline d'un scénario + seuil t* + micro-batcher des requêtes unitaires."""
+
+    def __init__(self, scenario, model, t_star, source=None, store=None,
+                 max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.scenario = scenario
+        self.model = model
+        self.t_star = t_star
+        self.source = source or model_path(scenario)   # version du modèle (clé de cache)
+        self.store = store                             # model_store.StoredModel ou None
+        self.features = _feature_names(model)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._latencies = deque(maxlen=2000)   # ms, requêtes unitaires
+        self.batches = 0                       # micro-batcher : écrits par son seul thread
+        self.rows = 0
+
+    # ---------- vectorisé ----------
+    def _frame(self, df):
+        if self.features is None:
+            return df
+        if DEP_RATE_FEATURE in self.features and DEP_RATE_FEATURE not in df:
+            # Accident brut : taux départemental, département déduit de lat / long
+            df = add_dep_rate(df, FeatureStore().cached_state())
+        missing = [c for c in self.features if c not in df.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes pour {self.scenario} : {', '.join(missing)}")
+        return df[self.features]
+
+    def predict_proba(self, df):
+        """Probabilité d'accident mortel pour chaque ligne de `df`."""
+        if len(df) == 0:
+            return np.empty(0)
+        return self.model.predict_proba(self._frame(df))[:, 1]
+
+    def score(self, df):
+        """`df` + colonnes `proba_mortel` et `pred_mortel` (proba >= t*)."""
+        out = df.copy()
+        out["proba_mortel"] = self.predict_proba(df)
+        out["pred_mortel"] = (out["proba_mortel"] >= self.t_star).astype(np.int8)
+        return out
+
+    # ---------- micro-batching ----------
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"scorer-{self.scenario}", daemon=True)
+                self._worker.start()
+
+    def _score_batch(self, batch):
+        try:
+            proba = self.predict_proba(pd.DataFrame([r.row for r in batch]))
+        except Exception as e:
+            if len(batch) == 1:   # renvoyé à son seul appelant
+                batch[0].error = e
+                return
+            # Une ligne invalide ne fait pas échouer les autres requêtes du lot
+            for r in batch:
+                self._score_batch([r])
+            return
+        for r, p in zip(batch, proba):
+            r.proba = float(p)
+        self.batches += 1
+        self.rows += len(batch)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = any(r is _STOP for r in batch)
+            batch = [r for r in batch if r is not _STOP]
+            if batch:
+                self._score_batch(batch)
+                for r in batch:
+                    r.done.set()
+            if stop:
+                with self._worker_lock:
+                    # Requêtes arrivées après close() : servies avant l'arrêt
+                    stop = self._queue.empty()
+                    if stop:
+                        self._worker = None
+
+    def close(self):
+        """Arrête le micro-batcher (scorer remplacé) ; relancé si encore sollicité."""
+        self._queue.put(_STOP)
+
+    def predict_one(self, row, timeout=10.0):
+        """Probabilité pour un accident (dict), via le micro-batcher."""
+        start = time.perf_counter()
+        req = _Request(row)
+        self._queue.put(req)
+        self._ensure_worker()
+        if not req.done.wait(timeout):
+            raise TimeoutError(f"Scoring {self.scenario} : pas de réponse en {timeout} s")
+        if req.error is not None:
+            raise req.error
+        self._latencies.append(1000 * (time.perf_counter() - start))
+        return req.proba
+
+    def latency_report(self):
+        """p50 / p99 (ms) des prédictions unitaires récentes, ou None."""
+        if not self._latencies:
+            return None
+        lat = np.fromiter(self._latencies, dtype=float)
+        return {
+            "n": len(lat),
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p99_ms": float(np.percentile(lat, 99)),
+            "rows_per_batch": self.rows / max(self.batches, 1),
+        }
+
+
+def _sniff_sep(source):
+    """Séparateur (`,` / `;` / tabulation) d'après la ligne d'en-tête."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            head = f.readline()
+    else:
+        pos = source.tell()
+        head = source.readline()
+        source.seek(pos)
+    if isinstance(head, str):
+        head = head.encode()
+    return max([",", ";", "\t"], key=lambda s: head.count(s.encode()))
+
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+
+
+def get_scorer(scenario, variant=DEFAULT_VARIANT):
+    """Scorer du scénario, chargé une fois par processus ; None si pas de modèle.
+
+    Le magasin de modèles est préféré au pipeline joblib quand il a été
+    construit depuis ce même fichier (ou que le joblib n'est pas déployé).
+    """
+    path = model_path(scenario)
+    stored = model_store.open_store(MODEL_DIR, scenario, variant, path)
+    if stored is not None:
+        key = (scenario, variant, stored.source, stored.meta["model_sha256"])
+    elif os.path.exists(path):
+        key = (scenario, variant, path, os.stat(path).st_mtime_ns)
+    else:
+        return None
+    with _scorers_lock:
+        if key not in _scorers:
+            for k in [k for k in _scorers if k[:2] == key[:2]]:
+                _scorers.pop(k).close()
+            if stored is not None:
+                _scorers[key] = Scorer(scenario, stored.model, stored.t_star,
+                                       source=stored.source, store=stored)
+            else:
+                import joblib
+
+                _scorers[key] = Scorer(scenario, joblib.load(path), load_t_star(scenario, variant))
+        return _scorers[key]
+
+
+def bench(scenario, n_requests=2000, n_threads=8, df=None):
+    """Latences p50/p99 du micro-batcher et débit vectorisé (lignes/s)."""
+    scorer = get_scorer(scenario)
+    if scorer is None:
+        raise FileNotFoundError(model_path(scenario))
+    if df is None:
+        df = pd.DataFrame(0, index=range(1000), columns=scorer.features)
+    rows = df.to_dict("records")
+
+    def client(i):
+        for j in range(i, n_requests, n_threads):
+            scorer.predict_one(rows[j % len(rows)])
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    report = scorer.latency_report()
+
+    big = df.sample(200_000, replace=True, random_state=0)
+    start = time.perf_counter()
+    for i in range(0, len(big), CHUNK_ROWS):
+        scorer.predict_proba(big.iloc[i:i + CHUNK_ROWS])
+    report["rows_per_s"] = len(big) / (time.perf_counter() - start)
+    return report
+
+
+def main(argv):
+    if argv[:1] == ["bench"] and len(argv) == 2:
+        r = bench(argv[1])
+        print(f"p50 {r['p50_ms']:.1f} ms (cible {LATENCY_TARGET_P50_MS}) | "
+              f"p99 {r['p99_ms']:.1f} ms (cible {LATENCY_TARGET_P99_MS}) | "
+              f"{r['rows_per_batch']:.0f} lignes/lot | {r['rows_per_s']:,.0f} lignes/s")
+        return 0
+    if len(argv) == 3:
+        import batch_scoring
+
+        return batch_scoring.main(argv)
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
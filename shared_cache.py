@@ -0,0 +1,99 @@
+"""Cache de tableaux partagé entre processus, adressé par contenu, lu en mmap.
+
+En mode multi-réplicas (cf. deploy.py), chaque worker construirait sa propre
+copie des cubes hexbin / EDA. Les tableaux NumPy dérivés d'un fichier source
+sont écrits une fois dans `BAAC_SHARED_CACHE_DIR/<empreinte>/<type>/` (un
+`.npy` par tableau + `meta.json`) puis ouverts par tous les workers avec
+`np.load(mmap_mode="r")` : le noyau partage les pages physiques et un worker
+qui démarre ne fait que projeter les fichiers.
+
+L'empreinte est le SHA-256 du manifeste pour `Input_Site_Web` (cf.
+artifact_manifest.py), sinon chemin + mtime + taille : un fichier source
+modifié donne un nouveau répertoire. Sans BAAC_SHARED_CACHE_DIR, `arrays()`
+se contente d'appeler `build`.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from artifact_manifest import get_manifest
+
+SHARED_DIR_ENV_VAR = "BAAC_SHARED_CACHE_DIR"
+
+
+def shared_dir():
+    """Répertoire du cache partagé, None si le mode partagé est désactivé."""
+    return os.environ.get(SHARED_DIR_ENV_VAR) or None
+
+
+def content_key(path):
+    """Empreinte de la version courante de `path`, None s'il n'existe pas."""
+    manifest = get_manifest()
+    if manifest.covers(path):
+        entry = manifest.get(path)
+        return entry.sha256 if entry is not None else None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    ident = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()
+
+
+def _write(target, arrays, meta):
+    tmp = f"{target}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, a in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(a), allow_pickle=False)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"arrays": sorted(arrays), "meta": meta}, f)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Un autre worker a publié le même contenu entre-temps
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _read(target):
+    with open(os.path.join(target, "meta.json"), "r", encoding="utf-8") as f:
+        info = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+        for name in info["arrays"]
+    }
+    return arrays, info["meta"]
+
+
+def arrays(path, kind, build):
+    """(tableaux, méta) dérivés de `path` par `build(path)`, partagés entre workers.
+
+    `build` renvoie un dict nom -> ndarray (types numériques) et un dict de
+    méta-données JSON-sérialisable. En mode partagé, les tableaux renvoyés
+    sont des projections mémoire en lecture seule.
+    """
+    root = shared_dir()
+    key = content_key(path) if root else None
+    if key is None:
+        return build(path)
+    target = os.path.join(root, key, kind)
+    if not os.path.isdir(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _write(target, *build(path))
+    return _read(target)
+
+
+def prune(keep):
+    """Supprime les entrées dont l'empreinte n'est pas dans `keep` ; renvoie leur nombre."""
+    root = shared_dir()
+    if root is None or not os.path.isdir(root):
+        return 0
+    removed = 0
+    for name in os.listdir(root):
+        if name not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,58 @@
+"""Registre des pages du site.
+
+Chaque page est un module de ce paquet exposant `render()`. Le module (et ses
+dépendances lourdes : pandas, LightGBM, cubes…) n'est importé qu'à la première
+visite de la page, puis reste en mémoire pour les reruns suivants : le
+démarrage et l'accueil ne paient que Streamlit.
+
+Chaque module déclare aussi `ARTIFACTS`, les fichiers qu'il affiche : ils
+sont contrôlés contre le manifeste (cf. artifact_manifest.py) au premier
+import de la page, et les absents signalés en une fois dans le journal.
+"""
+import importlib
+import logging
+import os
+import threading
+
+import perf
+from artifact_manifest import get_manifest
+
+# Libellé de navigation -> module de page (ordre de la barre latérale)
+PAGES = {
+    "🏠 Accueil": "accueil",
+    "⚖️ Déséquilibre de la cible": "desequilibre",
+    "📊 EDA – variables explicatives": "eda",
+    "🗺️ Cartographie": "cartographie",
+    "🤖 Modélisation & SHAP": "modelisation",
+}
+
+_modules = {}
+_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+def load(label):
+    """Module de la page `label`, importé à la première demande."""
+    name = PAGES[label]
+    module = _modules.get(name)
+    if module is None:
+        with _lock:
+            module = _modules.get(name)
+            if module is None:
+                with perf.span(f"import:{name}"):
+                    module = importlib.import_module(f"{__name__}.{name}")
+                missing = get_manifest().validate(module.ARTIFACTS)
+                if missing:
+                    logger.warning("Page %s : fichiers absents : %s", label,
+                                   ", ".join(os.path.basename(p) for p in missing))
+                _modules[name] = module
+    return module
+
+
+def render(label):
+    load(label).render()
+
+
+def referenced_artifacts():
+    """Fichiers référencés par chaque page (importe toutes les pages)."""
+    return {label: load(label).ARTIFACTS for label in PAGES}
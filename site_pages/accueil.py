@@ -0,0 +1,53 @@
+"""Page 1 – Accueil (texte seul)."""
+import streamlit as st
+
+ARTIFACTS = []
+
+
+def render():
+    st.title("Modélisation des accidents mortels (Open data BAAC)")
+    st.write("")
+    st.write("")
+
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        st.markdown(
+            """
+            ### 🎯 Objectif
+
+            Prédire la **probabilité qu’un accident corporel soit mortel** à partir des données BAAC.
+
+            - Cible binaire : `is_mortel` (accident mortel vs non mortel)  
+            - Construction de variables explicatives :
+              contexte de l'accident (type de route, luminosité, type de collision, …),
+              profil des usagers (âge moyen / min/max, proportion d’hommes, nombre d’usagers, conducteurs, piétons, …),
+              caractéristiques géographiques (latitude,longitude, commune, département, …)
+            - Analyse exploratoire (EDA)  
+            - Classification supervisée (plusieurs familles de modèles)  
+            - Interprétabilité via **SHAP values**
+            """
+        )
+
+    with col2:
+        st.info(
+            """
+            **Contenu du mini-site :**
+            - Déséquilibre de la cible  
+            - EDA (double-axes)  
+            - Cartographie (choroplèthe + hexbins)  
+            - Résultats de modélisation & SHAP  
+            """
+        )
+
+    st.markdown("---")
+    st.markdown(
+        """
+        #### Données
+
+        - Source : Bases de données annuelles des accidents corporels de la circulation routière – BAAC  
+          (fichiers Caractéristiques, Lieux, Usagers)  
+        - Unité : **accident corporel**  
+        - Période : **2015–2023**
+        """
+    )
@@ -0,0 +1,238 @@
+"""Page 4 – Cartographie : choroplèthe et hexbins."""
+import os
+
+import streamlit as st
+
+import geo_pipeline
+import hexbin
+import spatial_index
+from feature_pipeline import FeatureStore
+from image_pyramid import show_image
+from site_pages.common import INPUT_DIR, show_html
+from static_assets import static_serving_enabled
+
+HEX_CORPO_PATH = os.path.join(INPUT_DIR, "hexbin_corporels_fond_all.png")
+HEX_MORT_PATH = os.path.join(INPUT_DIR, "hexbin_mortels_fond_all.png")
+
+CHORO_HTML_PATH = os.path.join(INPUT_DIR, "taux_mortels_departements_numDep.html")
+
+HEX_METRICS = {
+    "n_acc": "Accidents corporels (log N)",
+    "n_mort": "Accidents mortels (log N)",
+    "taux": "Taux d’accidents mortels (%)",
+}
+
+# Fichiers attendus par la page (contrôlés contre le manifeste, cf. site_pages.load)
+ARTIFACTS = [HEX_CORPO_PATH, HEX_MORT_PATH, CHORO_HTML_PATH,
+             geo_pipeline.TOPO_PATH, geo_pipeline.VALUES_PATH]
+
+
+def show_choropleth(height=650):
+    """Choroplèthe à partir de la géométrie compacte (cf. geo_pipeline.py).
+
+    La GeoJSON du niveau choisi est servie une fois par `app/static/`
+    (cache navigateur) : la figure ne transporte que les valeurs.
+    Repli sur le HTML Plotly d'origine si les fichiers compacts manquent.
+    """
+    rows = geo_pipeline.load_values()
+    if rows is None or geo_pipeline.load_topology() is None:
+        show_html(CHORO_HTML_PATH, height=height,
+                  label_if_missing="taux_mortels_departements_numDep.html")
+        return
+
+    level = st.radio(
+        "Niveau de détail des contours :",
+        list(geo_pipeline.LEVELS),
+        index=list(geo_pipeline.LEVELS).index(geo_pipeline.DEFAULT_LEVEL),
+        horizontal=True,
+        key="choro_level",
+    )
+    geojson = geo_pipeline.geojson_url(level) if static_serving_enabled() else None
+    if geojson is None:
+        geojson = geo_pipeline.load_geojson(level)
+    st.plotly_chart(geo_pipeline.choropleth_figure(rows, geojson), use_container_width=True)
+
+
+def show_hexbin_pngs():
+    """Hexbins statiques 2015–2023 (repli si le cube hexbin n'est pas construit)."""
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if not show_image(
+            HEX_CORPO_PATH,
+            caption="Densité d’accidents corporels (log N)",
+            slot="half",
+        ):
+            st.warning(f"Image non trouvée : `{HEX_CORPO_PATH}`.")
+
+    with col2:
+        if not show_image(
+            HEX_MORT_PATH,
+            caption="Densité d’accidents mortels (log N)",
+            slot="half",
+        ):
+            st.warning(f"Image non trouvée : `{HEX_MORT_PATH}`.")
+
+
+def show_hexbin_explorer(cube):
+    """Hexbins filtrables (années, départements, agg) calculés depuis le cube."""
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        resolution = st.selectbox(
+            "Taille des hexagones :", cube.resolutions,
+            index=cube.resolutions.index(hexbin.DEFAULT_RESOLUTION)
+            if hexbin.DEFAULT_RESOLUTION in cube.resolutions else 0,
+            key="hex_resolution",
+        )
+    with c2:
+        metric = st.selectbox(
+            "Mesure :", list(HEX_METRICS), format_func=HEX_METRICS.__getitem__, key="hex_metric",
+        )
+    with c3:
+        agg = st.radio(
+            "Agglomération :", [None, *hexbin.AGG_LABELS],
+            format_func=lambda a: "Toutes" if a is None else hexbin.AGG_LABELS[a],
+            horizontal=True, key="hex_agg",
+        )
+    years = st.slider(
+        "Années :", min_value=cube.years[0], max_value=cube.years[-1],
+        value=(cube.years[0], cube.years[-1]), key="hex_years",
+    )
+    deps = st.multiselect("Départements (tous si vide) :", cube.departements, key="hex_deps")
+
+    cells = cube.query(resolution, years=years, deps=deps, agg=agg)
+    if len(cells["q"]) == 0:
+        st.info("Aucun accident pour ce filtre.")
+        return
+    geojson = hexbin.cells_geojson_url(resolution) if static_serving_enabled() else None
+    if geojson is None:
+        geojson = cube.cells_geojson(resolution)
+    st.plotly_chart(hexbin.cells_figure(cells, geojson, metric=metric), use_container_width=True)
+    st.caption(
+        f"{len(cells['q'])} cellules non vides – {int(cells['n_acc'].sum())} accidents corporels, "
+        f"{int(cells['n_mort'].sum())} mortels."
+    )
+
+
+def show_local_risk():
+    """Département et taux de mortalité dans un rayon autour d'un point.
+
+    Rien n'est affiché sans la topologie des départements.
+    """
+    index = spatial_index.load_dep_index()
+    if index is None:
+        return
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        lat = st.number_input("Latitude :", min_value=41.0, max_value=51.5, value=48.8566,
+                              format="%.4f", key="risk_lat")
+    with c2:
+        lon = st.number_input("Longitude :", min_value=-5.5, max_value=10.0, value=2.3522,
+                              format="%.4f", key="risk_lon")
+    with c3:
+        radius = st.slider("Rayon (km) :", min_value=1, max_value=25,
+                           value=int(spatial_index.DEFAULT_RADIUS_KM), key="risk_radius")
+
+    k = int(index.locate([lon], [lat])[0])
+    if k < 0:
+        st.info("Ce point n’est dans aucun département métropolitain.")
+        return
+    code = index.codes[k]
+    row = next((r for r in geo_pipeline.load_values() or [] if r["code"] == code), None)
+    dep_rate = row["taux_mortels_pct"] if row is not None else None
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Département", f"{code} – {index.names[k]}")
+    m2.metric("Taux départemental", "–" if dep_rate is None else f"{dep_rate:.1f} %")
+    accidents = spatial_index.load_accident_index(FeatureStore())
+    if accidents is None:
+        m3.metric(f"Taux à {radius} km", "–")
+        return
+    n, n_mort = accidents.counts([lon], [lat], radius)
+    rate = accidents.rates([lon], [lat], radius,
+                           prior_rate=None if dep_rate is None else dep_rate / 100)
+    m3.metric(f"Taux à {radius} km", f"{100 * rate[0]:.1f} %")
+    st.caption(
+        f"{int(n[0])} accidents corporels dont {int(n_mort[0])} mortel(s) dans le rayon ; "
+        f"taux lissé vers le taux départemental ({spatial_index.NEIGHBOURHOOD_PRIOR} "
+        "accidents fictifs)."
+    )
+
+
+def render():
+    st.title("🗺️ Cartographie des accidents")
+    st.write("")
+
+    st.subheader("4.1 Choroplèthe – taux d’accidents mortels par département")
+
+    st.markdown(
+        """
+        Une **carte choroplèthe** colore chaque département en fonction d’une **valeur numérique** :
+        ici, le **taux d’accidents mortels** observé sur la période.
+
+        - les teintes les plus foncées correspondent aux départements où la part d’accidents mortels
+          est la plus élevée,  
+        - les teintes plus claires indiquent des taux plus faibles.
+        """
+    )
+
+    show_choropleth(height=650)
+
+    st.markdown(
+        """
+        On observe notamment :
+
+        - des départements avec une **concentration plus forte** d’accidents mortels
+          dans certaines zones du territoire (par ex. certains départements du nord-est,
+          du centre ou du sud-ouest),  
+        - des contrastes entre départements voisins qui suggèrent un rôle de la **structure du réseau routier**,
+          des vitesses pratiquées ou d’autres facteurs locaux.
+        """
+    )
+
+    st.markdown("---")
+    st.subheader("4.2 Densité géographique (hexbin)")
+
+    st.markdown(
+        """
+        Les cartes **hexbin** représentent la **densité d’accidents** dans l’espace :
+
+        - chaque hexagone agrège les accidents tombant dans la cellule,  
+        - la couleur reflète le **logarithme du nombre d’accidents** (`log(N)`),
+          ce qui permet de visualiser à la fois les zones très denses et les zones plus diffuses.
+        """
+    )
+
+    hex_cube = hexbin.load_cube()
+    if hex_cube is not None:
+        show_hexbin_explorer(hex_cube)
+    else:
+        show_hexbin_pngs()
+
+    st.markdown(
+        """
+        Lecture croisée :
+
+        - la carte des **accidents corporels** fait ressortir les zones de trafic intense
+          (grandes agglomérations, axes structurants),  
+        - la carte des **accidents mortels** met en avant certaines zones périurbaines ou rurales,
+          où la vitesse pratiquée et la configuration des infrastructures peuvent conduire
+          à une mortalité plus élevée.
+
+        L’enjeu de la modélisation sera d’exploiter cette information **géographique**
+        en complément des variables locales (type de route, luminosité, profils d’usagers, etc.).
+        """
+    )
+
+    st.markdown("---")
+    st.subheader("4.3 Risque local autour d’un point")
+
+    st.markdown(
+        """
+        Pour un point donné, on retrouve son **département** (celui de `taux_mortels_dep_feature`)
+        et le **taux d’accidents mortels** parmi les accidents historiques situés dans un rayon
+        choisi, une version plus fine de la même information.
+        """
+    )
+
+    show_local_risk()
@@ -0,0 +1,91 @@
+"""Chemins et helpers d'affichage partagés par les pages."""
+import base64
+import os
+
+import streamlit as st
+
+from asset_cache import get_cache
+from plotly_figures import load_figures
+from static_assets import publish, static_serving_enabled
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+
+# Diffusion du PDF EDA : "static" (URL servie par app/static, cache navigateur)
+# ou "inline" (PDF encodé en base64 dans la page, ancien comportement)
+PDF_DELIVERY = os.environ.get("BAAC_PDF_DELIVERY", "static")
+
+ASSETS = get_cache()
+
+
+def show_html(path, height=600, label_if_missing=None):
+    """Affiche un HTML local (Plotly, choroplèthe, métriques…).
+
+    Les figures Plotly sont extraites du HTML et rendues nativement
+    (runtime Plotly local de Streamlit, sans CDN ni iframe) ; les autres
+    HTML, ou tout HTML si `plotly` n'est pas installé, passent par une iframe.
+    """
+    try:
+        figures = load_figures(path)
+    except (ImportError, ValueError):
+        figures = []
+    if figures:
+        for fig, config in figures:
+            st.plotly_chart(fig, use_container_width=True, config=config)
+        return
+
+    html_str = ASSETS.read_text(path)
+    if html_str is not None:
+        import streamlit.components.v1 as components
+
+        components.html(html_str, height=height, scrolling=True)
+    else:
+        label = label_if_missing or os.path.basename(path)
+        st.warning(f"Fichier HTML non trouvé : `{label}`\n\nChemin attendu : `{path}`")
+
+
+def prefetch_html(path):
+    """Charge dans le cache ce qu'affichera `show_html(path)` (sans Streamlit)."""
+    try:
+        figures = load_figures(path)
+    except (ImportError, ValueError):
+        figures = []
+    if not figures:
+        ASSETS.read_text(path)
+
+
+def _pdf_data_url(path):
+    with open(path, "rb") as f:
+        return "data:application/pdf;base64," + base64.b64encode(f.read()).decode("utf-8")
+
+
+def show_pdf(path, height=900):
+    """Affiche un PDF + bouton de téléchargement.
+
+    En mode "static", la page n'embarque que l'URL du PDF servi par
+    `app/static/` (ETag / Range) ; sinon repli sur le PDF inline en base64.
+    """
+    pdf_bytes = ASSETS.read_bytes(path)
+    if pdf_bytes is None:
+        st.warning(f"PDF non trouvé : `{path}`")
+        return
+
+    st.download_button(
+        label="📥 Télécharger le rapport EDA complet (PDF)",
+        data=pdf_bytes,
+        file_name=os.path.basename(path),
+        mime="application/pdf",
+    )
+
+    pdf_url = None
+    if PDF_DELIVERY == "static" and static_serving_enabled():
+        pdf_url = publish(path)
+    if pdf_url is None:
+        pdf_url = ASSETS.get(path, "pdf:data-url", _pdf_data_url, cost=len)
+
+    pdf_display = f"""
+        <iframe src="{pdf_url}"
+                width="100%" height="{height}" type="application/pdf">
+        </iframe>
+    """
+    st.markdown(pdf_display, unsafe_allow_html=True)
@@ -0,0 +1,48 @@
+"""Page 2 – Déséquilibre de la cible."""
+import os
+
+import streamlit as st
+
+from image_pyramid import show_image
+from site_pages.common import INPUT_DIR
+
+DIST_MORT_PATH = os.path.join(INPUT_DIR, "dist_is_mortel_all.png")
+
+# Fichiers attendus par la page (contrôlés contre le manifeste, cf. site_pages.load)
+ARTIFACTS = [DIST_MORT_PATH]
+
+
+def render():
+    st.title("⚖️ Déséquilibre de la variable cible `is_mortel`")
+    st.write("")
+
+    st.markdown(
+        """
+        La cible `is_mortel` est fortement déséquilibrée :  
+        les accidents mortels représentent une **très faible proportion** de l’ensemble des accidents corporels.
+        """
+    )
+
+    st.write("")  # petit espace avant le graphe
+
+    # On centre et on réduit visuellement à ~60% de la largeur via des colonnes
+    c1, c2, c3 = st.columns([1, 3, 1])
+    with c2:
+        if not show_image(
+            DIST_MORT_PATH,
+            caption="Distribution des accidents corporels (mortels vs non mortels)",
+            slot="center",
+        ):
+            st.warning(f"Image non trouvée : `{DIST_MORT_PATH}`.")
+
+    st.write("")  # petit espace après le graphe
+
+    st.markdown(
+        """
+        Conséquences pratiques :
+
+        - on privilégie des métriques adaptées aux classes rares (AUC, **AP**/PR, F1, Brier),  
+        - on surveille particulièrement le **rappel** sur la classe minoritaire (`is_mortel = 1`),  
+        - on teste des variantes ré-équilibrées (pondération, SMOTE, etc.).
+        """
+    )
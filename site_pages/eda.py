@@ -0,0 +1,80 @@
+"""Page 3 – EDA : graphes double-axes depuis le cube, rapport PDF."""
+import os
+
+import streamlit as st
+
+import eda_cube
+from site_pages.common import INPUT_DIR, show_pdf
+
+EDA_PDF_PATH = os.path.join(INPUT_DIR, "EDA_double_axes_propre.pdf")
+
+# Fichiers attendus par la page (contrôlés contre le manifeste, cf. site_pages.load)
+ARTIFACTS = [EDA_PDF_PATH]
+
+
+def show_eda_explorer(cube):
+    """Graphe double-axes d'une variable, ou croisement de deux, depuis le cube EDA."""
+    dims = list(eda_cube.DIMENSIONS)
+    c1, c2 = st.columns(2)
+    with c1:
+        dim = st.selectbox(
+            "Variable :", dims, format_func=eda_cube.DIMENSIONS.__getitem__, key="eda_dim",
+        )
+    with c2:
+        cross = st.selectbox(
+            "Croiser avec :", [None] + [d for d in dims if d != dim],
+            format_func=lambda d: "—" if d is None else eda_cube.DIMENSIONS[d], key="eda_cross",
+        )
+    c3, c4 = st.columns(2)
+    with c3:
+        years = st.slider(
+            "Années :", min_value=cube.years[0], max_value=cube.years[-1],
+            value=(cube.years[0], cube.years[-1]), key="eda_years",
+        )
+    with c4:
+        deps = st.multiselect("Départements (tous si vide) :", cube.departements, key="eda_deps")
+
+    table = cube.query([dim] if cross is None else [dim, cross], years=years, deps=deps)
+    if table.empty:
+        st.info("Aucun accident pour ce filtre.")
+        return
+    if cross is None:
+        st.plotly_chart(eda_cube.double_axis_figure(table, dim), use_container_width=True)
+    else:
+        st.plotly_chart(eda_cube.cross_figure(table, dim, cross), use_container_width=True)
+    st.caption(
+        f"{int(table['n_acc'].sum())} accidents corporels, {int(table['n_mort'].sum())} mortels "
+        f"({years[0]}–{years[1]})."
+    )
+
+
+def render():
+    st.title("📊 Analyse exploratoire (EDA) – Variables explicatives")
+    st.write("")
+
+    st.markdown(
+        """
+        Les graphes EDA (double-axes) sont regroupés dans un **rapport unique** :  
+
+        - barres : nombre d’accidents  
+        - courbe : taux d’accidents mortels (proportion d’`is_mortel = 1`)  
+        """
+    )
+
+    eda = eda_cube.load_cube()
+    if eda is not None:
+        st.subheader("Explorateur EDA")
+        show_eda_explorer(eda)
+        with st.expander("Rapport EDA complet (PDF)"):
+            show_pdf(EDA_PDF_PATH, height=900)
+    else:
+        st.subheader("Rapport EDA complet")
+        show_pdf(EDA_PDF_PATH, height=900)
+
+    st.markdown(
+        """
+        Ces figures permettent d’identifier les **contextes les plus accidentogènes**
+        et ceux où la **gravité (mortalité)** est particulièrement forte :
+        type de route, luminosité, type de collision, profils d’âge, etc.
+        """
+    )
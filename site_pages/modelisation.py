@@ -0,0 +1,680 @@
+"""Page 5 – Modélisation, SHAP et scoring en direct."""
+import os
+import time
+
+import streamlit as st
+
+import batch_scoring
+import explain
+import hexbin
+import metrics_store
+import progressive
+import scoring
+import whatif
+from eda_cube import LABELS
+from image_pyramid import show_image, variants
+from site_pages.common import BASE_DIR, INPUT_DIR, prefetch_html, show_html
+from static_assets import static_serving_enabled
+
+# Métriques de toutes les variantes : tables, barres et gains (cf. metrics_store.py)
+METRICS_PATHS = [os.path.join(INPUT_DIR, f"metrics_{s}.csv") for s in scoring.SCENARIOS]
+
+# Replis si les CSV de métriques manquent
+TABLE_S0_PATH = os.path.join(INPUT_DIR, "table_S0_in_memory.png")
+TABLE_S1_PATH = os.path.join(INPUT_DIR, "table_S1_in_memory.png")
+GAINS_HTML_PATH = os.path.join(INPUT_DIR, "mini_dashboard_gains.html")
+
+# Courbes PR/ROC, si `curves_<scénario>.csv` manque
+PERF_PNG = {
+    "S0 – Courbe PR (Precision–Recall)": os.path.join(INPUT_DIR, "PR_S0_baseline.png"),
+    "S0 – Courbe ROC":                   os.path.join(INPUT_DIR, "ROC_S0_baseline.png"),
+    "S1 – Courbe PR (Precision–Recall)": os.path.join(INPUT_DIR, "PR_S1_spatial.png"),
+    "S1 – Courbe ROC":                   os.path.join(INPUT_DIR, "ROC_S1_spatial.png"),
+}
+
+BEST_MODELS_HTML_PATH = os.path.join(INPUT_DIR, "best_models_report_in_memory.html")
+
+SHAP_IMAGES = {
+    "S0 – Baseline": {
+        "beeswarm": os.path.join(INPUT_DIR, "S0_lgbm_shap_beeswarm.png"),
+        "bar":       os.path.join(INPUT_DIR, "S0_lgbm_shap_bar.png"),
+    },
+    "S1 – Géographique": {
+        "beeswarm": os.path.join(INPUT_DIR, "S1_lgbm_shap_beeswarm.png"),
+        "bar":       os.path.join(INPUT_DIR, "S1_lgbm_shap_bar.png"),
+    }
+}
+
+SHAP_SCENARIOS = {
+    "S0 – Baseline": "S0_baseline",
+    "S1 – Géographique": "S1_spatial",
+}
+
+# Valeurs initiales du formulaire de scoring (codes BAAC), 0 sinon
+SCORING_DEFAULTS = {
+    "mois": 6, "jour": 15, "hrmn": 1400, "lum": 1, "agg": 2, "int": 1, "atm": 1,
+    "col": 3, "catr": 4, "circ": 2, "nbv": 2, "vma": 50, "prof": 1, "plan": 1,
+    "surf": 1, "situ": 1, "n_usagers": 2, "age_moy": 40, "age_min": 30,
+    "age_max": 50, "pct_hommes": 50, "nb_conducteurs": 2,
+}
+
+# Fichiers attendus par la page (contrôlés contre le manifeste, cf. site_pages.load)
+ARTIFACTS = [
+    *METRICS_PATHS, *PERF_PNG.values(), BEST_MODELS_HTML_PATH,
+    *(p for images in SHAP_IMAGES.values() for p in images.values()),
+]
+
+
+METRIC_COLUMNS = {
+    m: st.column_config.NumberColumn(format="%.3f") for m in ["t_star", *metrics_store.METRICS]
+}
+
+
+def show_metrics_table(metrics):
+    """Métriques de toutes les variantes, filtrables et triables."""
+    c1, c2, c3 = st.columns([2, 2, 1])
+    with c1:
+        scenarios = st.multiselect(
+            "Scénarios (tous si vide) :", sorted(metrics["scenario"].unique()), key="metrics_scenarios",
+        )
+    with c2:
+        variants = st.multiselect(
+            "Variantes (toutes si vide) :", list(dict.fromkeys(metrics["variant"])),
+            key="metrics_variants",
+        )
+    with c3:
+        seuil = st.radio(
+            "Seuil :", [None, *metrics_store.SEUILS], format_func=lambda s: "Tous" if s is None else s,
+            horizontal=True, key="metrics_seuil",
+        )
+    st.dataframe(
+        metrics_store.table(metrics, scenarios, variants, seuil),
+        hide_index=True, use_container_width=True, column_config=METRIC_COLUMNS,
+    )
+
+
+def show_metric_bars(metrics):
+    """Métriques @ t* d'une variante, en barres."""
+    c1, c2 = st.columns(2)
+    with c1:
+        scenario = st.selectbox("Scénario :", sorted(metrics["scenario"].unique()), key="barres_scenario")
+    variants = list(dict.fromkeys(metrics.loc[metrics["scenario"] == scenario, "variant"]))
+    default = variants.index(metrics_store.DEFAULT_VARIANT) if metrics_store.DEFAULT_VARIANT in variants else 0
+    with c2:
+        variant = st.selectbox("Variante :", variants, index=default, key="barres_variant")
+    rows = metrics_store.table(metrics, [scenario], [variant], "t*")
+    if rows.empty:
+        st.info(f"Pas de ligne `t*` pour {scenario} – {variant}.")
+        return
+    st.plotly_chart(metrics_store.bar_figure(rows, scenario), use_container_width=True)
+
+
+def show_curves():
+    """Courbes PR / ROC tracées depuis `curves_*.csv` ; False si elles manquent."""
+    curves = metrics_store.load_curves()
+    if curves.empty:
+        return False
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        curve = st.radio("Courbe :", ["PR", "ROC"], horizontal=True, key="courbes_type")
+    variants = list(dict.fromkeys(curves["variant"]))
+    with c2:
+        chosen = st.multiselect(
+            "Variantes :", variants,
+            default=[v for v in variants if v == metrics_store.DEFAULT_VARIANT] or variants[:1],
+            key="courbes_variants",
+        )
+    st.plotly_chart(
+        metrics_store.curves_figure(curves[curves["variant"].isin(chosen)], curve),
+        use_container_width=True,
+    )
+    return True
+
+
+def show_gains(metrics):
+    """Gains d'un scénario sur un autre, par variante, calculés à l'affichage."""
+    scenarios = sorted(metrics["scenario"].unique())
+    if len(scenarios) < 2:
+        st.info("Un seul scénario dans les métriques : pas de gains à calculer.")
+        return
+    base = metrics_store.BASE_SCENARIO
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        base = st.selectbox(
+            "Référence :", scenarios, index=scenarios.index(base) if base in scenarios else 0,
+            key="gains_base",
+        )
+    with c2:
+        other = st.selectbox("Scénario comparé :", [s for s in scenarios if s != base], key="gains_other")
+    with c3:
+        metric = st.selectbox("Métrique :", metrics_store.METRICS, key="gains_metric")
+    g = metrics_store.gains(metrics, base, other)
+    if g.empty:
+        st.info(f"Aucune variante commune à {base} et {other}.")
+        return
+    st.plotly_chart(
+        metrics_store.gains_figure(g, metric, title=f"Gains relatifs (%) — {metric} ({other} vs {base})"),
+        use_container_width=True,
+    )
+    st.dataframe(
+        g, hide_index=True, use_container_width=True,
+        column_config={
+            c: st.column_config.NumberColumn(format="%+.1f %%" if c.endswith("_pct") else "%+.4f")
+            for c in g.columns if c != "variant"
+        },
+    )
+
+
+def show_tables():
+    """5.1 : table des métriques, ou tableaux PNG si les CSV manquent."""
+    metrics = metrics_store.load_metrics()
+    if not metrics.empty:
+        show_metrics_table(metrics)
+        return
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if not show_image(TABLE_S0_PATH, caption="Tableau métriques – S0_baseline", slot="half"):
+            st.warning(f"Tableau S0 non trouvé : `{TABLE_S0_PATH}`.")
+
+    with col2:
+        if not show_image(TABLE_S1_PATH, caption="Tableau métriques – S1_géographique", slot="half"):
+            st.warning(f"Tableau S1 non trouvé : `{TABLE_S1_PATH}`.")
+
+
+def show_bars():
+    """5.2.1 : barres des métriques @ t*."""
+    metrics = metrics_store.load_metrics()
+    if not metrics.empty:
+        show_metric_bars(metrics)
+    else:
+        st.warning("Métriques non trouvées : `metrics_<scénario>.csv`.")
+
+
+def show_perf_curves():
+    """5.2.2 : courbes PR / ROC, ou images PNG si `curves_*.csv` manque."""
+    if show_curves():
+        return
+    choix_courbes = st.selectbox(
+        "Sélectionner une courbe PR / ROC :",
+        list(PERF_PNG.keys()),
+        key="courbes_selector"
+    )
+
+    courbe_path = PERF_PNG[choix_courbes]
+
+    if not show_image(courbe_path, caption=choix_courbes, slot="full"):
+        st.warning(f"Image non trouvée : `{courbe_path}`")
+
+
+def show_gains_section():
+    """5.4 : gains entre scénarios, ou mini-dashboard HTML si les CSV manquent."""
+    metrics = metrics_store.load_metrics()
+    if not metrics.empty:
+        show_gains(metrics)
+    else:
+        show_html(GAINS_HTML_PATH, height=560, label_if_missing="mini_dashboard_gains.html")
+
+
+def show_shap(choix_shap):
+    """5.5 : SHAP à la demande, ou images précalculées sans modèle ni variables."""
+    if show_shap_explorer(SHAP_SCENARIOS[choix_shap]):
+        return
+    paths = SHAP_IMAGES[choix_shap]
+    col_bsw, col_bar = st.columns(2)
+
+    with col_bsw:
+        if not show_image(paths["beeswarm"], caption=f"{choix_shap} – SHAP beeswarm", slot="half"):
+            st.warning(f"Image beeswarm non trouvée : `{paths['beeswarm']}`.")
+
+    with col_bar:
+        if not show_image(paths["bar"], caption=f"{choix_shap} – SHAP bar (|SHAP| moyen)", slot="half"):
+            st.warning(f"Image bar non trouvée : `{paths['bar']}`.")
+
+
+def shap_prefetch(choix_shap):
+    """Chargements de `show_shap` pour les filtres courants de la session."""
+    scenario = SHAP_SCENARIOS[choix_shap]
+    deps = st.session_state.get("shap_deps") or None
+    agg = st.session_state.get("shap_agg")
+    paths = SHAP_IMAGES[choix_shap]
+    return (
+        lambda: explain.explain(scenario, deps=deps, agg=agg),
+        lambda: variants(paths["beeswarm"]),
+        lambda: variants(paths["bar"]),
+    )
+
+
+def show_shap_explorer(scenario):
+    """SHAP à la demande (filtre département / agglomération, accident par accident).
+
+    Renvoie False si le modèle ou le magasin de variables manque.
+    """
+    if scoring.get_scorer(scenario) is None:
+        return False
+    state = explain.FeatureStore().cached_state()
+    if state.empty:
+        return False
+    explain.warm(scenario)
+
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        deps = st.multiselect(
+            "Départements (tous si vide) :", sorted(state["dep"].unique()), key="shap_deps",
+        )
+    with c2:
+        agg = st.radio(
+            "Agglomération :", [None, *hexbin.AGG_LABELS],
+            format_func=lambda a: "Toutes" if a is None else hexbin.AGG_LABELS[a],
+            horizontal=True, key="shap_agg",
+        )
+
+    with st.spinner("Calcul des valeurs SHAP…"):
+        expl = explain.explain(scenario, deps=deps, agg=agg)
+    if expl is None:
+        st.info("Aucun accident pour ce filtre.")
+        return True
+
+    col_bsw, col_bar = st.columns(2)
+    with col_bsw:
+        st.plotly_chart(explain.beeswarm_figure(expl), use_container_width=True)
+        st.caption(f"SHAP beeswarm – {len(expl.values)} accidents")
+    with col_bar:
+        st.plotly_chart(explain.importance_figure(expl), use_container_width=True)
+        st.caption("SHAP bar (|SHAP| moyen)")
+
+    i = st.number_input(
+        "Accident à expliquer (rang dans l’échantillon) :",
+        min_value=0, max_value=len(expl.values) - 1, value=0, step=1, key="shap_row",
+    )
+    st.plotly_chart(explain.force_figure(expl, int(i)), use_container_width=True)
+    return True
+
+
+def show_whatif():
+    """Probabilité d'accident mortel selon quelques variables, lue dans la table what-if."""
+    scenario = st.radio(
+        "Scénario :", list(scoring.SCENARIOS), format_func=scoring.SCENARIOS.__getitem__,
+        horizontal=True, key="whatif_scenario",
+    )
+    table = whatif.open_table(scenario)
+    if table is None:
+        st.info(f"Table what-if non disponible : `python whatif.py build {scenario}`.")
+        return
+
+    query = {}
+    categorical = [a for a in table.axes if a["kind"] == "cat"]
+    for col, a in zip(st.columns(len(categorical)), categorical):
+        name = a["name"]
+        query[name] = col.selectbox(
+            whatif.AXIS_LABELS[name], a["values"], format_func=LABELS[name].__getitem__,
+            key=f"whatif_{name}",
+        )
+    numeric = [a for a in table.axes if a["kind"] == "num"]
+    for col, a in zip(st.columns(len(numeric)), numeric):
+        lo, hi = a["values"][0], a["values"][-1]
+        default = 40.0 if a["name"] == whatif.AGE_FEATURE else float(a["values"][len(a["values"]) // 2])
+        query[a["name"]] = col.slider(
+            whatif.AXIS_LABELS[a["name"]], min_value=float(lo), max_value=float(hi),
+            value=min(max(default, lo), hi), step=1.0 if a["name"] == whatif.AGE_FEATURE else 0.01,
+            key=f"whatif_{a['name']}",
+        )
+
+    t0 = time.perf_counter()
+    res = table.lookup(**query)
+    elapsed_us = 1e6 * (time.perf_counter() - t0)
+    proba = float(res["proba"])
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        st.metric("Probabilité d’accident mortel", f"{100 * proba:.1f} %")
+        st.markdown(f"{'Au-dessus' if proba >= table.t_star else 'En dessous'} du seuil `t*`.")
+        st.caption(
+            f"Moyenne sur {table.meta['n_rows']} accidents réels placés dans cette situation ; "
+            f"80 % d’entre eux entre {100 * float(res['p10']):.1f} et {100 * float(res['p90']):.1f} %. "
+            f"Lecture de la table : {elapsed_us:.0f} µs."
+        )
+    with c2:
+        along = st.radio(
+            "Courbe selon :", [a["name"] for a in numeric], format_func=whatif.AXIS_LABELS.__getitem__,
+            horizontal=True, key="whatif_along",
+        )
+        fixed = {k: v for k, v in query.items() if k != along}
+        st.plotly_chart(whatif.curve_figure(table, along, query[along], **fixed),
+                        use_container_width=True)
+
+
+def show_scoring():
+    """Scoring d'un accident (formulaire) ou d'un fichier (par blocs) avec le best LGBM."""
+    scenario = st.radio(
+        "Scénario :", list(scoring.SCENARIOS), format_func=scoring.SCENARIOS.__getitem__,
+        horizontal=True, key="scoring_scenario",
+    )
+    scorer = scoring.get_scorer(scenario)
+    if scorer is None:
+        st.info(
+            f"Modèle non disponible : `{os.path.relpath(scoring.model_path(scenario), BASE_DIR)}`."
+        )
+        return
+    st.caption(f"Seuil de décision `t*` = {scorer.t_star:.3f} (OOF, maximisation du F1).")
+
+    tab_one, tab_csv = st.tabs(["Un accident", "Fichier CSV / Parquet"])
+    with tab_one:
+        with st.form("scoring_form"):
+            cols = st.columns(4)
+            row = {
+                f: cols[i % 4].number_input(f, value=float(SCORING_DEFAULTS.get(f, 0)), key=f"score_{f}")
+                for i, f in enumerate(scorer.features or [])
+            }
+            submitted = st.form_submit_button("Scorer")
+        if submitted:
+            proba = scorer.predict_one(row)
+            verdict = "**mortel**" if proba >= scorer.t_star else "non mortel"
+            st.metric("Probabilité d’accident mortel", f"{100 * proba:.1f} %")
+            st.markdown(f"Classé {verdict} au seuil `t*`.")
+            report = scorer.latency_report()
+            if report:
+                st.caption(
+                    f"Latence p50 {report['p50_ms']:.1f} ms / p99 {report['p99_ms']:.1f} ms "
+                    f"(cibles {scoring.LATENCY_TARGET_P50_MS} / {scoring.LATENCY_TARGET_P99_MS} ms)."
+                )
+
+    with tab_csv:
+        show_batch_export(scorer, scenario)
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def show_batch_export(scorer, scenario):
+    """Scoring d'un fichier complet (CSV / Parquet) exporté en flux (cf. batch_scoring.py).
+
+    La sortie est écrite sur disque bloc par bloc puis servie par
+    `app/static/` ; sans service statique, repli sur un bouton de
+    téléchargement (fichier relu en mémoire au clic).
+    """
+    batch_scoring.start_pruner()
+    sources = batch_scoring.server_sources()
+    origin = st.radio(
+        "Source :", ["Fichier envoyé", "Fichier du serveur"] if sources else ["Fichier envoyé"],
+        horizontal=True, key="batch_origin",
+    )
+    if origin == "Fichier envoyé":
+        source = st.file_uploader(
+            "Accidents (une ligne par accident, colonnes du modèle ; `lat` / `long` "
+            "suffisent pour le taux départemental de S1) :", type=["csv", "parquet"],
+            key="scoring_upload",
+        )
+    else:
+        source = sources[st.selectbox("Fichier :", list(sources), key="batch_server_file")]
+
+    c1, c2 = st.columns(2)
+    with c1:
+        fmt = st.radio("Format de sortie :", list(batch_scoring.FORMATS), horizontal=True,
+                       key="batch_format")
+    with c2:
+        shap_top = st.number_input(
+            "Variables SHAP les plus contributives (0 : aucune) :", min_value=0,
+            max_value=batch_scoring.MAX_SHAP_TOP, value=0, key="batch_shap_top",
+        )
+    if source is None or not st.button("Lancer le scoring", key="batch_run"):
+        return
+
+    target, url = batch_scoring.new_export(scenario, fmt)
+    progress = st.progress(0.0, text="Scoring…")
+    try:
+        stats = batch_scoring.export(
+            scorer, source, target, fmt=fmt, shap_top=int(shap_top),
+            progress=lambda fraction, rows: progress.progress(fraction, text=f"{rows} lignes scorées"),
+        )
+    except ValueError as e:
+        st.error(str(e))
+        return
+    progress.progress(1.0, text=f"{stats['rows']} lignes scorées en {stats['seconds']:.1f} s")
+    st.success(
+        f"{stats['rows']} accidents scorés, dont {stats['positives']} classés mortels au seuil `t*`."
+    )
+    file_name = f"scores_{scenario}.{fmt}"
+    if static_serving_enabled():
+        st.markdown(f"[📥 Télécharger les scores ({fmt.upper()})]({url})")
+    else:
+        st.download_button(
+            f"📥 Télécharger les scores ({fmt.upper()})", lambda: _read_bytes(target),
+            file_name=file_name, mime=batch_scoring.FORMATS[fmt],
+        )
+
+
+def render():
+    # Sections lourdes : emplacement tout de suite, contenu dès que prêt (cf. progressive.py)
+    sections = progressive.Sections()
+
+    st.title("🤖 Modélisation & interprétabilité (SHAP)")
+    st.write("")
+
+    st.markdown(
+        """
+        Deux scénarios de modélisation sont comparés :  
+
+        - **S0_baseline** : sans variable géographique agrégée,  
+        - **S1_géographique** : avec la variable synthétique `taux_mortels_dep_feature`
+          (taux d’accidents mortels par département).
+
+        Pour chaque scénario, plusieurs familles de modèles de classification sont évaluées
+        (régression logistique, variantes pondérées/SVOTE, Random Forest, **LGBM**, XGBoost…),
+        avec recherche d’hyperparamètres et calcul d’un seuil optimal `t*` par validation croisée.
+        """
+    )
+
+    # --- 5.1 Tables de métriques (toutes variantes) ---
+    st.markdown("### 5.1 Tables de métriques – toutes variantes")
+
+    sections.add(show_tables, metrics_store.load_metrics)
+
+    st.markdown(
+        """
+        Les lignes avec `seuil = t*` correspondent aux **seuils optimaux** déterminés en OOF
+        (maximisation du F1) et servent de base à la comparaison des variantes
+        sur les métriques AUC, **AP** (Average Precision / aire sous la courbe PR),
+        F1, Precision, Recall et Brier.
+        """
+    )
+
+    # --- 5.2 Best modèles S0 / S1 – barres & courbes PR / ROC ---
+    st.markdown(
+        """
+        <h3 style="margin-top:20px; margin-bottom:5px;">
+            5.2 Best modèles S0 / S1 – barres & courbes PR / ROC
+        </h3>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.markdown(
+        """
+        Les graphiques ci-dessous présentent les **meilleurs modèles** de chaque scénario  
+        (par défaut : LGBM pour S0_baseline et S1_géographique ; toute variante entraînée peut être choisie) :
+
+        - **Graphique barres** : comparaison des métriques globales (AP, AUC, F1, Precision, Recall) au seuil `t*`,  
+        - **Courbes PR / ROC** : analyse fine de la capacité de discrimination sur la classe `is_mortel = 1`.
+        """
+    )
+
+    # ========================================================
+    # 🔹 5.2.1 — BARRES (métriques globales)
+    # ========================================================
+    st.subheader("Graphiques barres (métriques @ t*)")
+
+    sections.add(show_bars, metrics_store.load_metrics)
+
+    st.markdown("<div style='margin-bottom:10px;'></div>", unsafe_allow_html=True)
+
+    # ========================================================
+    # 🔹 5.2.2 — COURBES PR / ROC
+    # ========================================================
+    st.subheader("Courbes PR / ROC")
+
+    sections.add(show_perf_curves, metrics_store.load_curves)
+
+    st.markdown(
+        """
+        Ces courbes montrent que les modèles **LGBM** sont les plus performants dans les deux scénarios,
+        avec un meilleur rappel des accidents mortels et une discrimination plus stable aux différents seuils.
+        """,
+        unsafe_allow_html=True
+    )
+
+
+
+    # --- 5.3 Hyperparamètres des best modèles ---
+    st.markdown("### 5.3 Hyperparamètres des best modèles")
+
+    sections.add(
+        lambda: show_html(BEST_MODELS_HTML_PATH, height=500,
+                          label_if_missing="best_models_report_in_memory.html"),
+        lambda: prefetch_html(BEST_MODELS_HTML_PATH),
+    )
+
+    st.markdown(
+        """
+        Pour les deux scénarios, le best modèle retenu est un **LGBMClassifier** avec :
+
+        - profondeur modérée et nombre de feuilles suffisant pour modéliser des interactions
+          (route × contexte de l’accident × profils des usagers),  
+        - taux d’apprentissage relativement faible (`learning_rate`) compensé par un nombre
+          d’arbres plus élevé (`n_estimators`),  
+        - régularisation et sous-échantillonnage de features (`feature_fraction`) permettant
+          de limiter la variance et d’éviter un sur-apprentissage excessif.
+
+        Ces réglages sont cohérents avec un contexte de **classification déséquilibrée**
+        où l’on souhaite capturer des signaux fins sans surexploiter le bruit.
+        """
+    )
+
+    # --- 5.4 Gains relatifs S1 vs S0 ---
+    st.markdown("### 5.4 Gains relatifs S1 vs S0")
+
+    sections.add(show_gains_section, metrics_store.load_metrics)
+
+    st.markdown(
+        """
+        Le mini-dashboard met en évidence les **gains relatifs (%)** du scénario S1_géographique
+        par rapport à S0_baseline sur les principales métriques :
+
+        - amélioration du **rappel** et du **F1** sur la classe mortelle,  
+        - léger gain en **AP** et **AUC**,  
+        - baisse du **Brier score** (meilleure calibration des probabilités).
+
+        Concrètement, l’ajout de `taux_mortels_dep_feature` permet au modèle de mieux
+        discriminer les situations à **risque mortel élevé**, tout en restant bien calibré.
+        """
+    )
+
+    # --- 5.5 SHAP – importance globale des variables ---
+    st.markdown("### 5.5 SHAP – importance globale des variables")
+
+    st.markdown(
+        """
+        Les graphiques ci-dessous montrent, pour chaque scénario :
+
+        - un **beeswarm SHAP** : dispersion des impacts individuels de chaque variable
+          (un point = un accident),  
+        - un **SHAP bar** : importance globale des variables via la moyenne de |SHAP|
+          (impact moyen sur la log-odds de l’issue mortelle).
+        """
+    )
+
+    choix_shap = st.selectbox("Scénario SHAP :", list(SHAP_IMAGES.keys()))
+    sections.add(lambda: show_shap(choix_shap), *shap_prefetch(choix_shap))
+
+    st.markdown(
+        """
+        #### Comment lire le beeswarm SHAP ?
+
+        - chaque **point** représente un accident,  
+        - la **position horizontale** indique l’impact SHAP de la variable sur la probabilité
+          d’accident mortel (à droite → contribution positive, à gauche → contribution négative),  
+        - la **couleur** encode la valeur de la variable : bleu = valeur faible, rouge = valeur élevée.
+
+        En combinant couleur et position, on voit par exemple si des valeurs élevées d’une variable
+        poussent la probabilité vers le haut ou vers le bas.
+        """
+    )
+
+    st.markdown(
+        """
+        #### Exemple d’interprétation – scénario S0 (baseline)
+
+        - **`agg` (en / hors agglomération)**  
+          Les modalités `agg=Hors_agglomération` apparaissent surtout avec des SHAP
+          positifs, alors que `agg=En_agglomération` est plus proche de 0 voire négatif.
+          Le modèle apprend donc que, toutes choses égales par ailleurs, un accident
+          **hors agglomération** a plus de chances d’être mortel.
+
+        - **`pct_hommes` (proportion d’hommes impliqués)**  
+          Dans le beeswarm S0, les points rouges (forte proportion d’hommes) se situent
+          préférentiellement à droite de l’axe 0, tandis que les valeurs faibles
+          sont plutôt neutres ou négatives.  
+          Le modèle associe donc une forte proportion d’hommes à une **augmentation
+          de la probabilité d’accident mortel**, ce qui est cohérent avec la littérature
+          en accidentologie (vitesse, comportements à risque, etc.).
+        """
+    )
+
+    st.markdown(
+        """
+        #### Exemple d’interprétation – scénario S1 (géographique)
+
+        - **`taux_mortels_dep_feature`**  
+          Dans S1, cette variable arrive clairement en tête du graphique SHAP bar.
+          Sur le beeswarm, les accidents situés dans des départements à
+          **taux historique de mortalité élevé** (points rouges) ont des SHAP
+          nettement positifs, alors que ceux issus de départements à taux faible
+          (points bleus) ont des impacts proches de 0 ou négatifs.
+
+          Le modèle utilise donc ce taux départemental comme un **a priori géographique de risque** :
+          à exposition individuelle comparable, un accident survenant dans un
+          département historiquement plus “mortel” reçoit une probabilité prédite
+          plus élevée d’être mortel.
+
+          Les autres variables structurelles (type de route `catr`, type de collision `col`,
+          luminosité `lum`, structure d’âge, etc.) restent contributives dans les deux scénarios,
+          mais l’ajout de `taux_mortels_dep_feature` dans S1 renforce clairement la capacité
+          du modèle à discriminer les situations les plus à risque, ce qui est cohérent
+          avec les gains observés entre S0 et S1.
+        """
+    )
+
+    # --- 5.6 Explorateur what-if ---
+    st.markdown("### 5.6 Explorateur « what-if »")
+
+    st.markdown(
+        """
+        Comment la probabilité d’accident mortel varie-t-elle avec l’agglomération, le type de route,
+        la luminosité, le type de collision, l’âge des usagers ou (S1) le taux départemental ?
+        Chaque point est la **dépendance partielle** du best modèle LGBM : la prédiction moyenne
+        quand un échantillon d’accidents réels est placé dans la situation choisie.
+        Ces valeurs sont précalculées hors ligne sur une grille (`python whatif.py build`) :
+        déplacer un curseur lit la table, sans appel au modèle.
+        """
+    )
+
+    scenario = st.session_state.get("whatif_scenario", next(iter(scoring.SCENARIOS)))
+    sections.add(show_whatif, lambda: whatif.open_table(scenario))
+
+    # --- 5.7 Scoring en direct ---
+    st.markdown("### 5.7 Scoring en direct")
+
+    st.markdown(
+        """
+        Les best modèles LGBM de chaque scénario peuvent scorer de nouveaux accidents :
+        un accident saisi dans le formulaire, ou un fichier CSV / Parquet complet (traité par blocs,
+        avec au besoin les variables SHAP les plus contributives de chaque accident).
+        La décision « mortel » applique le seuil `t*` du scénario.
+        """
+    )
+
+    scoring_scenario = st.session_state.get("scoring_scenario", next(iter(scoring.SCENARIOS)))
+    sections.add(show_scoring, lambda: scoring.get_scorer(scoring_scenario))
+
+    sections.fill()
@@ -0,0 +1,353 @@
+"""Index spatiaux : point → département et voisinage des accidents historiques.
+
+`taux_mortels_dep_feature` (scénario S1) suppose de connaître le département
+d'un accident ; pour scorer un accident brut à partir de sa latitude /
+longitude, ou affiner la variable à l'échelle d'un voisinage, il faut des
+recherches spatiales rapides et vectorisées :
+
+- `DepIndex` : grille régulière sur les contours des départements (niveau
+  « fin » de `departements.topo.json`, cf. geo_pipeline.py). Chaque cellule
+  connaît le département de son centre (calculé par balayage de lignes) et
+  les arêtes qui la traversent. Un point hérite du département du centre de
+  sa cellule, corrigé par la parité des arêtes coupées par le segment
+  centre → point : seules quelques arêtes par point sont testées.
+- `AccidentIndex` : arbres KD (scikit-learn) sur les accidents, en
+  coordonnées cartésiennes sur la sphère unité (distances exactes, DOM
+  compris) ; un taux de mortalité dans un rayon est le rapport de deux
+  comptages, lissé vers un taux de référence.
+
+Les tableaux de `DepIndex` passent par shared_cache.py (une copie pour tous
+les workers) ; les deux index sont gardés dans le cache d'assets.
+
+    python spatial_index.py bench              # 100k points aléatoires
+    python spatial_index.py locate 48.85 2.35  # lat lon
+"""
+import sys
+import time
+
+import numpy as np
+
+import shared_cache
+from asset_cache import get_cache
+from geo_pipeline import TOPO_PATH, decode_level
+
+EARTH_RADIUS_KM = 6371.0
+GRID_CELL_DEG = 0.05
+DEP_LEVEL = "fin"
+
+# Rayon par défaut du voisinage (km) et poids du taux de référence, en
+# nombre d'accidents fictifs (cf. feature_pipeline.DEP_RATE_PRIOR)
+DEFAULT_RADIUS_KM = 5.0
+NEIGHBOURHOOD_PRIOR = 20
+
+
+# =========================
+# POINT → DÉPARTEMENT
+# =========================
+
+def _rings(geometry):
+    polys = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+    return [np.asarray(ring, dtype=float) for poly in polys for ring in poly]
+
+
+def _dep_arrays(geojson, cell=GRID_CELL_DEG):
+    """Tableaux de l'index (arêtes, grille) depuis une FeatureCollection."""
+    edges, owners, codes, names = [], [], [], []
+    for k, feature in enumerate(geojson["features"]):
+        codes.append(str(feature["properties"]["code"]))
+        names.append(feature["properties"].get("nom") or "")
+        for ring in _rings(feature["geometry"]):
+            edges.append(np.hstack([ring[:-1], ring[1:]]))
+            owners.append(np.full(len(ring) - 1, k, dtype=np.int16))
+    edges = np.vstack(edges)
+    owners = np.concatenate(owners)
+
+    pts = np.vstack([edges[:, :2], edges[:, 2:]])
+    x0, y0 = pts.min(axis=0) - cell
+    nx, ny = (np.ceil((pts.max(axis=0) + cell - (x0, y0)) / cell)).astype(int)
+
+    # Arêtes → cellules couvertes par leur boîte englobante (sur-ensemble sûr)
+    ix0 = np.floor((np.minimum(edges[:, 0], edges[:, 2]) - x0) / cell).astype(np.int64)
+    ix1 = np.floor((np.maximum(edges[:, 0], edges[:, 2]) - x0) / cell).astype(np.int64)
+    iy0 = np.floor((np.minimum(edges[:, 1], edges[:, 3]) - y0) / cell).astype(np.int64)
+    iy1 = np.floor((np.maximum(edges[:, 1], edges[:, 3]) - y0) / cell).astype(np.int64)
+    wx, wy = ix1 - ix0 + 1, iy1 - iy0 + 1
+    count = wx * wy
+    edge_id = np.repeat(np.arange(len(edges)), count)
+    local = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    cells = (iy0[edge_id] + local // wx[edge_id]) * nx + ix0[edge_id] + local % wx[edge_id]
+    order = np.argsort(cells, kind="stable")
+    cell_edges = edge_id[order].astype(np.int32)
+    cell_ptr = np.zeros(nx * ny + 1, dtype=np.int32)
+    np.cumsum(np.bincount(cells, minlength=nx * ny), out=cell_ptr[1:])
+
+    # Département du centre de chaque cellule : balayage ligne par ligne
+    # (règle pair-impair, les trous et îles sont gérés d'eux-mêmes)
+    center_owner = np.full((ny, nx), -1, dtype=np.int16)
+    xs = x0 + (np.arange(nx) + 0.5) * cell
+    for iy in range(ny):
+        yc = y0 + (iy + 0.5) * cell
+        cross = (edges[:, 1] > yc) != (edges[:, 3] > yc)
+        if not cross.any():
+            continue
+        e = edges[cross]
+        xi = e[:, 0] + (yc - e[:, 1]) * (e[:, 2] - e[:, 0]) / (e[:, 3] - e[:, 1])
+        own = owners[cross]
+        order = np.lexsort((xi, own))
+        xi, own = xi[order], own[order]
+        starts = np.flatnonzero(np.r_[True, own[1:] != own[:-1]])
+        for s, e_ in zip(starts, np.r_[starts[1:], len(own)]):
+            bounds = xi[s:e_].reshape(-1, 2)
+            lo = np.searchsorted(xs, bounds[:, 0], side="right")
+            hi = np.searchsorted(xs, bounds[:, 1], side="right")
+            for a, b in zip(lo, hi):
+                center_owner[iy, a:b] = own[s]
+
+    arrays = {
+        "edges": edges,
+        "edge_owner": owners,
+        "cell_ptr": cell_ptr,
+        "cell_edges": cell_edges,
+        "center_owner": center_owner.ravel(),
+    }
+    meta = {"codes": codes, "names": names, "x0": float(x0), "y0": float(y0),
+            "cell": cell, "nx": int(nx), "ny": int(ny)}
+    return arrays, meta
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+class DepIndex:
+    """Département contenant chaque point (lon, lat), par requêtes vectorisées."""
+
+    def __init__(self, arrays, meta):
+        self.edges = arrays["edges"]
+        self.edge_owner = arrays["edge_owner"]
+        self.cell_ptr = arrays["cell_ptr"]
+        self.cell_edges = arrays["cell_edges"]
+        self.center_owner = arrays["center_owner"]
+        self.codes = meta["codes"]
+        self.names = meta["names"]
+        self.x0, self.y0, self.cell = meta["x0"], meta["y0"], meta["cell"]
+        self.nx, self.ny = meta["nx"], meta["ny"]
+        self._labels = np.array(self.codes + [None], dtype=object)
+
+    @classmethod
+    def from_geojson(cls, geojson, cell=GRID_CELL_DEG):
+        return cls(*_dep_arrays(geojson, cell))
+
+    def locate(self, lon, lat):
+        """Indice du département (dans `codes`) de chaque point, -1 hors de tout."""
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        out = np.full(lon.shape, -1, dtype=np.int16)
+        ix = np.floor((lon - self.x0) / self.cell)
+        iy = np.floor((lat - self.y0) / self.cell)
+        ok = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)   # exclut aussi les NaN
+        pts = np.flatnonzero(ok)
+        ix, iy = ix[ok].astype(np.int64), iy[ok].astype(np.int64)
+        cells = iy * self.nx + ix
+        owner = self.center_owner[cells]
+        out[pts] = owner
+
+        # Cellules traversées par des contours : parité des arêtes coupées
+        # par le segment centre de la cellule → point
+        start, n_edges = self.cell_ptr[cells], self.cell_ptr[cells + 1] - self.cell_ptr[cells]
+        b = np.flatnonzero(n_edges)
+        if not len(b):
+            return out
+        n = n_edges[b]
+        pair = np.repeat(np.arange(len(b)), n)
+        edge = self.cell_edges[
+            np.repeat(start[b], n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        ]
+        qx, qy = lon[pts[b]][pair], lat[pts[b]][pair]
+        cx = (self.x0 + (ix[b] + 0.5) * self.cell)[pair]
+        cy = (self.y0 + (iy[b] + 0.5) * self.cell)[pair]
+        ax, ay, bx, by = self.edges[edge].T
+        crosses = (
+            ((_orient(ax, ay, bx, by, cx, cy) > 0) != (_orient(ax, ay, bx, by, qx, qy) > 0))
+            & ((_orient(cx, cy, qx, qy, ax, ay) > 0) != (_orient(cx, cy, qx, qy, bx, by) > 0))
+        )
+        n_deps = len(self.codes)
+        keys, counts = np.unique(
+            pair[crosses].astype(np.int64) * n_deps + self.edge_owner[edge[crosses]],
+            return_counts=True,
+        )
+        odd = keys[counts % 2 == 1]
+        p, dep = odd // n_deps, (odd % n_deps).astype(np.int16)
+        target = pts[b][p]
+        left = dep == owner[b][p]
+        out[target[left]] = -1           # sorti du département du centre
+        out[target[~left]] = dep[~left]  # entré dans un département voisin
+        return out
+
+    def lookup(self, lon, lat):
+        """Code du département de chaque point (None hors de tout département)."""
+        return self._labels[self.locate(lon, lat)]
+
+
+def _dep_arrays_from_file(path):
+    from geo_pipeline import _load_json
+
+    return _dep_arrays(decode_level(_load_json(path), DEP_LEVEL))
+
+
+def _load_dep_index(path):
+    return DepIndex(*shared_cache.arrays(path, "spatial_dep", _dep_arrays_from_file))
+
+
+def load_dep_index(path=TOPO_PATH):
+    """Index des départements (mis en cache), None sans `departements.topo.json`."""
+    return get_cache().get(path, "spatial:dep", _load_dep_index, cost=_dep_index_cost)
+
+
+def _dep_index_cost(index):
+    return sum(a.nbytes for a in (index.edges, index.cell_ptr, index.cell_edges, index.center_owner))
+
+
+# =========================
+# VOISINAGE DES ACCIDENTS
+# =========================
+
+def unit_xyz(lon, lat):
+    """Coordonnées cartésiennes (n, 3) sur la sphère unité."""
+    lon = np.radians(np.asarray(lon, dtype=float))
+    lat = np.radians(np.asarray(lat, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord(radius_km):
+    """Corde sur la sphère unité équivalente à une distance au sol."""
+    return 2.0 * np.sin(radius_km / (2.0 * EARTH_RADIUS_KM))
+
+
+class AccidentIndex:
+    """Arbres KD sur les accidents (tous / mortels) pour des comptages par rayon."""
+
+    def __init__(self, lon, lat, is_mortel):
+        from sklearn.neighbors import KDTree
+
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        mortel = np.asarray(is_mortel).astype(bool)
+        ok = np.isfinite(lon) & np.isfinite(lat)
+        xyz = unit_xyz(lon[ok], lat[ok])
+        self.n = int(ok.sum())
+        self.n_mortels = int(mortel[ok].sum())
+        self.rate = self.n_mortels / max(self.n, 1)
+        self._all = KDTree(xyz)
+        self._mortels = KDTree(xyz[mortel[ok]]) if self.n_mortels else None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Depuis une table avec `lat`, `long`, `is_mortel`."""
+        return cls(df["long"].to_numpy(), df["lat"].to_numpy(), df["is_mortel"].to_numpy())
+
+    @property
+    def nbytes(self):
+        arrays = self._all.get_arrays() + (self._mortels.get_arrays() if self._mortels else ())
+        return sum(a.nbytes for a in arrays)
+
+    def counts(self, lon, lat, radius_km=DEFAULT_RADIUS_KM):
+        """(accidents, accidents mortels) à moins de `radius_km` de chaque point."""
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        n = np.zeros(lon.shape, dtype=np.int64)
+        n_mort = np.zeros(lon.shape, dtype=np.int64)
+        ok = np.isfinite(lon) & np.isfinite(lat)
+        if ok.any():
+            xyz, r = unit_xyz(lon[ok], lat[ok]), chord(radius_km)
+            n[ok] = self._all.query_radius(xyz, r, count_only=True)
+            if self._mortels is not None:
+                n_mort[ok] = self._mortels.query_radius(xyz, r, count_only=True)
+        return n, n_mort
+
+    def rates(self, lon, lat, radius_km=DEFAULT_RADIUS_KM, prior=NEIGHBOURHOOD_PRIOR,
+              prior_rate=None, exclude=None):
+        """Taux de mortalité lissé dans le rayon de chaque point.
+
+        (mortels + prior × taux de référence) / (accidents + prior) ; le taux
+        de référence (scalaire ou par point, ex. taux départemental) vaut par
+        défaut le taux global de l'index. `exclude` : `is_mortel` des points
+        eux-mêmes s'ils font partie de l'index (retirés des comptages), NaN
+        pour ceux qui n'en font pas partie.
+        """
+        n, n_mort = self.counts(lon, lat, radius_km)
+        n, n_mort = n.astype(float), n_mort.astype(float)
+        if exclude is not None:
+            exclude = np.asarray(exclude, dtype=float)
+            own = np.isfinite(exclude) & (n > 0)
+            n[own] -= 1
+            n_mort[own] -= exclude[own]
+        ref = self.rate if prior_rate is None else np.asarray(prior_rate, dtype=float)
+        return (n_mort + prior * ref) / (n + prior)
+
+
+def load_accident_index(store, years=None):
+    """Index des accidents du magasin de variables (mis en cache), None s'il est vide.
+
+    `store` : feature_pipeline.FeatureStore ; une mise à jour du magasin
+    (son manifeste) invalide l'index.
+    """
+    def build(_path):
+        df = store.load(years=years, columns=["lat", "long", "is_mortel"])
+        return None if df.empty else AccidentIndex.from_frame(df)
+
+    return get_cache().get(
+        store.manifest_path, f"spatial:accidents:{years}", build,
+        cost=lambda index: 0 if index is None else index.nbytes,
+    )
+
+
+# =========================
+# CLI
+# =========================
+
+def _random_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-5.0, 9.5, n), rng.uniform(42.0, 51.0, n)
+
+
+def main(argv):
+    if argv[:1] == ["locate"] and len(argv) == 3:
+        index = load_dep_index()
+        k = int(index.locate([float(argv[2])], [float(argv[1])])[0])
+        print("hors département" if k < 0 else f"{index.codes[k]} – {index.names[k]}")
+        return 0
+    if argv[:1] == ["bench"]:
+        n = int(argv[1]) if len(argv) > 1 else 100_000
+        t0 = time.perf_counter()
+        index = load_dep_index()
+        if index is None:
+            print(f"Topologie introuvable : {TOPO_PATH}")
+            return 1
+        print(f"index départements : {1000 * (time.perf_counter() - t0):.0f} ms "
+              f"({index.nx}×{index.ny} cellules, {len(index.edges)} arêtes)")
+        lon, lat = _random_points(n)
+        t0 = time.perf_counter()
+        dep = index.locate(lon, lat)
+        print(f"{n:,d} points → département : {1000 * (time.perf_counter() - t0):.0f} ms "
+              f"({(dep >= 0).mean():.0%} dans un département)")
+
+        from feature_pipeline import FeatureStore
+
+        t0 = time.perf_counter()
+        accidents = load_accident_index(FeatureStore())
+        if accidents is None:
+            print("Magasin de variables vide : voisinage non mesuré")
+            return 0
+        print(f"index accidents ({accidents.n:,d}) : {1000 * (time.perf_counter() - t0):.0f} ms")
+        t0 = time.perf_counter()
+        accidents.rates(lon, lat, DEFAULT_RADIUS_KM)
+        print(f"{n:,d} points → taux à {DEFAULT_RADIUS_KM:g} km : "
+              f"{1000 * (time.perf_counter() - t0):.0f} ms")
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,60 @@
+"""Publication de fichiers dans le dossier `static/` servi par Streamlit.
+
+Avec `server.enableStaticServing = true` (cf. `.streamlit/config.toml`),
+Streamlit sert `./static/<nom>` à l'URL `app/static/<nom>`, avec ETag,
+Last-Modified et requêtes Range : le navigateur télécharge le fichier une
+seule fois et la page n'embarque plus qu'une URL. Le paramètre de version
+des URL est l'empreinte du contenu (cf. artifact_manifest.py).
+"""
+import os
+import shutil
+import threading
+
+import streamlit as st
+
+from artifact_manifest import version
+from asset_cache import artifact_signature, file_signature
+
+BASE_DIR = os.path.dirname(__file__)
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL_PREFIX = "app/static"
+
+_lock = threading.Lock()
+_published = {}   # cible -> signature de la source copiée
+
+
+def static_serving_enabled():
+    """Vrai si le serveur Streamlit sert le dossier `static/`."""
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def publish(path, name=None):
+    """Copie (ou lie) `path` dans `static/` si besoin et renvoie son URL.
+
+    La copie n'est refaite que si la source a changé (mtime/taille) ;
+    l'URL porte la version du contenu pour invalider le cache navigateur.
+    Renvoie None si la source n'existe pas.
+    """
+    sig = artifact_signature(path)
+    if sig is None:
+        return None
+
+    name = name or os.path.basename(path)
+    target = os.path.join(STATIC_DIR, name)
+
+    with _lock:
+        if _published.get(target) != sig and file_signature(target) != sig:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.tmp{os.getpid()}"
+            try:
+                os.link(path, tmp)
+            except OSError:
+                shutil.copyfile(path, tmp)
+            os.utime(tmp, ns=(sig[0], sig[0]))
+            os.replace(tmp, target)
+        _published[target] = sig
+
+    return f"{STATIC_URL_PREFIX}/{name.replace(os.sep, '/')}?v={version(path)}"
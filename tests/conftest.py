@@ -0,0 +1,43 @@
+"""Les modules de l'application sont à la racine du dépôt."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import artifact_manifest
+import scoring
+
+SCENARIO = "S0_baseline"
+VARIANT = "lgbm"
+
+
+@pytest.fixture
+def deployed_model(tmp_path, monkeypatch):
+    """Petit LGBM déployé sous `<tmp>/Input_Site_Web/models`, manifeste compris.
+
+    Renvoie le dossier des modèles ; le manifeste du processus indexe `<tmp>/Input_Site_Web`.
+    """
+    from lightgbm import LGBMClassifier
+
+    input_dir = tmp_path / "Input_Site_Web"
+    model_dir = input_dir / "models"
+    model_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"agg": rng.integers(1, 3, 400), "age_moy": rng.uniform(15, 80, 400)})
+    y = (rng.random(400) < 0.2 + 0.002 * X["age_moy"]).astype(int)
+    model = LGBMClassifier(n_estimators=5, num_leaves=4, verbose=-1).fit(X, y)
+    joblib.dump(model, model_dir / f"best_{SCENARIO}.joblib")
+
+    manifest = artifact_manifest.Manifest(str(input_dir))
+    manifest.scan()
+    monkeypatch.setattr(artifact_manifest, "_manifest", manifest)
+    monkeypatch.setattr(scoring, "MODEL_DIR", str(model_dir))
+    monkeypatch.setattr(scoring, "_scorers", {})
+    monkeypatch.setattr(scoring, "load_t_star", lambda scenario, variant=VARIANT: 0.3)
+    return str(model_dir)
@@ -0,0 +1,12 @@
+"""Années d'un magasin BAAC partitionné (`an=<année>`)."""
+from baac_store import BaacStore
+
+
+def test_years_of_missing_store(tmp_path):
+    assert BaacStore(str(tmp_path / "absent")).years == []
+
+
+def test_years_from_partitions(tmp_path):
+    for name in ["an=2021", "an=2019", "an=2020.tmp", "autre"]:
+        (tmp_path / name).mkdir()
+    assert BaacStore(str(tmp_path)).years == [2019, 2021]
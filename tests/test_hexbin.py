@@ -0,0 +1,30 @@
+"""Arrondi axial de hexbin.hex_cells : chaque point va au centre d'hexagone le plus proche."""
+import numpy as np
+import pytest
+
+from hexbin import _KX, _KY, METRO_BBOX, hex_cells, hex_centers
+
+
+@pytest.mark.parametrize("size_km", [2.0, 10.0, 25.0])
+def test_hex_cells_nearest_center(size_km):
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(METRO_BBOX[0], METRO_BBOX[2], 20_000)
+    lat = rng.uniform(METRO_BBOX[1], METRO_BBOX[3], 20_000)
+    q, r = hex_cells(lon, lat, size_km)
+
+    # Recherche exhaustive parmi les hexagones voisins de la cellule trouvée
+    dq, dr = np.meshgrid(np.arange(-2, 3), np.arange(-2, 3))
+    cq, cr = q[:, None] + dq.ravel(), r[:, None] + dr.ravel()
+    cx, cy = hex_centers(cq, cr, size_km)
+    dist = np.hypot((cx - lon[:, None]) * _KX, (cy - lat[:, None]) * _KY)
+    best = np.argmin(dist, axis=1)
+    np.testing.assert_array_equal(cq[np.arange(len(q)), best], q)
+    np.testing.assert_array_equal(cr[np.arange(len(r)), best], r)
+
+
+def test_hex_centers_round_trip():
+    q, r = np.meshgrid(np.arange(-40, 40), np.arange(-40, 40))
+    lon, lat = hex_centers(q.ravel(), r.ravel(), 10.0)
+    q2, r2 = hex_cells(lon, lat, 10.0)
+    np.testing.assert_array_equal(q2, q.ravel())
+    np.testing.assert_array_equal(r2, r.ravel())
@@ -0,0 +1,52 @@
+"""metrics_engine comparé à scikit-learn."""
+import numpy as np
+import pytest
+from sklearn.metrics import (
+    average_precision_score,
+    brier_score_loss,
+    f1_score,
+    precision_recall_curve,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+
+from metrics_engine import evaluate
+
+
+@pytest.fixture(params=[0, 1, 2])
+def scores(request):
+    """Cible déséquilibrée et scores, avec ex æquo (arrondis) pour le seed 2."""
+    rng = np.random.default_rng(request.param)
+    y = (rng.random(5_000) < 0.06).astype(int)
+    proba = np.clip(0.1 * y + rng.beta(1, 8, len(y)), 0, 1)
+    if request.param == 2:
+        proba = np.round(proba, 2)
+    return y, proba
+
+
+def test_auc_ap_brier(scores):
+    y, proba = scores
+    ev = evaluate(y, proba)
+    assert ev.auc == pytest.approx(roc_auc_score(y, proba), abs=1e-12)
+    assert ev.ap == pytest.approx(average_precision_score(y, proba), abs=1e-12)
+    assert ev.brier == pytest.approx(brier_score_loss(y, proba), abs=1e-12)
+
+
+@pytest.mark.parametrize("threshold", [0.05, 0.2, 0.5])
+def test_metrics_at_threshold(scores, threshold):
+    y, proba = scores
+    pred = (proba >= threshold).astype(int)
+    m = evaluate(y, proba).at(threshold)
+    assert m["F1"] == pytest.approx(f1_score(y, pred, zero_division=0), abs=1e-12)
+    assert m["Precision"] == pytest.approx(precision_score(y, pred, zero_division=0), abs=1e-12)
+    assert m["Recall"] == pytest.approx(recall_score(y, pred, zero_division=0), abs=1e-12)
+
+
+def test_t_star_maximises_f1(scores):
+    y, proba = scores
+    ev = evaluate(y, proba)
+    precision, recall, _ = precision_recall_curve(y, proba)
+    denom = np.where(precision + recall > 0, precision + recall, 1)
+    best = np.max(2 * precision * recall / denom)
+    assert ev.at(ev.t_star)["F1"] == pytest.approx(best, abs=1e-12)
@@ -0,0 +1,25 @@
+"""Magasin de modèles construit sous le dossier indexé par le manifeste."""
+import pandas as pd
+
+import model_store
+import scoring
+from artifact_manifest import get_manifest
+from conftest import SCENARIO, VARIANT
+
+
+def test_built_store_opens_through_cache(deployed_model):
+    source = scoring.model_path(SCENARIO)
+    path = model_store.build(SCENARIO, VARIANT, model_dir=deployed_model, with_shap=False)
+    get_manifest().scan()   # nouveau parcours : le magasin reste hors index
+
+    meta_path = f"{path}/meta.json"
+    assert not get_manifest().covers(meta_path)
+    assert get_manifest().covers(source)
+    stored = model_store.open_store(deployed_model, SCENARIO, VARIANT, source)
+    assert stored is not None
+    assert stored.meta["model_sha256"] == model_store.model_sha256(source)
+
+    scorer = scoring.get_scorer(SCENARIO, VARIANT)
+    assert scorer.store is not None
+    proba = scorer.predict_proba(pd.DataFrame({"agg": [1, 2], "age_moy": [30.0, 70.0]}))
+    assert proba.shape == (2,)
@@ -0,0 +1,19 @@
+"""Spans du run courant alimentés depuis plusieurs threads (perf.bind)."""
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+
+
+def test_spans_from_bound_threads():
+    run = perf.start_run()
+
+    def work(_i):
+        with perf.bind(run):
+            for _ in range(500):
+                with perf.span("io"):
+                    pass
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(work, range(8)))
+    out = perf.finish_run("test")
+    assert out["spans"]["io"]["calls"] == 8 * 500
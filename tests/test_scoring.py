@@ -0,0 +1,42 @@
+"""Micro-batcher de scoring : erreurs par requête et arrêt du worker."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from scoring import Scorer
+
+
+class RateModel:
+    """Proba = x / 10 ; échoue si une ligne du lot est négative."""
+
+    feature_names_in_ = np.array(["x"], dtype=object)
+
+    def predict_proba(self, X):
+        if (X["x"] < 0).any():
+            raise ValueError("x négatif")
+        p = X["x"].to_numpy() / 10
+        return np.column_stack([1 - p, p])
+
+
+def test_bad_row_fails_only_its_request():
+    scorer = Scorer("test", RateModel(), 0.5, source="test", max_wait_ms=50)
+    rows = [{"x": 1.0}, {"x": -1.0}, {"x": 3.0}]
+    with ThreadPoolExecutor(len(rows)) as pool:
+        futures = [pool.submit(scorer.predict_one, r) for r in rows]
+    assert futures[0].result() == pytest.approx(0.1)
+    assert futures[2].result() == pytest.approx(0.3)
+    with pytest.raises(ValueError):
+        futures[1].result()
+    scorer.close()
+
+
+def test_close_stops_worker_and_restarts_on_demand():
+    scorer = Scorer("test", RateModel(), 0.5, source="test")
+    assert scorer.predict_one({"x": 2.0}) == pytest.approx(0.2)
+    worker = scorer._worker
+    scorer.close()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert scorer.predict_one({"x": 4.0}) == pytest.approx(0.4)
+    scorer.close()
@@ -0,0 +1,78 @@
+"""DepIndex.locate comparé à un lancer de rayon exhaustif (règle pair-impair)."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from geo_pipeline import TOPO_PATH, decode_level
+from spatial_index import DEP_LEVEL, DepIndex, _rings
+
+
+def _square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+def _feature(code, geometry):
+    return {"type": "Feature", "properties": {"code": code, "nom": code}, "geometry": geometry}
+
+
+# Trou, département voisin, île dans le trou, multipolygone, polygone concave
+# (sommets hors des centres de cellules : un centre sur une arête est ambigu)
+SYNTHETIC = {
+    "type": "FeatureCollection",
+    "features": [
+        _feature("A", {"type": "Polygon",
+                       "coordinates": [_square(0, 0, 1, 1), _square(0.3, 0.3, 0.6, 0.6)]}),
+        _feature("B", {"type": "Polygon", "coordinates": [_square(1, 0, 2, 1)]}),
+        _feature("C", {"type": "MultiPolygon", "coordinates": [
+            [[[0.41, 0.42], [0.553, 0.402], [0.497, 0.551], [0.41, 0.42]]],
+            [_square(2.2, 0.2, 2.5, 0.9)],
+        ]}),
+        _feature("D", {"type": "Polygon", "coordinates": [[
+            [0, 1.2], [2, 1.2], [2, 2], [1.5, 1.4], [1, 2], [0.5, 1.4], [0, 2], [0, 1.2],
+        ]]}),
+    ],
+}
+
+
+def brute_force(geojson, lon, lat):
+    """Indice du département de chaque point : parité des arêtes coupées par un rayon horizontal."""
+    out = np.full(len(lon), -1, dtype=np.int16)
+    for k, feature in enumerate(geojson["features"]):
+        inside = np.zeros(len(lon), dtype=bool)
+        for ring in _rings(feature["geometry"]):
+            ax, ay, bx, by = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+            spans = (ay[None] > lat[:, None]) != (by[None] > lat[:, None])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                xi = ax[None] + (lat[:, None] - ay[None]) * (bx - ax)[None] / (by - ay)[None]
+            inside ^= (np.count_nonzero(spans & (lon[:, None] < xi), axis=1) % 2).astype(bool)
+        out[inside] = k
+    return out
+
+
+@pytest.mark.parametrize("cell", [0.05, 0.1, 0.37])
+def test_locate_synthetic(cell):
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-0.3, 2.8, 20_000)
+    lat = rng.uniform(-0.3, 2.3, 20_000)
+    index = DepIndex.from_geojson(SYNTHETIC, cell=cell)
+    np.testing.assert_array_equal(index.locate(lon, lat), brute_force(SYNTHETIC, lon, lat))
+
+
+def test_locate_outside_and_nan():
+    index = DepIndex.from_geojson(SYNTHETIC, cell=0.1)
+    out = index.locate([np.nan, -10.0, 0.45, 0.2], [0.5, 0.5, 0.45, 0.2])
+    assert out.tolist() == [-1, -1, 2, 0]
+    assert index.lookup([0.2, 1.5], [0.2, 0.5]).tolist() == ["A", "B"]
+
+
+@pytest.mark.skipif(not os.path.exists(TOPO_PATH), reason="departements.topo.json absent")
+def test_locate_departements():
+    with open(TOPO_PATH, "r", encoding="utf-8") as f:
+        geojson = decode_level(json.load(f), DEP_LEVEL)
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-5.5, 10.0, 1_000)
+    lat = rng.uniform(41.0, 51.5, 1_000)
+    index = DepIndex.from_geojson(geojson)
+    np.testing.assert_array_equal(index.locate(lon, lat), brute_force(geojson, lon, lat))
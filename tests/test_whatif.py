@@ -0,0 +1,98 @@
+"""WhatIfTable.lookup comparé à scipy.interpolate.RegularGridInterpolator."""
+import json
+
+import os
+
+import numpy as np
+import pytest
+from scipy.interpolate import RegularGridInterpolator
+
+import model_store
+import scoring
+import whatif
+from conftest import SCENARIO, VARIANT
+from feature_pipeline import FeatureStore
+from whatif import OUTPUTS, TABLE_FORMAT, TABLE_NAME, WhatIfTable
+
+# Codes catégoriels non contigus, nœuds numériques irréguliers
+AXES = [
+    {"name": "agg", "kind": "cat", "values": [1, 2]},
+    {"name": "lum", "kind": "cat", "values": [1, 3, 5]},
+    {"name": "age_moy", "kind": "num", "values": [15.0, 30.0, 50.0, 80.0]},
+    {"name": "taux", "kind": "num", "values": [2.0, 4.5, 9.0]},
+]
+
+
+def write_table(path, **meta):
+    """Écrit une table aléatoire sur AXES dans `path` ; renvoie ses valeurs."""
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(0)
+    values = rng.random([len(a["values"]) for a in AXES] + [len(OUTPUTS)])
+    np.save(os.path.join(path, TABLE_NAME), values, allow_pickle=False)
+    meta = {"format": TABLE_FORMAT, "axes": AXES, "t_star": 0.1, **meta}
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return values
+
+
+@pytest.fixture
+def table(tmp_path):
+    values = write_table(str(tmp_path))
+    return WhatIfTable(str(tmp_path)), values
+
+
+def reference(values, agg, lum, age, taux):
+    """Interpolation multilinéaire de scipy (axes catégoriels : rang du code, exact)."""
+    grid = [np.arange(2.0), np.arange(3.0), np.asarray(AXES[2]["values"]), np.asarray(AXES[3]["values"])]
+    interp = RegularGridInterpolator(grid, values)
+    rank = {code: i for i, code in enumerate(AXES[1]["values"])}
+    points = np.column_stack([
+        np.asarray(agg) - 1.0,
+        [rank[c] for c in lum],
+        np.clip(age, 15.0, 80.0),
+        np.clip(taux, 2.0, 9.0),
+    ])
+    return interp(points)
+
+
+def test_lookup_matches_scipy(table):
+    wt, values = table
+    rng = np.random.default_rng(1)
+    n = 2_000
+    agg = rng.choice([1, 2], n)
+    lum = rng.choice([1, 3, 5], n)
+    age = rng.uniform(5.0, 95.0, n)      # hors grille : borné aux nœuds extrêmes
+    taux = rng.uniform(1.0, 10.0, n)
+    res = wt.lookup(agg=agg, lum=lum, age_moy=age, taux=taux)
+    ref = reference(values, agg, lum, age, taux)
+    for k, name in enumerate(OUTPUTS):
+        np.testing.assert_allclose(res[name], ref[:, k], rtol=0, atol=1e-12)
+
+
+def test_lookup_exact_at_nodes(table):
+    wt, values = table
+    res = wt.lookup(agg=2, lum=3, age_moy=50.0, taux=4.5)
+    np.testing.assert_allclose([res[name] for name in OUTPUTS], values[1, 1, 2, 1], atol=1e-12)
+
+
+def test_lookup_rejects_unknown_code_and_missing_axis(table):
+    wt, _ = table
+    with pytest.raises(ValueError):
+        wt.lookup(agg=1, lum=2, age_moy=40.0, taux=3.0)
+    with pytest.raises(ValueError):
+        wt.lookup(agg=1, lum=3, age_moy=40.0)
+
+
+def test_open_table_in_model_dir(deployed_model, tmp_path, monkeypatch):
+    monkeypatch.setattr(whatif, "FeatureStore", lambda: FeatureStore(str(tmp_path / "features")))
+    path = whatif.table_dir(deployed_model, SCENARIO, VARIANT)
+    sha = model_store.model_sha256(scoring.model_path(SCENARIO))
+    write_table(path, model_sha256=sha, features_version="", n_rows=10)
+
+    table = whatif.open_table(SCENARIO, VARIANT, model_dir=deployed_model)
+    assert table is not None
+    assert float(table.lookup(agg=1, lum=1, age_moy=15.0, taux=2.0)["proba"]) >= 0.0
+    assert scoring._scorers == {}   # fraîcheur vérifiée sans charger le modèle
+
+    write_table(path, model_sha256="0" * 64, features_version="", n_rows=10)
+    assert whatif.open_table(SCENARIO, VARIANT, model_dir=deployed_model) is None
@@ -0,0 +1,500 @@
+"""Recherche d'hyperparamètres parallèle et reprenable (S0 / S1 × variantes).
+
+Chaque essai (scénario × variante × candidat × fold) tourne dans un pool de
+processus et son OOF est écrit sur disque dès qu'il se termine : une
+recherche interrompue reprend là où elle s'était arrêtée. Pour LGBM /
+XGBoost, les candidats passent par des paliers successifs (successive
+halving sur le nombre de folds) : seul le meilleur tiers au sens de l'AP
+est évalué sur les folds suivants.
+
+Pour chaque variante, le meilleur candidat (AP moyenne en CV) donne l'OOF
+complet, le seuil `t*` (maximisation du F1) et les métriques (cf.
+metrics_engine.py). Pour S1, le taux départemental de chaque essai est
+recalculé sur les lignes d'entraînement du fold (cf. `fold_dep_rate`) :
+celui du magasin de variables contient les mortels des lignes de
+validation. On écrit ensuite les artefacts lus par le site (cf.
+`write_artifacts`) :
+
+    python train_search.py --years 2015-2023 --workers 8
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import metrics_store
+from baac_store import _parse_years
+from feature_pipeline import DEP_RATE_FEATURE, USAGER_FEATURES, FeatureStore, dep_counts, dep_rate
+from metrics_engine import METRICS, evaluate
+
+BASE_DIR = os.path.dirname(__file__)
+INPUT_DIR = os.path.join(BASE_DIR, "Input_Site_Web")
+RUN_DIR = os.environ.get("BAAC_RUN_DIR", os.path.join(BASE_DIR, "data", "runs"))
+
+TARGET = "is_mortel"
+BASE_FEATURES = [
+    "mois", "jour", "hrmn", "lum", "agg", "int", "atm", "col",
+    "catr", "circ", "nbv", "vma", "vosp", "prof", "plan", "surf", "infra", "situ",
+    "lat", "long",
+] + USAGER_FEATURES
+SCENARIO_FEATURES = {
+    "S0_baseline": BASE_FEATURES,
+    "S1_spatial": BASE_FEATURES + [DEP_RATE_FEATURE],
+}
+# Colonnes dont le taux départemental est recalculé dans chaque fold
+FOLD_RATE_COLUMNS = ["an", "dep"]
+
+# Ordre des colonnes de best_params_<scénario>.csv
+PARAM_COLUMNS = [
+    "clf__solver", "clf__penalty", "clf__class_weight", "clf__C",
+    "clf__n_estimators", "clf__min_samples_leaf", "clf__max_features", "clf__max_depth",
+    "clf__reg_lambda", "clf__num_leaves", "clf__min_child_samples", "clf__learning_rate",
+    "clf__feature_fraction", "clf__subsample", "clf__colsample_bytree",
+]
+
+N_FOLDS = 5
+SEED = 42
+# Successive halving : on garde 1 / HALVING_ETA des candidats à chaque palier
+HALVING_ETA = 3
+HALVING_VARIANTS = ("lgbm", "xgb")
+# Variante exportée pour le scoring et les explications SHAP
+EXPORT_VARIANT = "lgbm"
+
+
+# =========================
+# VARIANTES
+# =========================
+
+def _logreg(**fixed):
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return Pipeline([
+        ("imp", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+        ("clf", LogisticRegression(max_iter=2000, **fixed)),
+    ])
+
+
+def _logreg_smote():
+    from imblearn.over_sampling import SMOTE
+    from imblearn.pipeline import Pipeline
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    return Pipeline([
+        ("imp", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+        ("smote", SMOTE(random_state=SEED)),
+        ("clf", LogisticRegression(max_iter=2000)),
+    ])
+
+
+def _rf_bal():
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([
+        ("imp", SimpleImputer(strategy="median")),
+        ("clf", RandomForestClassifier(class_weight="balanced", n_jobs=1, random_state=SEED)),
+    ])
+
+
+def _lgbm():
+    from lightgbm import LGBMClassifier
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([("clf", LGBMClassifier(n_jobs=1, random_state=SEED, verbose=-1))])
+
+
+def _xgb():
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
+
+    return Pipeline([("clf", XGBClassifier(n_jobs=1, random_state=SEED, eval_metric="logloss"))])
+
+
+def _space():
+    from scipy.stats import loguniform, randint, uniform
+
+    logreg = {"clf__C": loguniform(1e-3, 1e2)}
+    return {
+        "logreg": (lambda: _logreg(), logreg, 8),
+        "logreg_bal": (lambda: _logreg(class_weight="balanced"), logreg, 8),
+        "logreg_smote": (_logreg_smote, logreg, 6),
+        "rf_bal": (_rf_bal, {
+            "clf__n_estimators": [200, 500],
+            "clf__min_samples_leaf": [1, 5, 20],
+            "clf__max_features": ["sqrt", 0.5],
+            "clf__max_depth": [8, 10, 16, None],
+        }, 6),
+        "lgbm": (_lgbm, {
+            "clf__n_estimators": [300, 500, 800],
+            "clf__learning_rate": loguniform(0.01, 0.1),
+            "clf__num_leaves": [15, 31, 63, 127],
+            "clf__max_depth": [-1, 6, 8, 12],
+            "clf__min_child_samples": randint(5, 100),
+            "clf__reg_lambda": [0.0, 0.1, 1.0, 5.0],
+            "clf__feature_fraction": uniform(0.6, 0.4),
+        }, 27),
+        "xgb": (_xgb, {
+            "clf__n_estimators": [300, 500, 800],
+            "clf__learning_rate": loguniform(0.01, 0.1),
+            "clf__max_depth": [3, 5, 7],
+            "clf__reg_lambda": [0.01, 0.1, 1.0, 5.0],
+            "clf__subsample": uniform(0.6, 0.4),
+            "clf__colsample_bytree": uniform(0.6, 0.4),
+        }, 27),
+    }
+
+
+# Paramètres fixes reportés dans best_params (comme dans l'export d'origine)
+FIXED_PARAMS = {
+    "logreg": {"clf__solver": "lbfgs", "clf__penalty": "l2"},
+    "logreg_bal": {"clf__solver": "lbfgs", "clf__penalty": "l2", "clf__class_weight": "balanced"},
+    "logreg_smote": {"clf__solver": "lbfgs", "clf__penalty": "l2"},
+    "rf_bal": {"clf__class_weight": "balanced"},
+}
+
+
+def available_variants():
+    """Variantes dont les dépendances optionnelles sont installées."""
+    out = []
+    for variant, (make, _, _) in _space().items():
+        try:
+            make()
+        except ImportError:
+            continue
+        out.append(variant)
+    return out
+
+
+def candidates(variant, scale=1.0):
+    """Candidats (dicts de paramètres) tirés de façon reproductible."""
+    from sklearn.model_selection import ParameterSampler
+
+    _, space, n_iter = _space()[variant]
+    n_iter = max(1, round(n_iter * scale))
+    out = []
+    for params in ParameterSampler(space, n_iter=n_iter, random_state=SEED):
+        out.append({k: (v.item() if hasattr(v, "item") else v) for k, v in sorted(params.items())})
+    # Doublons possibles sur des grilles discrètes
+    return [dict(p) for p in {json.dumps(p, sort_keys=True): p for p in out}.values()]
+
+
+def fold_schedule(variant, n_folds=N_FOLDS):
+    """Nombre de folds évalués à chaque palier."""
+    if variant in HALVING_VARIANTS and n_folds > 1:
+        return sorted({1, math.ceil(n_folds / HALVING_ETA), n_folds})
+    return [n_folds]
+
+
+# =========================
+# ESSAIS (processus de travail)
+# =========================
+
+_DATA = {}
+
+
+def _init_worker(data_path, folds_path):
+    _DATA["df"] = pd.read_parquet(data_path)
+    _DATA["folds"] = np.load(folds_path)
+
+
+def fold_dep_rate(df, train):
+    """Taux départemental calculé sur les seules lignes d'entraînement `train`.
+
+    Calculé sur toutes les lignes, il contiendrait les mortels des lignes de
+    validation du fold (fuite de la cible). Département absent de
+    l'entraînement : taux national de l'entraînement.
+    """
+    rates = dep_rate(dep_counts(df.iloc[train]))
+    rates = dict(zip(rates["dep"].astype(str), rates[DEP_RATE_FEATURE]))
+    national = 100.0 * df[TARGET].iloc[train].mean()
+    return df["dep"].astype(str).map(rates).fillna(national).astype("float32")
+
+
+def run_trial(trial):
+    """Ajuste un candidat sur un fold ; renvoie (clé, indices validation, proba)."""
+    df, folds = _DATA["df"], _DATA["folds"]
+    val = np.flatnonzero(folds == trial["fold"])
+    train = np.flatnonzero(folds != trial["fold"])
+    X = df[SCENARIO_FEATURES[trial["scenario"]]]
+    if DEP_RATE_FEATURE in X:
+        X = X.assign(**{DEP_RATE_FEATURE: fold_dep_rate(df, train)})
+    y = df[TARGET].to_numpy()
+    model = _space()[trial["variant"]][0]()
+    model.set_params(**trial["params"])
+    start = time.perf_counter()
+    model.fit(X.iloc[train], y[train])
+    proba = model.predict_proba(X.iloc[val])[:, 1]
+    return trial["key"], val, proba.astype(np.float32), time.perf_counter() - start
+
+
+# =========================
+# ORCHESTRATION
+# =========================
+
+class Search:
+    """Recherche sur disque : données figées, folds, essais terminés."""
+
+    def __init__(self, df, run_dir=RUN_DIR, n_folds=N_FOLDS):
+        self.n_folds = n_folds
+        cols = sorted(set(sum(SCENARIO_FEATURES.values(), [])) | {TARGET, *FOLD_RATE_COLUMNS})
+        self.df = df[cols].reset_index(drop=True)
+        fp = hashlib.sha1(pd.util.hash_pandas_object(self.df, index=False).to_numpy()).hexdigest()[:12]
+        self.dir = os.path.join(run_dir, f"{fp}-k{n_folds}")
+        self.trial_dir = os.path.join(self.dir, "trials")
+        os.makedirs(self.trial_dir, exist_ok=True)
+
+        self.data_path = os.path.join(self.dir, "data.parquet")
+        self.folds_path = os.path.join(self.dir, "folds.npy")
+        if not os.path.exists(self.data_path):
+            self.df.to_parquet(self.data_path + ".tmp", index=False)
+            os.replace(self.data_path + ".tmp", self.data_path)
+        if not os.path.exists(self.folds_path):
+            from sklearn.model_selection import StratifiedKFold
+
+            folds = np.empty(len(self.df), dtype=np.int8)
+            skf = StratifiedKFold(n_folds, shuffle=True, random_state=SEED)
+            for k, (_, val) in enumerate(skf.split(self.df, self.df[TARGET])):
+                folds[val] = k
+            np.save(self.folds_path, folds)
+        self.folds = np.load(self.folds_path)
+        self.y = self.df[TARGET].to_numpy()
+
+    @staticmethod
+    def trial_key(scenario, variant, params, fold):
+        raw = json.dumps([scenario, variant, params, fold], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+    def _trial_path(self, key):
+        return os.path.join(self.trial_dir, f"{key}.npz")
+
+    def done(self, key):
+        return os.path.exists(self._trial_path(key))
+
+    def _save(self, key, val, proba):
+        path = self._trial_path(key)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, val=val, proba=proba)
+        os.replace(path + ".tmp", path)
+
+    def oof(self, scenario, variant, params, n_folds=None):
+        """OOF (NaN hors des folds évalués) d'un candidat."""
+        out = np.full(len(self.df), np.nan, dtype=np.float32)
+        for fold in range(n_folds or self.n_folds):
+            with np.load(self._trial_path(self.trial_key(scenario, variant, params, fold))) as z:
+                out[z["val"]] = z["proba"]
+        return out
+
+    def cv_ap(self, scenario, variant, params, n_folds):
+        """AP moyenne sur les `n_folds` premiers folds."""
+        oof = self.oof(scenario, variant, params, n_folds)
+        return float(np.mean([
+            evaluate(self.y[self.folds == fold], oof[self.folds == fold]).ap
+            for fold in range(n_folds)
+        ]))
+
+    def run(self, groups, workers=None, log=print):
+        """Exécute les essais de chaque (scénario, variante) ; renvoie les survivants.
+
+        `groups` : {(scénario, variante): [candidats]}.
+        """
+        alive = {g: list(c) for g, c in groups.items()}
+        schedules = {g: fold_schedule(g[1], self.n_folds) for g in groups}
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(self.data_path, self.folds_path),
+        ) as pool:
+            for stage in range(max(len(s) for s in schedules.values())):
+                pending = []
+                for g, sched in schedules.items():
+                    if stage >= len(sched):
+                        continue
+                    for params in alive[g]:
+                        for fold in range(sched[stage]):
+                            key = self.trial_key(*g, params, fold)
+                            if not self.done(key):
+                                pending.append({"scenario": g[0], "variant": g[1], "params": params,
+                                                "fold": fold, "key": key})
+                log(f"Palier {stage} : {len(pending)} essais à lancer")
+                futures = [pool.submit(run_trial, t) for t in pending]
+                for i, fut in enumerate(as_completed(futures), 1):
+                    key, val, proba, secs = fut.result()
+                    self._save(key, val, proba)
+                    if i % 10 == 0 or i == len(futures):
+                        log(f"  {i}/{len(futures)} essais ({secs:.1f} s le dernier)")
+                for g, sched in schedules.items():
+                    if stage < len(sched) - 1:
+                        scored = sorted(alive[g], key=lambda p: -self.cv_ap(*g, p, sched[stage]))
+                        alive[g] = scored[:max(1, math.ceil(len(scored) / HALVING_ETA))]
+        return alive
+
+    def best(self, scenario, variant, survivors):
+        return max(survivors, key=lambda p: self.cv_ap(scenario, variant, p, self.n_folds))
+
+
+# =========================
+# MÉTRIQUES & ARTEFACTS
+# =========================
+
+def variant_results(search, scenario, variant, params):
+    """Lignes metrics (0.5 et t*), best_params et courbes PR / ROC d'une variante."""
+    ev = evaluate(search.y, search.oof(scenario, variant, params))
+    best = {"scenario": scenario, "variant": variant, "t_star": ev.t_star,
+            **FIXED_PARAMS.get(variant, {}), **params}
+    curves = ev.curves()
+    curves.insert(0, "variant", variant)
+    return ev.table(scenario, variant), best, curves
+
+
+def gains(metrics):
+    """Gains S1 vs S0 à t* (Brier : baisse comptée positivement)."""
+    return metrics_store.gains(metrics, "S0_baseline", "S1_spatial")
+
+
+def _best_models_html(best_rows):
+    parts = []
+    for b in best_rows:
+        params = "".join(
+            f"<li><code>{k}</code>: {v}</li>"
+            for k, v in b.items() if k.startswith("clf__") and v is not None
+        )
+        parts.append(
+            f"<h3>{b['scenario']} — <code>{b['variant']}</code></h3>\n"
+            f"<p>t* (OOF) : <b>{b['t_star']:.4f}</b></p>\n<ul>{params}</ul>"
+        )
+    return (
+        '<!doctype html><html><head><meta charset="utf-8"><title>Best modèles S0/S1</title>\n'
+        "<style>body{font-family:Arial, sans-serif;margin:20px} code{background:#f6f6f6;padding:2px 4px}"
+        "</style></head><body>\n<h2>Best modèles par scénario (en mémoire)</h2>\n"
+        + "\n<hr>\n".join(parts) + "\n</body></html>"
+    )
+
+
+def _write_plotly_html(fig, path):
+    # Sans runtime ni CDN : la figure est extraite et rendue par st.plotly_chart (cf. plotly_figures)
+    fig.write_html(path, include_plotlyjs=False, full_html=True)
+
+
+def _gains_figure(g):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(x=g["variant"], y=g["d_AUC_pct"], name="Gain % AUC"))
+    fig.update_layout(
+        title="Gains relatifs (%) — AUC (S1 vs S0)", height=520, template="plotly_white",
+        updatemenus=[{
+            "buttons": [
+                {"args": [{"y": [g[f"d_{m}_pct"].tolist()], "name": [f"Gain % {m}"]},
+                          {"title": f"Gains relatifs (%) — {m} (S1 vs S0)"}],
+                 "label": m, "method": "update"}
+                for m in METRICS
+            ],
+            "type": "dropdown", "x": 1.0, "xanchor": "right", "y": 1.12,
+        }],
+    )
+    fig.add_hline(y=0, line=dict(color="#999", dash="dot"))
+    return fig
+
+
+def write_artifacts(metrics, best_rows, curves, out_dir=INPUT_DIR):
+    """metrics / best_params / courbes par scénario, gains, rapports HTML lus par le site."""
+    for scenario in SCENARIO_FEATURES:
+        m = metrics[metrics["scenario"] == scenario]
+        if m.empty:
+            continue
+        m.to_csv(os.path.join(out_dir, f"metrics_{scenario}.csv"), index=False, lineterminator="\n")
+        curves[scenario].to_csv(
+            os.path.join(out_dir, f"curves_{scenario}.csv"), index=False, lineterminator="\n",
+        )
+        bp = pd.DataFrame([b for b in best_rows if b["scenario"] == scenario])
+        cols = ["scenario", "variant", "t_star"] + PARAM_COLUMNS
+        bp.reindex(columns=cols).to_csv(
+            os.path.join(out_dir, f"best_params_{scenario}.csv"), index=False, lineterminator="\n",
+        )
+        tstar = m[(m["seuil"] == "t*") & (m["variant"] == EXPORT_VARIANT)]
+        if not tstar.empty:
+            _write_plotly_html(metrics_store.bar_figure(tstar, scenario),
+                               os.path.join(out_dir, f"BAR_{scenario}.html"))
+
+    g = gains(metrics)
+    if not g.empty:
+        g.to_csv(os.path.join(out_dir, "gains_S1_vs_S0.csv"), index=False, lineterminator="\n")
+        _write_plotly_html(_gains_figure(g), os.path.join(out_dir, "mini_dashboard_gains.html"))
+
+    exported = [b for b in best_rows if b["variant"] == EXPORT_VARIANT]
+    if exported:
+        with open(os.path.join(out_dir, "best_models_report_in_memory.html"), "w", encoding="utf-8") as f:
+            f.write(_best_models_html(exported))
+
+
+def export_models(search, best_rows, model_dir):
+    """Réajuste la variante exportée sur toutes les données (scoring / SHAP)."""
+    import joblib
+
+    os.makedirs(model_dir, exist_ok=True)
+    for b in best_rows:
+        if b["variant"] != EXPORT_VARIANT:
+            continue
+        params = {k: v for k, v in b.items() if k.startswith("clf__") and k not in FIXED_PARAMS.get(b["variant"], {})}
+        model = _space()[b["variant"]][0]().set_params(**params)
+        model.set_params(clf__n_jobs=-1)
+        model.fit(search.df[SCENARIO_FEATURES[b["scenario"]]], search.y)
+        path = os.path.join(model_dir, f"best_{b['scenario']}.joblib")
+        joblib.dump(model, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=_parse_years, default=None)
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIO_FEATURES))
+    parser.add_argument("--variants", nargs="+", default=None)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="facteur sur le nombre de candidats par variante")
+    parser.add_argument("--out-dir", default=INPUT_DIR)
+    parser.add_argument("--model-dir", default=os.environ.get("BAAC_MODEL_DIR", os.path.join(INPUT_DIR, "models")))
+    args = parser.parse_args(argv)
+
+    df = FeatureStore().load(years=args.years)
+    if df.empty:
+        print("Magasin de variables vide : lancer d'abord `python feature_pipeline.py update …`.")
+        return 1
+    variants = args.variants or available_variants()
+    missing = sorted(set(_space()) - set(available_variants()))
+    if missing:
+        print(f"Variantes ignorées (dépendance absente) : {', '.join(missing)}")
+
+    search = Search(df, n_folds=args.folds)
+    groups = {(s, v): candidates(v, args.scale) for s in args.scenarios for v in variants}
+    print(f"{len(df)} accidents, {len(groups)} groupes, reprise dans {search.dir}")
+    survivors = search.run(groups, workers=args.workers)
+
+    tables, best_rows, curves = [], [], {}
+    for (scenario, variant), alive in survivors.items():
+        t, b, c = variant_results(search, scenario, variant, search.best(scenario, variant, alive))
+        tables.append(t)
+        best_rows.append(b)
+        curves[scenario] = pd.concat([curves.get(scenario), c], ignore_index=True)
+    metrics = pd.concat(tables, ignore_index=True)
+    write_artifacts(metrics, best_rows, curves, args.out_dir)
+    export_models(search, best_rows, args.model_dir)
+    print(metrics[metrics["seuil"] == "t*"].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
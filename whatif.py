@@ -0,0 +1,338 @@
+"""Tables « what-if » : probabilité d'accident mortel précalculée sur une grille.
+
+Pour explorer l'effet de quelques variables (agglomération, catégorie de
+route, luminosité, type de collision, âge des usagers, taux départemental
+de S1) sans appeler le modèle à chaque mouvement de curseur, la dépendance
+partielle du best modèle est évaluée hors ligne sur la grille de ces
+variables : chaque accident d'un échantillon du magasin de variables est
+placé en chaque point de la grille (courbes ICE, prédites par lots
+vectorisés), puis on garde par point la moyenne (dépendance partielle) et
+les déciles 10 / 90 des courbes ICE.
+
+Les axes catégoriels sont lus exactement ; l'âge moyen (les âges min / max
+de l'accident sont décalés d'autant) et le taux départemental sont
+interpolés linéairement entre les nœuds. Les tables sont écrites dans
+`<BAAC_MODEL_DIR>/<scénario>_<variante>_whatif/` (`table.npy` projeté en
+mémoire, axes × (moyenne, p10, p90), + `meta.json`) et ignorées si le modèle ou le magasin de variables
+a changé depuis leur construction.
+
+    python whatif.py build                 # tous les scénarios
+    python whatif.py build S1_spatial --rows 500
+    python whatif.py status
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import model_store
+import scoring
+from asset_cache import get_cache
+from eda_cube import LABELS
+from feature_pipeline import DEP_RATE_FEATURE, FeatureStore, dep_rate
+
+TABLE_FORMAT = 1
+TABLE_NAME = "table.npy"
+OUTPUTS = ("proba", "p10", "p90")   # dernière dimension de la table
+
+# Axes de la grille : codes BAAC (lus exactement) puis nœuds interpolés
+CATEGORICAL_AXES = ["agg", "catr", "lum", "col"]
+AGE_FEATURE = "age_moy"
+AGE_SHIFTED = ["age_min", "age_max"]
+AGE_NODES = [15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80]
+RATE_NODES = 7   # quantiles des taux départementaux
+
+AXIS_LABELS = {
+    "agg": "Agglomération",
+    "catr": "Catégorie de route",
+    "lum": "Luminosité",
+    "col": "Type de collision",
+    AGE_FEATURE: "Âge moyen des usagers",
+    DEP_RATE_FEATURE: "Taux départemental d'accidents mortels (%)",
+}
+
+# Accidents de l'échantillon (une courbe ICE chacun)
+SAMPLE_ROWS = 200
+SAMPLE_SEED = 0
+
+
+def table_dir(model_dir, scenario, variant):
+    return f"{model_store.store_dir(model_dir, scenario, variant)}_whatif"
+
+
+def _model_version(scorer):
+    """Empreinte du modèle servi par `scorer` (booster du magasin ou joblib)."""
+    if scorer.store is not None:
+        return scorer.store.meta["model_sha256"]
+    return model_store.model_sha256(scorer.source)
+
+
+def _served_sha256(scenario, variant, model_dir):
+    """Empreinte du modèle que servirait `scoring.get_scorer`, sans le charger.
+
+    Le joblib s'il est déployé (un magasin de modèles n'est servi que s'il
+    en est issu), sinon le magasin ; None si aucun des deux n'existe.
+    """
+    sha = model_store.model_sha256(scoring.model_path(scenario))
+    if sha is not None:
+        return sha
+    stored = model_store.open_store(model_dir, scenario, variant)
+    return stored.meta["model_sha256"] if stored is not None else None
+
+
+def grid_axes(features, state):
+    """Axes de la grille pour les variables du modèle : [{name, kind, values}]."""
+    axes = [
+        {"name": a, "kind": "cat", "values": sorted(LABELS[a])}
+        for a in CATEGORICAL_AXES if a in features
+    ]
+    if AGE_FEATURE in features:
+        axes.append({"name": AGE_FEATURE, "kind": "num", "values": [float(a) for a in AGE_NODES]})
+    if DEP_RATE_FEATURE in features and not state.empty:
+        rates = dep_rate(state)[DEP_RATE_FEATURE].to_numpy(dtype=float)
+        nodes = np.unique(np.round(np.quantile(rates, np.linspace(0, 1, RATE_NODES)), 3))
+        axes.append({"name": DEP_RATE_FEATURE, "kind": "num", "values": nodes.tolist()})
+    return axes
+
+
+class WhatIfTable:
+    """Table d'un scénario × variante : axes, dépendance partielle et déciles ICE."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.axes = self.meta["axes"]
+        self.t_star = self.meta["t_star"]
+        self._table = None
+        self._lock = threading.Lock()
+        # Axe catégoriel : code BAAC -> rang (-1 : code inconnu) ; numérique : nœuds
+        self._index = {}
+        for a in self.axes:
+            if a["kind"] == "cat":
+                ranks = np.full(max(a["values"]) + 1, -1, dtype=np.intp)
+                ranks[a["values"]] = np.arange(len(a["values"]))
+                self._index[a["name"]] = ranks
+            else:
+                self._index[a["name"]] = np.asarray(a["values"], dtype=float)
+
+    @property
+    def table(self):
+        """Table projetée en lecture seule, aplatie : (points de la grille, OUTPUTS)."""
+        with self._lock:
+            if self._table is None:
+                table = np.load(os.path.join(self.path, TABLE_NAME), mmap_mode="r",
+                                allow_pickle=False)
+                self._table = np.asarray(table).reshape(-1, len(OUTPUTS))
+            return self._table
+
+    def axis(self, name):
+        return next(a for a in self.axes if a["name"] == name)
+
+    def lookup(self, **query):
+        """{proba, p10, p90} aux points demandés (scalaires ou tableaux diffusables).
+
+        Codes inconnus : ValueError ; valeurs numériques hors grille : bornées.
+        """
+        missing = [a["name"] for a in self.axes if a["name"] not in query]
+        if missing:
+            raise ValueError(f"Axes manquants : {', '.join(missing)}")
+        values = np.broadcast_arrays(*(np.asarray(query[a["name"]]) for a in self.axes))
+        corners = [(0, 1.0)]   # (rang du point dans la table aplatie, poids)
+        stride = 1
+        for a, v in zip(reversed(self.axes), reversed(values)):
+            index = self._index[a["name"]]
+            if a["kind"] == "cat":
+                code = v.astype(np.intp)
+                known = (code >= 0) & (code < len(index))
+                i = index[np.where(known, code, 0)]
+                if not known.all() or (i < 0).any():
+                    raise ValueError(f"Code inconnu pour {a['name']} : {code}")
+                corners = [(o + i * stride, w) for o, w in corners]
+            elif len(index) > 1:
+                x = np.minimum(np.maximum(v.astype(float), index[0]), index[-1])
+                i = np.minimum(np.searchsorted(index, x, side="right") - 1, len(index) - 2)
+                t = (x - index[i]) / (index[i + 1] - index[i])
+                corners = [
+                    c for o, w in corners
+                    for c in ((o + i * stride, w * (1 - t)), (o + (i + 1) * stride, w * t))
+                ]
+            stride *= len(a["values"])
+        offsets = np.stack(np.broadcast_arrays(*(o for o, _ in corners)))
+        weights = np.stack(np.broadcast_arrays(*(np.asarray(w, dtype=float) for _, w in corners)))
+        res = (weights[..., None] * self.table[offsets]).sum(axis=0)
+        return {name: res[..., k] for k, name in enumerate(OUTPUTS)}
+
+    def curve(self, name, n=61, **fixed):
+        """(x, {proba, p10, p90}) le long de l'axe numérique `name`, autres axes fixés."""
+        nodes = self.axis(name)["values"]
+        x = np.linspace(nodes[0], nodes[-1], n)
+        return x, self.lookup(**{**fixed, name: x})
+
+    @property
+    def nbytes(self):
+        return sum(os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path))
+
+
+def open_table(scenario, variant=scoring.DEFAULT_VARIANT, model_dir=None):
+    """Table courante du scénario, None si elle manque ou est périmée.
+
+    Périmée : format différent, modèle servi par `scoring.get_scorer` ou
+    magasin de variables modifié depuis la construction. Le modèle n'est
+    comparé que par empreinte : il n'est pas chargé.
+    """
+    model_dir = model_dir or scoring.MODEL_DIR
+    path = table_dir(model_dir, scenario, variant)
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    table = get_cache().get(meta_path, "whatif", lambda _p: WhatIfTable(path), cost=lambda _t: 0)
+    if table is None or table.meta.get("format") != TABLE_FORMAT:
+        return None
+    sha = _served_sha256(scenario, variant, model_dir)
+    if sha is not None and sha != table.meta["model_sha256"]:
+        return None
+    store = FeatureStore()
+    if store.years and model_store.features_version(store) != table.meta["features_version"]:
+        return None
+    return table
+
+
+def build(scenario, variant=scoring.DEFAULT_VARIANT, model_dir=None, n_rows=SAMPLE_ROWS,
+          seed=SAMPLE_SEED):
+    """Calcule la table d'un scénario depuis le magasin de variables ; renvoie son chemin."""
+    scorer = scoring.get_scorer(scenario, variant)
+    if scorer is None:
+        raise FileNotFoundError(f"Modèle introuvable : {scoring.model_path(scenario)}")
+    store = FeatureStore()
+    df = store.load()
+    if df.empty:
+        raise ValueError("Magasin de variables vide : lancer feature_pipeline.py")
+    features = scorer.features
+    sample = df[features].sample(n=min(n_rows, len(df)), random_state=seed)
+    axes = grid_axes(features, store.state())
+
+    cat = [a for a in axes if a["kind"] == "cat"]
+    num = [a for a in axes if a["kind"] == "num"]
+    col = {f: j for j, f in enumerate(features)}
+    X0 = sample.to_numpy(dtype=np.float32)
+    num_grid = list(itertools.product(*(a["values"] for a in num)))
+    # Bloc d'un point catégoriel : tous les points numériques × l'échantillon
+    block = np.repeat(X0[None], len(num_grid), axis=0)
+    for g, point in enumerate(num_grid):
+        for a, v in zip(num, point):
+            if a["name"] == AGE_FEATURE:
+                shift = v - X0[:, col[AGE_FEATURE]]
+                for f in [AGE_FEATURE, *(s for s in AGE_SHIFTED if s in col)]:
+                    block[g, :, col[f]] = np.maximum(X0[:, col[f]] + shift, 0)
+            else:
+                block[g, :, col[a["name"]]] = v
+
+    shape = [len(a["values"]) for a in axes]
+    out = np.empty([*shape, len(OUTPUTS)], dtype=np.float32)
+    for point in itertools.product(*(enumerate(a["values"]) for a in cat)):
+        for (_, v), a in zip(point, cat):
+            block[:, :, col[a["name"]]] = v
+        X = pd.DataFrame(block.reshape(-1, len(features)), columns=features)
+        p = scorer.model.predict_proba(X)[:, 1].reshape(len(num_grid), len(sample))
+        idx = tuple(i for i, _ in point)
+        cell = [len(a["values"]) for a in num]
+        p10, p90 = np.percentile(p, [10, 90], axis=1)
+        out[idx] = np.stack([p.mean(axis=1), p10, p90], axis=-1).reshape([*cell, len(OUTPUTS)])
+
+    meta = {
+        "format": TABLE_FORMAT,
+        "scenario": scenario,
+        "variant": variant,
+        "t_star": scorer.t_star,
+        "axes": axes,
+        "n_rows": len(sample),
+        "model_sha256": _model_version(scorer),
+        "features_version": model_store.features_version(store),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    target = table_dir(model_dir or scoring.MODEL_DIR, scenario, variant)
+    tmp = f"{target}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, TABLE_NAME), out, allow_pickle=False)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    old = f"{target}.old{os.getpid()}"
+    if os.path.isdir(target):
+        os.rename(target, old)
+    os.rename(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+# =========================
+# FIGURE
+# =========================
+
+def curve_figure(table, name, current, height=420, **fixed):
+    """Probabilité (dépendance partielle + bande ICE 10–90 %) le long de `name`."""
+    import plotly.graph_objects as go
+
+    x, res = table.curve(name, **fixed)
+    fig = go.Figure([
+        go.Scatter(x=x, y=100 * res["p90"], mode="lines", line=dict(width=0),
+                   showlegend=False, hoverinfo="skip"),
+        go.Scatter(x=x, y=100 * res["p10"], mode="lines", line=dict(width=0), fill="tonexty",
+                   fillcolor="rgba(46,134,193,0.2)", name="ICE 10–90 %", hoverinfo="skip"),
+        go.Scatter(x=x, y=100 * res["proba"], mode="lines", line=dict(color="#2e86c1"),
+                   name="Dépendance partielle", hovertemplate="%{x:.1f} → %{y:.2f} %"),
+    ])
+    fig.add_vline(x=current, line=dict(color="#999", dash="dot"))
+    fig.add_hline(y=100 * table.t_star, line=dict(color="#c0392b", dash="dot"),
+                  annotation_text="seuil t*")
+    fig.update_layout(
+        height=height, template="plotly_white", xaxis_title=AXIS_LABELS.get(name, name),
+        yaxis_title="Probabilité d'accident mortel (%)",
+    )
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("scenarios", nargs="*", default=list(scoring.SCENARIOS))
+    parser.add_argument("--variant", default=scoring.DEFAULT_VARIANT)
+    parser.add_argument("--rows", type=int, default=SAMPLE_ROWS, help="accidents de l'échantillon")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for scenario in args.scenarios:
+        if args.command == "build":
+            t0 = time.perf_counter()
+            try:
+                path = build(scenario, args.variant, n_rows=args.rows)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"{scenario:12s} {e}")
+                failed = True
+                continue
+            table = WhatIfTable(path)
+            cells = int(np.prod([len(a["values"]) for a in table.axes]))
+            print(f"{scenario:12s} {cells:7,d} points × {table.meta['n_rows']} accidents  "
+                  f"{table.nbytes / 1024:7.1f} Ko  {time.perf_counter() - t0:5.1f} s  {path}")
+            continue
+        table = open_table(scenario, args.variant)
+        if table is None:
+            exists = os.path.isdir(table_dir(scoring.MODEL_DIR, scenario, args.variant))
+            print(f"{scenario:12s} {'périmée' if exists else 'absente'}")
+            failed = True
+        else:
+            print(f"{scenario:12s} à jour  {' × '.join(a['name'] for a in table.axes)}  "
+                  f"(construite {table.meta['built_at']})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())